@@ -0,0 +1,97 @@
+import logging
+import os
+import runpy
+import shutil
+import sys
+import time
+import zipfile
+
+STARTED_AT = time.perf_counter()
+
+
+# Each command only imports its own module, and through it only the
+# clients its backend needs
+COMMANDS = {
+    "pr-metrics": "calculate_pr_metrics",
+    "repo-metrics": "repo_dataset",
+    "team-metrics": "calculate_team_metrics",
+    "deployment-frequency": "deployment_frequency",
+    "lead-time-for-changes": "lead_time_for_changes",
+    "change-failure-rate": "change_failure_rate",
+    "time-to-restore": "time_to_restore",
+    "upsert-reports": "report_sink",
+    "warehouse": "warehouse",
+    "columns": "column_file",
+    "org-graph": "org_graph",
+    "webhook-server": "webhook_server",
+    "powershell": "dora_cli",
+    "plan": "planner",
+}
+# Separates chained commands run by the same interpreter
+COMMAND_SEPARATOR = "::"
+BUNDLED_PACKAGES = "site-packages"
+# Written by build_zipapp.py, names the extracted packages of one build
+BUILD_STAMP = "build-stamp"
+
+
+def extract_bundled_packages(archive_path: str) -> None:
+    """Unpack the dependencies bundled in the zipapp once per build, compiled modules cannot load from a zip."""
+    with zipfile.ZipFile(archive_path) as archive:
+        try:
+            stamp = archive.read(BUILD_STAMP).decode().strip()
+        except KeyError:
+            status = os.stat(archive_path)
+            stamp = f"{status.st_size}-{status.st_mtime_ns}"
+        cache_dir = os.path.join(
+            os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "dora-metrics", stamp
+        )
+        if not os.path.isdir(cache_dir):
+            # Concurrent starts extract side by side, the first rename wins
+            staging_dir = f"{cache_dir}.{os.getpid()}.tmp"
+            members = [name for name in archive.namelist() if name.startswith(f"{BUNDLED_PACKAGES}/")]
+            archive.extractall(staging_dir, members)
+            try:
+                os.replace(staging_dir, cache_dir)
+            except OSError:
+                if not os.path.isdir(cache_dir):
+                    raise
+                shutil.rmtree(staging_dir, ignore_errors=True)
+    sys.path.insert(0, os.path.join(cache_dir, BUNDLED_PACKAGES))
+
+
+def split_commands(argv):
+    command = []
+    for argument in argv:
+        if argument == COMMAND_SEPARATOR:
+            yield command
+            command = []
+        else:
+            command.append(argument)
+    yield command
+
+
+def run(argv) -> None:
+    timings = {}
+    phase_started = STARTED_AT
+    if zipfile.is_zipfile(sys.argv[0]):
+        extract_bundled_packages(sys.argv[0])
+        timings["extract"] = time.perf_counter() - phase_started
+        phase_started = time.perf_counter()
+
+    for command in split_commands(argv):
+        if not command or command[0] not in COMMANDS:
+            raise SystemExit(f"usage: {os.path.basename(sys.argv[0])} {{{','.join(COMMANDS)}}} [args] [{COMMAND_SEPARATOR} ...]")
+        name, module = command[0], COMMANDS[command[0]]
+        sys.argv = [module, *command[1:]]
+        runpy.run_module(module, run_name="__main__")
+        timings[f"{name} run"] = time.perf_counter() - phase_started
+        phase_started = time.perf_counter()
+
+    logging.info(
+        "Phase timings: " + ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in timings.items())
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    run(sys.argv[1:])
@@ -0,0 +1,45 @@
+import argparse
+import glob
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import uuid
+import zipapp
+
+
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Must match the directory and stamp __main__.py reads
+BUNDLED_PACKAGES = "site-packages"
+BUILD_STAMP = "build-stamp"
+
+
+def build(output: str, requirements: str) -> None:
+    with tempfile.TemporaryDirectory() as staging_dir:
+        for source in glob.glob(os.path.join(SOURCE_DIR, "*.py")):
+            if os.path.basename(source) != os.path.basename(__file__):
+                shutil.copy(source, staging_dir)
+        # Installed with the interpreter the bundle runs on, so compiled
+        # wheels match
+        subprocess.run(
+            [
+                sys.executable, "-m", "pip", "install", "--quiet",
+                "--target", os.path.join(staging_dir, BUNDLED_PACKAGES), "-r", requirements,
+            ],
+            check=True,
+        )
+        with open(os.path.join(staging_dir, BUILD_STAMP), "w") as stamp_file:
+            stamp_file.write(uuid.uuid4().hex)
+        zipapp.create_archive(staging_dir, output, interpreter="/usr/bin/env python3", compressed=True)
+    logging.info(f"Built {output} ({os.path.getsize(output) / 1024 / 1024:.1f} MB)")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Bundle the DORA scripts and their dependencies into one zipapp.")
+    parser.add_argument("--output", default="dora-metrics.pyz", help="Path of the archive to write")
+    parser.add_argument("--requirements", default=os.path.join(SOURCE_DIR, "requirements.txt"), help="Requirements bundled into the archive")
+    args = parser.parse_args()
+    build(args.output, args.requirements)
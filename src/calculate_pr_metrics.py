@@ -1,90 +1,280 @@
 import os
-from github import Github
 import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from fnmatch import fnmatch
 import json
 import logging
 import argparse
+import itertools
+import math
+from deadline import DeadlineExceeded, deadline, parse_duration
+from github_client import SHARE_REQUESTS_HELP, concurrency, lazy_completions, payload_value, shared_requests
+from sampling import allocate, draw, scale, stratified_mean, stratify
+from warehouse import Warehouse
+from report_sink import ReportSink
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# GitHub stops listing PR files after 3000 entries
+MAX_PR_FILES = 3000
+MAX_FILE_PAGE_WORKERS = 4
+
+# Per-PR values behind each reported average, and whether only merged PRs count
+SAMPLED_AVERAGES = {
+    "average_open_to_close_time": (lambda pr_metrics: pr_metrics["open_to_close_time"].total_seconds() / 3600, True),
+    "average_time_to_first_review": (lambda pr_metrics: pr_metrics["time_to_first_review"].total_seconds() / 3600, False),
+    "average_time_to_approval": (lambda pr_metrics: pr_metrics["time_to_approval"].total_seconds() / 3600, False),
+    "average_reviews_per_pr": (lambda pr_metrics: pr_metrics["total_reviews"], False),
+    "average_commits_per_pr": (lambda pr_metrics: pr_metrics["total_commits"], False),
+    "average_loc_changed_per_pr": (lambda pr_metrics: pr_metrics["total_loc_changed"], False),
+}
 
 class RepositoryMetrics:
-    def __init__(self, owner, repo, time_frame,token,github_host):
-        try:
-            self.github_client = (
-                Github(login_or_token=token, base_url=github_host)
-                if github_host
-                else Github(token)
-            )
-            self.owner = owner
-        except GithubException as e:
-            logging.error(f"Failed to initialize GitHub client: {e}")
-            raise
-        except Exception as e:
-            logging.error(
-                f"Unexpected error during initialization: {e} - verify that your github credentials are valid"
-            )
-            raise
+    def __init__(self, owner, repo, time_frame,token,github_host, exclude_paths=None, backend="list", warehouse=None, dataset=None, sample_budget=None, sample_seed=None, since=None):
+        self.warehouse = warehouse
+        self.sample_budget = sample_budget
+        self.sample_seed = sample_seed
+        self.dataset = dataset
+        if dataset is not None:
+            self.github_client = dataset.github_client
+        elif warehouse is None:
+            # PyGithub is only loaded when the API backend is used
+            from github import GithubException
+            from github_auth import create_github
+
+            try:
+                self.github_client = create_github(token, github_host)
+                self.owner = owner
+            except GithubException as e:
+                logging.error(f"Failed to initialize GitHub client: {e}")
+                raise
+            except Exception as e:
+                logging.error(
+                    f"Unexpected error during initialization: {e} - verify that your github credentials are valid"
+                )
+                raise
         self.repo_name = f"{owner}/{repo}"
+        self.exclude_paths = exclude_paths or []
+        self.backend = backend
         self.time_frame = int(time_frame)
         self.start_date = datetime.datetime.now(datetime.UTC).replace(
             tzinfo=datetime.timezone.utc
         ) - datetime.timedelta(days=self.time_frame)
-        self.repo = self.github_client.get_repo(f"{self.repo_name}")
+        if since is not None:
+            self.start_date = since
+        if dataset is not None:
+            self.repo = dataset.repo
+            self.repo_id = self.repo.id
+            self.start_date = dataset.start_date
+        elif warehouse is None:
+            self.repo = self.github_client.get_repo(f"{self.repo_name}")
+            self.repo_id = self.repo.id
+        else:
+            self.repo_id = warehouse.repository_id(self.repo_name)
 
-    def calculate_pr_metrics(self):
+    def get_pull_requests(self):
+        if self.dataset:
+            return self.dataset.opened_pull_requests()
+        if self.backend == "search":
+            from pr_search import PullRequestSearch
+
+            return PullRequestSearch(self.github_client).search(
+                f"repo:{self.repo_name}",
+                self.start_date,
+                datetime.datetime.now(datetime.timezone.utc),
+            )
         prs = self.repo.get_pulls(state="all", sort="created", direction="desc")
-        results = []
+        return itertools.takewhile(lambda pr: pr.created_at >= self.start_date, prs)
+
+    def list_pull_requests(self):
+        # Listing is cheap next to the per-PR requests, it runs first and
+        # newest first so a deadline cuts the oldest PRs
+        prs = []
+        try:
+            for pr in self.get_pull_requests():
+                prs.append(pr)
+                deadline.check()
+        except DeadlineExceeded:
+            logging.warning(f"Listed {len(prs)} pull requests before the deadline")
+        return prs
 
-        with ThreadPoolExecutor() as executor:
-            futures = [
-                executor.submit(self.process_pr, pr)
-                for pr in prs
-                if pr.created_at >= self.start_date
+    def calculate_pr_metrics(self):
+        if self.warehouse:
+            results = [
+                self.build_pr_metrics(*inputs)
+                for inputs in self.warehouse.pull_request_metric_inputs(self.repo_name, self.start_date)
             ]
+            return self.aggregate_results(results)
+        if self.sample_budget:
+            return self.calculate_sampled_pr_metrics()
+
+        results = []
+        prs = self.list_pull_requests()
+
+        with ThreadPoolExecutor(max_workers=concurrency.maximum) as executor:
+            futures = [executor.submit(self.process_pr, pr) for pr in prs]
             for future in as_completed(futures):
-                results.append(future.result())
+                if future.result() is not None:
+                    results.append(future.result())
 
+        deadline.account(len(results), len(prs))
         metrics = self.aggregate_results(results)
-        return metrics
+        metrics["concurrency"] = concurrency.snapshot()
+        return deadline.annotate(metrics)
+
+    @staticmethod
+    def detail_requests(stratum):
+        # A reviews page for every PR, a detail GET for merged ones
+        _, merged = stratum
+        return 2 if merged else 1
+
+    def calculate_sampled_pr_metrics(self):
+        """Review and detail data for a stratified sample of PRs, the averages come with 95% intervals."""
+        prs = self.list_pull_requests()
+        strata = stratify(prs, lambda pr: (tuple(pr.created_at.isocalendar()[:2]), pr.merged_at is not None))
+        allocation = allocate(strata, self.sample_budget, self.detail_requests)
+        sample = draw(strata, allocation, self.sample_seed)
+        with ThreadPoolExecutor(max_workers=concurrency.maximum) as executor:
+            sampled = {
+                stratum: [pr_metrics for pr_metrics in executor.map(self.process_pr, items) if pr_metrics is not None]
+                for stratum, items in sample.items()
+            }
+        sample_size = sum(len(items) for items in sample.values())
+        deadline.account(sum(len(stratum_results) for stratum_results in sampled.values()), sample_size)
+        sampled = {stratum: stratum_results for stratum, stratum_results in sampled.items() if stratum_results}
+
+        # Each sampled PR stands for its stratum's unsampled ones
+        results = [
+            scale(pr_metrics, len(strata[stratum]) / len(stratum_results))
+            for stratum, stratum_results in sampled.items()
+            for pr_metrics in stratum_results
+        ]
+        metrics = self.aggregate_results(results)
+        metrics["prs_opened"] = len(prs)
+        confidence_intervals = {}
+        for name, (value, merged_only) in SAMPLED_AVERAGES.items():
+            _, half_width = stratified_mean(
+                {
+                    stratum: (len(strata[stratum]), [value(pr_metrics) for pr_metrics in stratum_results])
+                    for stratum, stratum_results in sampled.items()
+                    if stratum[1] or not merged_only
+                }
+            )
+            confidence_intervals[name] = [
+                round(max(0, metrics[name] - half_width), 2),
+                round(metrics[name] + half_width, 2),
+            ]
+        metrics["sampling"] = {
+            "sample_size": sample_size,
+            "population": len(prs),
+            "strata": len(strata),
+            "detail_requests": sum(self.detail_requests(stratum) * len(items) for stratum, items in sample.items()),
+            "budget": self.sample_budget,
+            "confidence_intervals": confidence_intervals,
+        }
+        metrics["concurrency"] = concurrency.snapshot()
+        logging.info(f"Sampled {sample_size} of {len(prs)} PRs across {len(strata)} week and merge strata")
+        return deadline.annotate(metrics)
 
     def process_pr(self, pr):
+        # None once the deadline passed, the PR is left out of the report
+        with concurrency.slot():
+            if deadline.expired:
+                return None
+            try:
+                return self.fetch_pr_metrics(pr)
+            except DeadlineExceeded:
+                return None
+
+    def fetch_pr_metrics(self, pr):
+        total_commits = 0
+        total_loc_changed = 0
+        # merged_at is part of the list payload, pr.merged is not and would
+        # cost a completion fetch per PR
+        if pr.merged_at is not None:
+            details = self.get_pr_details(pr)
+            total_commits = details.commits
+            total_loc_changed = self.count_loc_changed(details)
+
+        reviews = (
+            self.dataset.reviews(pr)
+            if self.dataset
+            else [(review.state, review.submitted_at) for review in pr.get_reviews()]
+        )
+        return self.build_pr_metrics(
+            pr.created_at, pr.merged_at, total_commits, total_loc_changed, reviews
+        )
+
+    @staticmethod
+    def build_pr_metrics(created_at, merged_at, total_commits, total_loc_changed, reviews):
         pr_metrics = {
             "open_to_close_time": datetime.timedelta(0),
             "time_to_first_review": datetime.timedelta(0),
             "time_to_approval": datetime.timedelta(0),
             "prs_opened": 1,
-            "prs_merged": int(pr.merged),
+            "prs_merged": int(merged_at is not None),
             "total_reviews": 0,
             "total_commits": 0,
             "total_loc_changed": 0,
             "review_dates": [],
         }
 
-        if pr.merged:
-            pr_metrics["open_to_close_time"] = pr.merged_at - pr.created_at
-            commits = pr.get_commits()
-            pr_metrics["total_commits"] = commits.totalCount
-            for file in pr.get_files():
-                pr_metrics["total_loc_changed"] += file.additions + file.deletions
-
-        reviews = pr.get_reviews()
-        for review in reviews:
-            if review.state in ["APPROVED", "CHANGES_REQUESTED", "COMMENTED"]:
-                pr_metrics["review_dates"].append(review.submitted_at)
+        if merged_at is not None:
+            pr_metrics["open_to_close_time"] = merged_at - created_at
+            pr_metrics["total_commits"] = total_commits
+            pr_metrics["total_loc_changed"] = total_loc_changed
+
+        for state, submitted_at in reviews:
+            if state in ["APPROVED", "CHANGES_REQUESTED", "COMMENTED"]:
+                pr_metrics["review_dates"].append(submitted_at)
                 pr_metrics["total_reviews"] += 1
                 if pr_metrics["time_to_first_review"] == datetime.timedelta(0):
-                    pr_metrics["time_to_first_review"] = (
-                        review.submitted_at - pr.created_at
-                    )
-                if review.state == "APPROVED" and pr_metrics[
+                    pr_metrics["time_to_first_review"] = submitted_at - created_at
+                if state == "APPROVED" and pr_metrics[
                     "time_to_approval"
                 ] == datetime.timedelta(0):
-                    pr_metrics["time_to_approval"] = review.submitted_at - pr.created_at
+                    pr_metrics["time_to_approval"] = submitted_at - created_at
 
         return pr_metrics
 
+    def get_pr_details(self, pr):
+        # The pulls list payload has no additions/deletions/commits totals;
+        # one detail GET is still cheaper than paging commits and files
+        if self.dataset:
+            return self.dataset.pull_request_details(pr)
+        if payload_value(pr, "additions") is not None:
+            return pr
+        return self.repo.get_pull(pr.number)
+
+    def count_loc_changed(self, pr):
+        if not self.exclude_paths:
+            return pr.additions + pr.deletions
+        return sum(
+            file.additions + file.deletions
+            for file in self.iter_pr_files(pr)
+            if not self.is_excluded_path(file.filename)
+        )
+
+    def is_excluded_path(self, path):
+        return any(fnmatch(path, pattern) for pattern in self.exclude_paths)
+
+    def iter_pr_files(self, pr):
+        files = pr.get_files()
+        page_count = math.ceil(
+            min(pr.changed_files, MAX_PR_FILES) / self.github_client.per_page
+        )
+        if page_count <= 1:
+            yield from files.get_page(0)
+            return
+        with ThreadPoolExecutor(
+            max_workers=min(page_count, MAX_FILE_PAGE_WORKERS)
+        ) as executor:
+            for page in executor.map(files.get_page, range(page_count)):
+                yield from page
+
     def aggregate_results(self, results):
+        return self.summarize_results(results, self.repo_id, self.time_frame)
+
+    @classmethod
+    def summarize_results(cls, results, repo_id, time_frame):
         aggregated = {
             "total_open_to_close_time": datetime.timedelta(0),
             "total_time_to_first_review": datetime.timedelta(0),
@@ -112,28 +302,28 @@ class RepositoryMetrics:
         review_weeks = {
             review_date.isocalendar()[1] for review_date in aggregated["review_dates"]
         }
-        average_prs_reviewed_per_week = len(review_weeks) / max(1, self.time_frame)
+        average_prs_reviewed_per_week = len(review_weeks) / max(1, time_frame)
 
         metrics = {
-            "id": self.repo.id,
-            "average_open_to_close_time": self.timedelta_to_decimal_hours(
+            "id": repo_id,
+            "average_open_to_close_time": cls.timedelta_to_decimal_hours(
                 aggregated["total_open_to_close_time"] / aggregated["prs_merged"]
             )
             if aggregated["prs_merged"]
             else 0,
-            "average_time_to_first_review": self.timedelta_to_decimal_hours(
+            "average_time_to_first_review": cls.timedelta_to_decimal_hours(
                 aggregated["total_time_to_first_review"] / aggregated["prs_opened"]
             )
             if aggregated["prs_opened"]
             else 0,
-            "average_time_to_approval": self.timedelta_to_decimal_hours(
+            "average_time_to_approval": cls.timedelta_to_decimal_hours(
                 aggregated["total_time_to_approval"] / aggregated["prs_opened"]
             )
             if aggregated["prs_opened"]
             else 0,
             "prs_opened": aggregated["prs_opened"],
-            "weekly_prs_merged": self.timedelta_to_decimal_hours(
-                aggregated["total_open_to_close_time"] / max(1, self.time_frame)
+            "weekly_prs_merged": cls.timedelta_to_decimal_hours(
+                aggregated["total_open_to_close_time"] / max(1, time_frame)
             )
             if aggregated["prs_merged"]
             else 0,
@@ -157,11 +347,12 @@ class RepositoryMetrics:
 
         return metrics
 
-    def timedelta_to_decimal_hours(self, td):
+    @staticmethod
+    def timedelta_to_decimal_hours(td):
         return round(td.total_seconds() / 3600, 2)
 
 if __name__ == "__main__":
-    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     parser = argparse.ArgumentParser(description='Calculate Pull Request Metrics.')
     parser.add_argument('--owner', required=True, help='Owner of the repository')
     parser.add_argument('--repo', required=True, help='Repository name')
@@ -173,16 +364,38 @@ if __name__ == "__main__":
             help="Base URL for self-hosted GitHub instance (e.g., https://api.github-example.com)",
             default=None,
         )
+    parser.add_argument(
+            "--exclude-paths",
+            nargs="*",
+            default=[],
+            help="Glob patterns of files (e.g. vendored or generated code) left out of LOC changed",
+        )
+    parser.add_argument('--backend', default='list', choices=['list', 'search'], help='List PRs per repository or through the search API')
+    parser.add_argument('--warehouse', default=None, help='Read from this local warehouse database instead of the GitHub API')
+    parser.add_argument('--report-file', default=None, help='Append the report to this NDJSON file instead of GITHUB_ENV')
+    parser.add_argument('--sample-budget', type=int, default=None, help='Cap review and detail requests, PRs beyond it are estimated from a stratified sample')
+    parser.add_argument('--sample-seed', type=int, default=None, help='Seed of the sample, for reproducible estimates')
+    parser.add_argument('--deadline', type=parse_duration, default=None, help='Stop fetching after this long (e.g. 300, 15m, 1h) and report what was covered')
+    parser.add_argument('--share-requests', action='store_true', help=SHARE_REQUESTS_HELP)
     args = parser.parse_args()
+    deadline.start(args.deadline)
+    if args.share_requests:
+        shared_requests.install()
 
     logging.info(f"Repository Name: {args.owner}/{args.repo}")
     logging.info(f"TimeFrame (in days): {args.time_frame}")
 
-    repo_metrics = RepositoryMetrics(args.owner, args.repo, args.time_frame, token=args.token,github_host = args.github_host)
+    repo_metrics = RepositoryMetrics(args.owner, args.repo, args.time_frame, token=args.token,github_host = args.github_host, exclude_paths=args.exclude_paths, backend=args.backend, warehouse=Warehouse(args.warehouse) if args.warehouse else None, sample_budget=args.sample_budget, sample_seed=args.sample_seed)
     metrics = repo_metrics.calculate_pr_metrics()
     metrics_json = json.dumps(metrics, default=str)
     print(metrics_json)
+    logging.info(f"Lazy completion fetches: {lazy_completions.snapshot()}")
+    logging.info(f"Shared GitHub requests: {shared_requests.snapshot()}")
     
-    if args.platform == "github-actions":
+    if args.report_file:
+        sink = ReportSink(args.report_file)
+        sink.add("pr_metrics", args.owner, args.repo, metrics, time_frame=args.time_frame)
+        sink.flush()
+    elif args.platform == "github-actions":
         with open(os.getenv("GITHUB_ENV"), "a") as github_env:
             github_env.write(f"metrics={metrics_json}\n")
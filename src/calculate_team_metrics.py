@@ -1,71 +1,140 @@
-import os
 import asyncio
-from github import Github, Team, PullRequest, GithubException
 import datetime
-import json
 import logging
 import argparse
+import itertools
 import re
 from concurrent.futures import ThreadPoolExecutor
-import threading
-from typing import Any, Dict, List, Tuple
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from checkpoint import Checkpoint
+from deadline import DeadlineExceeded, deadline, parse_duration
+from pipeline import Pipeline, Stage
 from port import PortAPI
+from github_client import SHARE_REQUESTS_HELP, concurrency, github_errors, lazy_completions, payload_value, shared_requests
+from warehouse import Warehouse
 
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
+if TYPE_CHECKING:
+    from github import PullRequest, Team
+    import org_graph
+
+
+class ReviewResponse(NamedTuple):
+    requested: int
+    responded: int
+    response_time: datetime.timedelta
+
+
+NO_REVIEW_REQUEST = ReviewResponse(0, 0, datetime.timedelta(0))
+
+
+class TeamWork(NamedTuple):
+    # What the pipeline stages hand each other for one team
+    team: "Team.Team"
+    members: Optional[List[str]] = None
+    repos: Optional[List[str]] = None
+    prs: List["PullRequest.PullRequest"] | None = None
+    total: ReviewResponse | None = None
+    result: Dict[str, Any] | None = None
+
+
+def reduce_review_responses(partials: Iterable[ReviewResponse]) -> ReviewResponse:
+    total = NO_REVIEW_REQUEST
+    for partial in partials:
+        total = ReviewResponse(
+            total.requested + partial.requested,
+            total.responded + partial.responded,
+            total.response_time + partial.response_time,
+        )
+    return total
+
+
+def dump_review_response(partial: ReviewResponse) -> List[float]:
+    return [partial.requested, partial.responded, partial.response_time.total_seconds()]
+
+
+def load_review_response(value: List[float]) -> ReviewResponse:
+    return ReviewResponse(int(value[0]), int(value[1]), datetime.timedelta(seconds=value[2]))
+
+
+class SnapshotTeam:
+    """Team of a local snapshot, with the attributes the metrics read off PyGithub's Team."""
+
+    def __init__(self, payload: Dict[str, Any]) -> None:
+        self._rawData = payload
+        self.id = payload.get("id")
+        self.name = payload.get("name")
+        self.slug = payload["slug"]
+        self.description = payload.get("description")
+        self.html_url = payload.get("html_url")
 
 
 class TeamMetrics:
     def __init__(
-        self, owner: str, time_frame: int, token: str, github_host: str | None
+        self,
+        owner: str,
+        time_frame: int,
+        token: str,
+        github_host: str | None,
+        backend: str = "list",
+        warehouse: Warehouse | None = None,
+        org_graph: "org_graph.OrgGraph | None" = None,
+        checkpoint: Checkpoint | None = None,
     ) -> None:
-        try:
-            self.github_client = (
-                Github(login_or_token=token, base_url=github_host)
-                if github_host
-                else Github(token)
-            )
-            self.owner = owner
-        except GithubException as e:
-            logging.error(f"Failed to initialize GitHub client: {e}")
-            raise
-        except Exception as e:
-            logging.error(
-                f"Unexpected error during initialization: {e} - verify that your github credentials are valid"
-            )
-            raise
+        self.owner = owner
+        self.warehouse = warehouse
+        # Teams, members and repositories come from a local snapshot when
+        # one is given
+        self.team_source = warehouse or org_graph
+        if warehouse is None:
+            from github_auth import create_github
 
+            try:
+                self.github_client = create_github(token, github_host)
+            except github_errors() as e:
+                logging.error(f"Failed to initialize GitHub client: {e}")
+                raise
+            except Exception as e:
+                logging.error(
+                    f"Unexpected error during initialization: {e} - verify that your github credentials are valid"
+                )
+                raise
+
+        self.checkpoint = checkpoint
         self.time_frame = time_frame
-        self.start_date = datetime.datetime.now(
-            datetime.timezone.utc
+        # A resumed run keeps the window of the run it continues
+        self.start_date = (
+            checkpoint.started_at if checkpoint else datetime.datetime.now(datetime.timezone.utc)
         ) - datetime.timedelta(days=self.time_frame)
-        self.semaphore = threading.Semaphore(5)  # Limit concurrent requests
+        self.backend = backend
 
     @staticmethod
     def convert_to_slug(name: str) -> str:
         """Convert a team name to a slug by replacing spaces with hyphens and lowercasing."""
         return re.sub(r"\s+", "-", name.strip()).lower()
 
-    async def get_teams(self) -> List[Team.Team]:
+    async def get_teams(self) -> List["Team.Team"]:
+        if self.team_source:
+            return [SnapshotTeam(payload) for payload in self.team_source.team_payloads()]
         try:
             logging.info(f"Fetching teams for organization {self.owner}")
             org = self.github_client.get_organization(self.owner)
-            teams:List[Team.Team] = [team for team in org.get_teams()]
+            teams:List["Team.Team"] = [team for team in org.get_teams()]
             logging.info(f"Found {len(teams)} teams in {self.owner} >> {teams}")
             return [team for team in teams]
-        except GithubException as e:
+        except github_errors() as e:
             logging.error(f"Failed to fetch teams: {e}")
             raise
         except Exception as e:
             logging.error(f"Unexpected error while fetching teams: {e}")
             raise
 
-    def get_team_members(self, team: Team.Team) -> List[str]:
+    def get_team_members(self, team: "Team.Team") -> List[str]:
+        if self.team_source:
+            return self.team_source.team_members(team.slug)
         try:
             logging.info(f"Fetching team members for team {team.slug}")
             return [member.login for member in team.get_members()]
-        except GithubException as e:
+        except github_errors() as e:
             logging.error(f"Failed to fetch team members for team {team.slug}: {e}")
             raise
         except Exception as e:
@@ -74,11 +143,13 @@ class TeamMetrics:
             )
             raise
 
-    def get_team_repositories(self, team: Team.Team) -> List[str]:
+    def get_team_repositories(self, team: "Team.Team") -> List[str]:
+        if self.team_source:
+            return self.team_source.team_repositories(team.slug)
         try:
             logging.info(f"Fetching repositories for team {team.slug}")
             return [repo.full_name for repo in team.get_repos()]
-        except GithubException as e:
+        except github_errors() as e:
             logging.error(f"Failed to fetch repositories for team {team.slug}: {e}")
             raise
         except Exception as e:
@@ -89,43 +160,116 @@ class TeamMetrics:
 
     async def calculate_response_metrics(
         self,
-        prs: List[PullRequest.PullRequest],
+        prs: List["PullRequest.PullRequest"],
         team_members: List[str],
         team_slug: str,
+        review_requested: bool = False,
     ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         logging.info(f"Calculating response rate and time for team {team_slug}")
-        total_requests = 0
-        responded_requests = 0
-        total_response_time = datetime.timedelta(0)
-        total_responses = 0
+        total = await self.review_responses(prs, team_members, team_slug, review_requested)
+        return self.summarize_response_metrics(
+            team_slug,
+            total.requested,
+            total.responded,
+            total.response_time,
+            total.responded,
+        )
 
-        def fetch_reviews(pr: PullRequest.PullRequest) -> None:
-            nonlocal responded_requests, total_response_time, total_responses, total_requests
+    async def review_responses(
+        self,
+        prs: List["PullRequest.PullRequest"],
+        team_members: List[str],
+        team_slug: str,
+        review_requested: bool = False,
+    ) -> ReviewResponse:
+        def fetch_reviews(pr: "PullRequest.PullRequest") -> Optional[ReviewResponse]:
+            # Each task returns its own partial, nothing is shared between threads
+            if deadline.expired:
+                return None
+            requested_teams = payload_value(pr, "requested_teams") or []
+            if not review_requested and not any(
+                team["slug"] == team_slug for team in requested_teams
+            ):
+                return NO_REVIEW_REQUEST
             try:
-                with self.semaphore:  # Ensure limited concurrent requests
-                    if any(team.slug == team_slug for team in pr.requested_teams):
-                        total_requests += 1
-                        reviews = pr.get_reviews()
-                        for review in reviews:
-                            if review.user.login in team_members:
-                                responded_requests += 1
-                                response_time = review.submitted_at - pr.created_at
-                                total_response_time += response_time
-                                total_responses += 1
-                                break
-            except GithubException as e:
+                with concurrency.slot():
+                    for review in pr.get_reviews():
+                        if review.user.login in team_members:
+                            return ReviewResponse(1, 1, review.submitted_at - pr.created_at)
+            except DeadlineExceeded:
+                return None
+            except github_errors() as e:
                 logging.error(f"Failed to fetch reviews for PR {pr.number}: {e}")
             except Exception as e:
                 logging.error(
                     f"Unexpected error while fetching reviews for PR {pr.number}: {e}"
                 )
+            return ReviewResponse(1, 0, datetime.timedelta(0))
 
-        with ThreadPoolExecutor(max_workers=10) as executor:
+        with ThreadPoolExecutor(max_workers=concurrency.maximum) as executor:
             loop = asyncio.get_event_loop()
-            futures = [loop.run_in_executor(executor, fetch_reviews, pr) for pr in prs]
-            for future in asyncio.as_completed(futures):
-                await future
+            partials = await asyncio.gather(
+                *(loop.run_in_executor(executor, fetch_reviews, pr) for pr in prs)
+            )
+
+        # A team missing reviews would be pushed with a skewed response rate
+        if any(partial is None for partial in partials):
+            raise DeadlineExceeded()
+        return reduce_review_responses(partials)
 
+    async def repository_review_responses(
+        self, repo_name: str, team_members: List[str], team_slug: str
+    ) -> ReviewResponse:
+        # Checkpointed after every PR page, a resumed run continues at the
+        # page it stopped on instead of listing and reviewing from the start
+        unit = f"team:{team_slug}/repo:{repo_name}"
+        completed = self.checkpoint.completed(unit)
+        if completed is not None:
+            return load_review_response(completed)
+        cursor = self.checkpoint.cursor(unit) or {
+            "page": 0,
+            "last_number": None,
+            "partial": dump_review_response(NO_REVIEW_REQUEST),
+        }
+        page, last_number = cursor["page"], cursor["last_number"]
+        total = load_review_response(cursor["partial"])
+        prs = self.github_client.get_repo(repo_name).get_pulls(
+            state="all", sort="created", direction="desc"
+        )
+        while True:
+            items = await asyncio.to_thread(prs.get_page, page)
+            # PRs opened since the checkpoint shift older ones to later
+            # pages, numbers tell which were already counted
+            pending = [
+                pr
+                for pr in items
+                if pr.created_at >= self.start_date
+                and (last_number is None or pr.number < last_number)
+            ]
+            if pending:
+                total = reduce_review_responses(
+                    [total, await self.review_responses(pending, team_members, team_slug)]
+                )
+                last_number = pending[-1].number
+            page += 1
+            if len(items) < self.github_client.per_page or items[-1].created_at < self.start_date:
+                break
+            self.checkpoint.advance(
+                unit,
+                {"page": page, "last_number": last_number, "partial": dump_review_response(total)},
+            )
+        self.checkpoint.complete(unit, dump_review_response(total))
+        logging.info(f"Counted {total.requested} review requests in {repo_name}")
+        return total
+
+    def summarize_response_metrics(
+        self,
+        team_slug: str,
+        total_requests: int,
+        responded_requests: int,
+        total_response_time: datetime.timedelta,
+        total_responses: int,
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
         response_rate = (
             (responded_requests / total_requests) * 100 if total_requests else 0
         )
@@ -146,28 +290,101 @@ class TeamMetrics:
     def timedelta_to_decimal_hours(td: datetime.timedelta) -> float:
         return round(td.total_seconds() / 3600, 2)
 
-    async def calculate_metrics_for_team(self, team: Team.Team) -> Dict[str, Any]:
+    def get_repository_pull_requests(
+        self, repos: List[str]
+    ) -> List["PullRequest.PullRequest"]:
         all_prs = []
-        try:
-            team_members = self.get_team_members(team)
-            repos = self.get_team_repositories(team)
-            logging.info(f"Found {len(repos)} repositories for the team {team.slug}")
-
-            for repo_name in repos:
-                repo = self.github_client.get_repo(repo_name)
-                prs = repo.get_pulls(state="all", sort="created", direction="desc")
-                filtered_prs = [pr for pr in prs if pr.created_at >= self.start_date]
-                all_prs.extend(filtered_prs)
-                logging.info(
-                    f"Fetched {len(filtered_prs)} pull requests from {repo_name}"
-                )
+        for repo_name in repos:
+            repo = self.github_client.get_repo(repo_name)
+            prs = repo.get_pulls(state="all", sort="created", direction="desc")
+            filtered_prs = list(
+                itertools.takewhile(lambda pr: pr.created_at >= self.start_date, prs)
+            )
+            all_prs.extend(filtered_prs)
+            logging.info(f"Fetched {len(filtered_prs)} pull requests from {repo_name}")
+        return all_prs
+
+    def search_review_requested_pull_requests(
+        self, team: "Team.Team"
+    ) -> List["PullRequest.PullRequest"]:
+        from pr_search import PullRequestSearch
 
-            response_rate, response_time = await self.calculate_response_metrics(
-                all_prs, team_members, team.slug
+        prs = list(
+            PullRequestSearch(self.github_client).search(
+                f"org:{self.owner} team-review-requested:{self.owner}/{team.slug}",
+                self.start_date,
+                datetime.datetime.now(datetime.timezone.utc),
             )
-            team_info = self.get_team_info(team)
-            return {**response_rate, **response_time, **team_info, "time_frame": self.time_frame}
-        except GithubException as e:
+        )
+        logging.info(
+            f"Found {len(prs)} pull requests requesting a review from {team.slug}"
+        )
+        return prs
+
+    def fetch_team(self, team: "Team.Team") -> "TeamWork":
+        if self.checkpoint:
+            completed = self.checkpoint.completed(f"team:{team.slug}")
+            if completed is not None:
+                logging.info(f"Team {team.slug} was completed before the restart")
+                return TeamWork(team, result=completed)
+        team_members = self.get_team_members(team)
+        repos = self.get_team_repositories(team)
+        logging.info(f"Found {len(repos)} repositories for the team {team.slug}")
+        prs = None
+        if not self.warehouse:
+            if self.backend == "search":
+                prs = self.search_review_requested_pull_requests(team)
+            elif not self.checkpoint:
+                prs = self.get_repository_pull_requests(repos)
+        return TeamWork(team, team_members, repos, prs)
+
+    async def normalize_team(self, work: "TeamWork") -> "TeamWork":
+        if work.result is not None:
+            return work
+        if self.warehouse:
+            total = ReviewResponse(*self.warehouse.team_response(work.team.slug, self.start_date))
+        elif work.prs is None:
+            # Checkpointed runs list and review one repository page at a time
+            total = reduce_review_responses(
+                [
+                    await self.repository_review_responses(repo_name, work.members, work.team.slug)
+                    for repo_name in work.repos
+                ]
+            )
+        else:
+            logging.info(f"Calculating response rate and time for team {work.team.slug}")
+            total = await self.review_responses(
+                work.prs, work.members, work.team.slug, review_requested=self.backend == "search"
+            )
+        return work._replace(total=total)
+
+    def aggregate_team(self, work: "TeamWork") -> "TeamWork":
+        if work.result is not None:
+            return work
+        response_rate, response_time = self.summarize_response_metrics(
+            work.team.slug,
+            work.total.requested,
+            work.total.responded,
+            work.total.response_time,
+            work.total.responded,
+        )
+        team_info = self.get_team_info(work.team, len(work.members), len(work.repos))
+        result = {
+            **response_rate,
+            **response_time,
+            **team_info,
+            "time_frame": self.time_frame,
+            "concurrency": concurrency.snapshot(),
+        }
+        if self.checkpoint:
+            self.checkpoint.complete(f"team:{work.team.slug}", result)
+        return work._replace(result=result)
+
+    async def calculate_metrics_for_team(self, team: "Team.Team") -> Dict[str, Any]:
+        try:
+            work = await self.normalize_team(self.fetch_team(team))
+            return self.aggregate_team(work).result
+        except github_errors() as e:
             logging.error(f"Failed to calculate metrics for team {team.slug}: {e}")
             raise
         except Exception as e:
@@ -176,7 +393,12 @@ class TeamMetrics:
             )
             raise
 
-    def get_team_info(self, team: Team.Team) -> Dict[str, Any]:
+    def get_team_info(
+        self, team: "Team.Team", members_count: int, repos_count: int
+    ) -> Dict[str, Any]:
+        # members_count, repos_count, permission and notification_setting are
+        # not all part of the org teams list payload; reading them off the
+        # Team object would complete it with one GET per team
         try:
             logging.info(
                 f"Fetching team info from {self.owner} organization for team {team.slug}"
@@ -185,14 +407,14 @@ class TeamMetrics:
                 "id": team.id,
                 "name": team.name,
                 "description": team.description,
-                "members_count": team.members_count,
-                "repos_count": team.repos_count,
+                "members_count": members_count,
+                "repos_count": repos_count,
                 "slug": team.slug,
                 "link": team.html_url,
-                "permission": team.permission,
-                "notification_setting": team.notification_setting,
+                "permission": payload_value(team, "permission"),
+                "notification_setting": payload_value(team, "notification_setting"),
             }
-        except GithubException as e:
+        except github_errors() as e:
             logging.error(f"Failed to fetch team info for team {team.slug}: {e}")
             raise
         except Exception as e:
@@ -221,35 +443,93 @@ class TeamEntityProcessor:
         title_case_string = cleaned_string.title()
         return title_case_string
 
-    async def process_team_entities(self, team_dora: List[Dict[str, Any]]):
-        blueprint_id = "githubTeam"
-        tasks = [
-            self.port_api.add_entity(
-                blueprint_id=blueprint_id,
-                entity_object={
-                    "identifier": str(data["id"]),
-                    "title": self.remove_symbols_and_title_case(data["name"]),
-                    "properties": {
-                        "description": data["description"],
-                        "members_count": data["members_count"],
-                        "repos_count": data["repos_count"],
-                        "slug": data["slug"],
-                        "link": data["link"],
-                        "permission": data["permission"],
-                        "notificationSetting": data["notification_setting"],
-                        "responseRate": data["response_rate"],
-                        "averageResponseTime": data["average_response_time"],
-                        "timeFrame": data["time_frame"]
-                    },
-                    "relations": {},
-                },
-            )
-            for data in team_dora
-        ]
-        await asyncio.gather(*tasks)
+    def team_entity(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "identifier": str(data["id"]),
+            "title": self.remove_symbols_and_title_case(data["name"]),
+            "properties": {
+                "description": data["description"],
+                "members_count": data["members_count"],
+                "repos_count": data["repos_count"],
+                "slug": data["slug"],
+                "link": data["link"],
+                "permission": data["permission"],
+                "notificationSetting": data["notification_setting"],
+                "responseRate": data["response_rate"],
+                "averageResponseTime": data["average_response_time"],
+                "timeFrame": data["time_frame"]
+            },
+            "relations": {},
+        }
+
+    async def upsert_team(self, data: Dict[str, Any], blueprint_id: str = "githubTeam") -> None:
+        await self.port_api.add_entity(blueprint_id=blueprint_id, entity_object=self.team_entity(data))
+
+    async def process_team_entities(
+        self, team_dora: List[Dict[str, Any]], blueprint_id: str = "githubTeam", seed_cache: bool = False
+    ):
+        if seed_cache:
+            await self.port_api.seed_entity_cache(blueprint_id)
+        await asyncio.gather(*(self.upsert_team(data, blueprint_id) for data in team_dora))
+        self.port_api.save_entity_cache()
+
+
+async def run_team_pipeline(
+    team_metrics: TeamMetrics,
+    processor: TeamEntityProcessor,
+    blueprint_id: str,
+    workers: Dict[str, int],
+    queue_size: int = 4,
+    seed_cache: bool = False,
+) -> List[Dict[str, Any]]:
+    """Fetch, normalize, aggregate and upsert teams as a stream, each team is written once its metrics are final."""
+    results = []
+
+    async def fetch(team: "Team.Team") -> Optional[TeamWork]:
+        # PyGithub blocks, the stage's workers wait on threads. Past the
+        # deadline teams are dropped, those already in the pipeline finish
+        if deadline.expired:
+            return None
+        try:
+            return await asyncio.to_thread(team_metrics.fetch_team, team)
+        except DeadlineExceeded:
+            return None
+
+    async def normalize(work: TeamWork) -> Optional[TeamWork]:
+        try:
+            return await team_metrics.normalize_team(work)
+        except DeadlineExceeded:
+            logging.warning(f"Left out team {work.team.slug}, its reviews were not all fetched before the deadline")
+            return None
+
+    async def aggregate(work: TeamWork) -> Dict[str, Any]:
+        work = team_metrics.aggregate_team(work)
+        results.append(work.result)
+        return work.result
+
+    if seed_cache:
+        await processor.port_api.seed_entity_cache(blueprint_id)
+    teams = await team_metrics.get_teams()
+    await Pipeline(
+        [
+            Stage("fetch", fetch, workers["fetch"]),
+            Stage("normalize", normalize, workers["normalize"]),
+            Stage("aggregate", aggregate),
+            Stage("upsert", lambda data: processor.upsert_team(data, blueprint_id), workers["upsert"]),
+        ],
+        queue_size=queue_size,
+    ).run(teams)
+    processor.port_api.save_entity_cache()
+    if deadline.active:
+        deadline.account(len(results), len(teams))
+        logging.info(f"Team metrics coverage: {deadline.annotate({'teams': len(teams), 'completed_teams': len(results)})}")
+    return results
 
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+    )
 
     try:
         parser = argparse.ArgumentParser(description="Calculate Team Metrics.")
@@ -262,24 +542,122 @@ if __name__ == "__main__":
             help="Base URL for self-hosted GitHub instance (e.g., https://api.github-example.com)",
             default=None,
         )
+        parser.add_argument(
+            "--backend",
+            default="list",
+            choices=["list", "search"],
+            help="List PRs per team repository or through the search API",
+        )
+        parser.add_argument(
+            "--warehouse",
+            default=None,
+            help="Read from this local warehouse database instead of the GitHub API",
+        )
+        parser.add_argument(
+            "--org-graph",
+            default=None,
+            help="Keep teams, members and repositories in this SQLite file and only refetch changed teams",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            default=None,
+            help="State file recording finished teams and PR pages, removed once the run succeeds",
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Continue the run recorded in --checkpoint instead of starting over",
+        )
+        parser.add_argument(
+            "--entity-cache",
+            default=None,
+            help="JSON file of pushed team entity digests, unchanged teams are not written again",
+        )
+        parser.add_argument(
+            "--seed-entity-cache",
+            action="store_true",
+            help="Read the team entities from Port first and skip upserts that would not change them",
+        )
+        for stage, default in (("fetch", 2), ("normalize", 2), ("upsert", 4)):
+            parser.add_argument(
+                f"--{stage}-workers",
+                type=int,
+                default=default,
+                help=f"Teams the {stage} stage works on at once",
+            )
+        parser.add_argument(
+            "--queue-size",
+            type=int,
+            default=4,
+            help="Teams each stage may hold waiting for the next one",
+        )
+        parser.add_argument(
+            "--deadline",
+            type=parse_duration,
+            default=None,
+            help="Stop starting teams after this long (e.g. 300, 15m, 1h), teams left out are not written",
+        )
+        parser.add_argument(
+            "--share-requests",
+            action="store_true",
+            help=SHARE_REQUESTS_HELP,
+        )
         parser.add_argument("--port-client-id", help="Port Client ID", required=True)
         parser.add_argument(
             "--port-client-secret", help="Port Client Secret", required=True
         )
         args = parser.parse_args()
+        if args.resume and not args.checkpoint:
+            parser.error("--resume requires --checkpoint")
+        deadline.start(args.deadline)
+        if args.share_requests:
+            shared_requests.install()
 
         logging.info(f"Owner: {args.owner}")
         logging.info(f"Time Frame (in days): {args.time_frame}")
 
+        graph = None
+        if args.org_graph:
+            from org_graph import OrgGraph, OrgGraphLoader
+
+            graph = OrgGraph(args.org_graph)
         team_metrics = TeamMetrics(
-            args.owner, args.time_frame, token=args.token, github_host=args.github_host
+            args.owner,
+            args.time_frame,
+            token=args.token,
+            github_host=args.github_host,
+            backend=args.backend,
+            warehouse=Warehouse(args.warehouse) if args.warehouse else None,
+            org_graph=graph,
+            checkpoint=Checkpoint(
+                args.checkpoint,
+                f"team-metrics:{args.owner}:{args.time_frame}:{args.backend}",
+                resume=args.resume,
+            )
+            if args.checkpoint
+            else None,
         )
+        if graph and not args.warehouse:
+            OrgGraphLoader(team_metrics.github_client, graph).refresh(args.owner)
 
-        loop = asyncio.get_event_loop()
-        metrics = loop.run_until_complete(team_metrics.calculate_metrics_for_all_teams())
-        port_api = PortAPI(args.port_client_id, args.port_client_secret)
+        port_api = PortAPI(args.port_client_id, args.port_client_secret, entity_cache=args.entity_cache)
         processor = TeamEntityProcessor(port_api=port_api)
-        asyncio.run(processor.process_team_entities(metrics, args.team_blueprint))
+        asyncio.run(
+            run_team_pipeline(
+                team_metrics,
+                processor,
+                args.team_blueprint,
+                {"fetch": args.fetch_workers, "normalize": args.normalize_workers, "upsert": args.upsert_workers},
+                queue_size=args.queue_size,
+                seed_cache=args.seed_entity_cache,
+            )
+        )
+        logging.info(f"Lazy completion fetches: {lazy_completions.snapshot()}")
+        logging.info(f"Shared GitHub requests: {shared_requests.snapshot()}")
+        logging.info(f"Adaptive concurrency: {concurrency.snapshot()}")
+        # A cut run keeps its checkpoint so --resume picks up the rest
+        if team_metrics.checkpoint and not deadline.stopped:
+            team_metrics.checkpoint.finish()
         
     except Exception as e:
         logging.error(f"Failed to execute script: {e}")
@@ -0,0 +1,125 @@
+import datetime
+import os
+import json
+import argparse
+import logging
+from deadline import deadline, parse_duration
+from deployment_frequency import DeploymentFrequency
+from incidents import attribute_incidents, collect_incidents
+from warehouse import Warehouse
+from report_sink import ReportSink
+
+
+class ChangeFailureRate:
+    def __init__(
+        self,
+        owner,
+        repo,
+        workflows,
+        branch,
+        number_of_days,
+        token,
+        github_host,
+        incidents_file=None,
+        pagerduty_token=None,
+        services=None,
+        attribution_window_hours=None,
+        warehouse=None,
+    ):
+        self.owner, self.repo = owner, repo
+        self.branch = branch
+        self.number_of_days = number_of_days
+        self.incidents_file = incidents_file
+        self.pagerduty_token = pagerduty_token
+        self.services = services or []
+        self.attribution_window = (
+            datetime.timedelta(hours=attribution_window_hours)
+            if attribution_window_hours
+            else None
+        )
+        self.deployment_frequency = DeploymentFrequency(
+            owner, repo, workflows, branch, number_of_days, token, github_host, warehouse=warehouse
+        )
+
+    def get_incidents(self):
+        since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=self.number_of_days)
+        return collect_incidents(since, self.incidents_file, self.pagerduty_token, self.services)
+
+    @staticmethod
+    def compute_rating(change_failure_rate, total_deployments):
+        if not total_deployments:
+            return "None", "lightgrey"
+        elif change_failure_rate <= 15:
+            return "Elite", "brightgreen"
+        elif change_failure_rate <= 30:
+            return "High", "green"
+        elif change_failure_rate <= 45:
+            return "Medium", "yellow"
+        else:
+            return "Low", "red"
+
+    def __call__(self):
+        deployments = self.deployment_frequency.fetch_deployment_times()
+        incidents = self.get_incidents()
+        attributed = attribute_incidents(deployments, incidents, self.attribution_window)
+        failed_deployments = len(attributed)
+        change_failure_rate = failed_deployments / len(deployments) * 100 if deployments else 0
+        rating, color = self.compute_rating(change_failure_rate, len(deployments))
+
+        logging.info(f"Owner/Repo: {self.owner}/{self.repo}")
+        logging.info(f"Branch: {self.branch}")
+        logging.info(f"Number of days: {self.number_of_days}")
+        logging.info(f"{failed_deployments} of {len(deployments)} deployments were followed by an incident")
+        logging.info(f"Rating: {rating} ({color})")
+
+        return json.dumps(deadline.annotate({
+            "change_failure_rate": round(change_failure_rate, 2),
+            "rating": rating,
+            "total_deployments": len(deployments),
+            "failed_deployments": failed_deployments,
+            "total_incidents": len(incidents),
+            "attributed_incidents": sum(len(items) for items in attributed.values()),
+        }), default=str)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description='Calculate Change Failure Rate.')
+    parser.add_argument('--owner', required=True, help='Owner of the repository')
+    parser.add_argument('--repo', required=True, help='Repository name')
+    parser.add_argument('--token', required=True, help='GitHub token')
+    parser.add_argument(
+            "--github-host",
+            help="Base URL for self-hosted GitHub instance (e.g., https://api.example-github.com)",
+            default=None,
+        )
+    parser.add_argument('--workflows', required=True, help='GitHub workflows as a JSON string.')
+    parser.add_argument('--branch', default='main', help='Branch name')
+    parser.add_argument('--time-frame', type=int, default=30, help='Time Frame in days')
+    parser.add_argument('--incidents-file', default=None, help='PagerDuty incidents JSON export')
+    parser.add_argument('--pagerduty-token', default=None, help='PagerDuty API token, used when no incidents file is given')
+    parser.add_argument('--service', action='append', required=True, help='PagerDuty service id or name of this repository, can be repeated')
+    parser.add_argument('--attribution-window', type=float, default=None, help='Only blame a deployment for incidents starting within this many hours of it')
+    parser.add_argument('--platform', default='github-actions', choices=['github-actions', 'self-hosted'], help='CI/CD platform type')
+    parser.add_argument('--warehouse', default=None, help='Read deployments from this local warehouse database instead of the GitHub API')
+    parser.add_argument('--report-file', default=None, help='Append the report to this NDJSON file instead of GITHUB_ENV')
+    parser.add_argument('--deadline', type=parse_duration, default=None, help='Stop fetching after this long (e.g. 300, 15m, 1h) and report what was covered')
+    args = parser.parse_args()
+    deadline.start(args.deadline)
+
+    change_failure_rate = ChangeFailureRate(
+        args.owner, args.repo, args.workflows, args.branch, args.time_frame,
+        token=args.token, github_host=args.github_host,
+        incidents_file=args.incidents_file, pagerduty_token=args.pagerduty_token,
+        services=args.service, attribution_window_hours=args.attribution_window,
+        warehouse=Warehouse(args.warehouse) if args.warehouse else None,
+    )
+    report = change_failure_rate()
+    print(report)
+
+    if args.report_file:
+        sink = ReportSink(args.report_file)
+        sink.add("change_failure_rate", args.owner, args.repo, report, time_frame=args.time_frame, branch=args.branch)
+        sink.flush()
+    elif args.platform == "github-actions":
+       with open(os.getenv("GITHUB_ENV"), "a") as github_env:
+           github_env.write(f"change_failure_rate_report={report}\n")
@@ -0,0 +1,77 @@
+import datetime
+import json
+import logging
+import os
+import threading
+from typing import Any, Optional
+
+from warehouse import format_timestamp, parse_timestamp
+
+
+class Checkpoint:
+    """Completed units and pagination cursors of a long run, rewritten atomically after every step.
+
+    A resumed run keeps the window of the run it continues, so partials
+    computed before and after the restart cover the same dates. The file is
+    removed once the run finishes.
+    """
+
+    def __init__(self, path: Optional[str], run_key: str, resume: bool = False) -> None:
+        self.path = path
+        self.run_key = run_key
+        self.lock = threading.Lock()
+        state = None
+        if resume and path and os.path.exists(path):
+            with open(path) as state_file:
+                state = json.load(state_file)
+            if state.get("run_key") != run_key:
+                logging.warning(f"Ignoring checkpoint {path} of another run ({state.get('run_key')})")
+                state = None
+        if state is None:
+            state = {
+                "run_key": run_key,
+                "started_at": format_timestamp(datetime.datetime.now(datetime.timezone.utc)),
+                "completed": {},
+                "cursors": {},
+            }
+        else:
+            logging.info(
+                f"Resuming {run_key} from {path}: {len(state['completed'])} units done, "
+                f"{len(state['cursors'])} in progress"
+            )
+        self.state = state
+
+    @property
+    def started_at(self) -> datetime.datetime:
+        return parse_timestamp(self.state["started_at"])
+
+    def completed(self, unit: str) -> Optional[Any]:
+        with self.lock:
+            return self.state["completed"].get(unit)
+
+    def complete(self, unit: str, result: Any) -> None:
+        with self.lock:
+            self.state["completed"][unit] = result
+            self.state["cursors"].pop(unit, None)
+            self.save()
+
+    def cursor(self, unit: str) -> Optional[Any]:
+        with self.lock:
+            return self.state["cursors"].get(unit)
+
+    def advance(self, unit: str, cursor: Any) -> None:
+        with self.lock:
+            self.state["cursors"][unit] = cursor
+            self.save()
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        temporary_path = f"{self.path}.tmp"
+        with open(temporary_path, "w") as state_file:
+            json.dump(self.state, state_file, separators=(",", ":"), default=str)
+        os.replace(temporary_path, self.path)
+
+    def finish(self) -> None:
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
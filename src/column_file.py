@@ -0,0 +1,282 @@
+import argparse
+import array
+import bisect
+import datetime
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+from payloads import epoch
+from warehouse import Warehouse
+
+
+MAGIC = b"DORACOL1"
+# Missing timestamps, counts and strings
+MISSING = -1
+ALIGNMENT = 8
+
+# Columns holding string table ids, the others are int64 values or epoch seconds
+STRING_COLUMNS = {"repository", "base_branch", "workflow_file", "head_branch"}
+TABLES = {
+    "pull_requests": (
+        "repository", "number", "base_branch", "created_at", "merged_at",
+        "first_commit_at", "last_commit_at", "commits", "additions", "deletions",
+    ),
+    "workflow_runs": (
+        "repository", "id", "workflow_id", "workflow_file", "head_branch", "created_at", "updated_at",
+    ),
+}
+TIMESTAMP_COLUMNS = {"created_at", "merged_at", "first_commit_at", "last_commit_at", "updated_at"}
+
+EXPORT_QUERIES = {
+    "pull_requests": """
+        SELECT p.repository, p.number, p.base_branch, p.created_at, p.merged_at,
+            (SELECT c.committed_at FROM pull_request_commits pc
+                JOIN commits c ON c.repository = pc.repository AND c.sha = pc.sha
+                WHERE pc.repository = p.repository AND pc.number = p.number
+                ORDER BY pc.position LIMIT 1) AS first_commit_at,
+            (SELECT c.committed_at FROM pull_request_commits pc
+                JOIN commits c ON c.repository = pc.repository AND c.sha = pc.sha
+                WHERE pc.repository = p.repository AND pc.number = p.number
+                ORDER BY pc.position DESC LIMIT 1) AS last_commit_at,
+            p.commits, p.additions, p.deletions
+        FROM pull_requests p ORDER BY p.repository, p.created_at
+    """,
+    "workflow_runs": """
+        SELECT repository, id, workflow_id, workflow_file, head_branch, created_at, updated_at
+        FROM workflow_runs ORDER BY repository, created_at
+    """,
+}
+
+
+def int64_bytes(values: List[int]) -> bytes:
+    column = array.array("q", values)
+    if sys.byteorder != "little":
+        column.byteswap()
+    return column.tobytes()
+
+
+def export_columns(warehouse: Warehouse, path: str) -> Dict[str, int]:
+    """Writes the warehouse's PRs and workflow runs as a column file, returns the rows per table.
+
+    Layout: magic, header length, JSON header, then 8-byte aligned
+    little-endian int64 columns and the string table (offsets, UTF-8 blob).
+    Rows are sorted by repository and the header keeps each repository's
+    row range, so readers slice instead of scanning.
+    """
+    strings: Dict[str, int] = {}
+
+    def string_id(value: Optional[str]) -> int:
+        if value is None:
+            return MISSING
+        return strings.setdefault(value, len(strings))
+
+    def cell(name: str, value: Any) -> int:
+        if name in STRING_COLUMNS:
+            return string_id(value)
+        if name in TIMESTAMP_COLUMNS:
+            value = epoch(value)
+        return MISSING if value is None else int(value)
+
+    tables: Dict[str, Dict[str, Any]] = {}
+    blocks: List[bytes] = []
+    for table, names in TABLES.items():
+        rows = warehouse.select(EXPORT_QUERIES[table])
+        ranges: Dict[str, List[int]] = {}
+        for index, row in enumerate(rows):
+            ranges.setdefault(row["repository"], [index, index])[1] = index + 1
+        columns = {}
+        for name in names:
+            columns[name] = len(blocks)
+            blocks.append(int64_bytes([cell(name, row[name]) for row in rows]))
+        tables[table] = {"rows": len(rows), "columns": columns, "repositories": ranges}
+
+    encoded = [value.encode() for value in strings]
+    offsets = [0]
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+    string_offsets = len(blocks)
+    blocks.append(int64_bytes(offsets))
+    blocks.append(b"".join(encoded))
+
+    # Block offsets are relative to the aligned end of the header
+    positions = []
+    start = 0
+    for block in blocks:
+        positions.append([start, len(block)])
+        start = align(start + len(block))
+    header = {
+        "tables": tables,
+        "strings": {"count": len(encoded), "offsets": string_offsets},
+        "blocks": positions,
+    }
+    header_bytes = json.dumps(header).encode()
+    data_start = align(len(MAGIC) + 4 + len(header_bytes))
+
+    with open(f"{path}.tmp", "wb") as column_file:
+        column_file.write(MAGIC + struct.pack("<I", len(header_bytes)) + header_bytes)
+        for (position, _), block in zip(positions, blocks):
+            column_file.write(b"\0" * (data_start + position - column_file.tell()))
+            column_file.write(block)
+    os.replace(f"{path}.tmp", path)
+    return {table: description["rows"] for table, description in tables.items()}
+
+
+def align(position: int) -> int:
+    return -(-position // ALIGNMENT) * ALIGNMENT
+
+
+class ColumnFile:
+    """Read-only memory map of a column file written by export_columns.
+
+    Columns are views into the map, nothing is copied or parsed, so
+    processes opening the same file share its pages. Pickling reopens the
+    file by path, which lets it be handed to process pool workers.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as column_file:
+            self.map = mmap.mmap(column_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.map[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a column file")
+        (header_length,) = struct.unpack_from("<I", self.map, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.header = json.loads(self.map[start:start + header_length])
+        self.data_start = align(start + header_length)
+        self.tables = self.header["tables"]
+        self._strings: Optional[List[str]] = None
+        self._string_ids: Optional[Dict[str, int]] = None
+
+    def __reduce__(self) -> Tuple[Any, Tuple[str]]:
+        return ColumnFile, (self.path,)
+
+    def block(self, index: int) -> memoryview:
+        position, length = self.header["blocks"][index]
+        position += self.data_start
+        return memoryview(self.map)[position:position + length]
+
+    def column(self, table: str, name: str) -> memoryview:
+        view = self.block(self.tables[table]["columns"][name])
+        if sys.byteorder != "little":
+            # Big-endian hosts get a swapped copy instead of a view
+            swapped = array.array("q", view.tobytes())
+            swapped.byteswap()
+            return memoryview(swapped)
+        return view.cast("q")
+
+    def arrays(self, table: str) -> Dict[str, Any]:
+        """NumPy views of a table's columns, numpy is optional and only needed here."""
+        import numpy
+
+        description = self.tables[table]
+        return {
+            name: numpy.frombuffer(
+                self.map,
+                dtype="<i8",
+                count=description["rows"],
+                offset=self.data_start + self.header["blocks"][index][0],
+            )
+            for name, index in description["columns"].items()
+        }
+
+    @property
+    def strings(self) -> List[str]:
+        if self._strings is None:
+            offsets = self.block(self.header["strings"]["offsets"]).cast("q")
+            blob = self.block(self.header["strings"]["offsets"] + 1)
+            self._strings = [
+                bytes(blob[offsets[index]:offsets[index + 1]]).decode()
+                for index in range(self.header["strings"]["count"])
+            ]
+        return self._strings
+
+    def string_id(self, value: str) -> int:
+        if self._string_ids is None:
+            self._string_ids = {string: index for index, string in enumerate(self.strings)}
+        return self._string_ids.get(value, MISSING)
+
+    def rows(self, table: str, repository: str) -> range:
+        start, end = self.tables[table]["repositories"].get(repository, (0, 0))
+        return range(start, end)
+
+    def workflow_filter(self, workflows: List[Any]) -> Optional[Tuple[set, set]]:
+        if not workflows:
+            return None
+        names = [str(workflow) for workflow in workflows]
+        ids = {int(name) for name in names if name.lstrip("-").isdigit()}
+        return ids, {self.string_id(name) for name in names} - {MISSING}
+
+    def workflow_run_rows(
+        self, repository: str, branch: str, workflows: List[Any], since: datetime.datetime
+    ) -> List[int]:
+        # Rows of a repository are sorted by created_at, the window start is
+        # found by bisection
+        rows = self.rows("workflow_runs", repository)
+        created = self.column("workflow_runs", "created_at")
+        first = bisect.bisect_right(created, int(since.timestamp()), rows.start, rows.stop)
+        branch_id = self.string_id(branch)
+        head_branch = self.column("workflow_runs", "head_branch")
+        selected = self.workflow_filter(workflows)
+        workflow_ids = self.column("workflow_runs", "workflow_id")
+        workflow_files = self.column("workflow_runs", "workflow_file")
+        return [
+            row
+            for row in range(first, rows.stop)
+            if head_branch[row] == branch_id
+            and (selected is None or workflow_ids[row] in selected[0] or workflow_files[row] in selected[1])
+        ]
+
+    def deployment_times(
+        self, repository: str, branch: str, workflows: List[Any], since: datetime.datetime
+    ) -> List[datetime.datetime]:
+        created = self.column("workflow_runs", "created_at")
+        return [
+            datetime.datetime.fromtimestamp(created[row], datetime.timezone.utc)
+            for row in self.workflow_run_rows(repository, branch, workflows, since)
+        ]
+
+    def workflow_durations(
+        self, repository: str, branch: str, workflows: List[Any], since: datetime.datetime
+    ) -> Tuple[int, float]:
+        rows = self.workflow_run_rows(repository, branch, workflows, since)
+        created = self.column("workflow_runs", "created_at")
+        updated = self.column("workflow_runs", "updated_at")
+        seconds = sum(updated[row] - created[row] for row in rows if updated[row] != MISSING)
+        return len(rows), seconds / 3600
+
+    def pull_request_lead_times(
+        self,
+        repository: str,
+        branch: str,
+        since: datetime.datetime,
+        commit_counting_method: str = "last",
+    ) -> Tuple[int, float]:
+        branch_id = self.string_id(branch)
+        base_branch = self.column("pull_requests", "base_branch")
+        merged = self.column("pull_requests", "merged_at")
+        committed = self.column(
+            "pull_requests", "first_commit_at" if commit_counting_method == "first" else "last_commit_at"
+        )
+        cutoff = int(since.timestamp())
+        count, seconds = 0, 0
+        for row in self.rows("pull_requests", repository):
+            if base_branch[row] == branch_id and merged[row] > cutoff and committed[row] != MISSING:
+                count += 1
+                seconds += merged[row] - committed[row]
+        return count, seconds / 3600
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Export the warehouse's PRs and workflow runs as a memory-mappable column file.")
+    parser.add_argument("--database", required=True, help="Path to the SQLite warehouse")
+    parser.add_argument("--output", required=True, help="Column file to write")
+    args = parser.parse_args()
+
+    rows = export_columns(Warehouse(args.database), args.output)
+    logging.info(f"Wrote {rows} rows to {args.output} ({os.path.getsize(args.output)} bytes)")
@@ -0,0 +1,99 @@
+import datetime
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from warehouse import format_timestamp, parse_timestamp
+
+
+class CommitDateIndex:
+    """Per-repository SHA -> committer date memo, optionally persisted as JSON between runs."""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self.lock = threading.Lock()
+        self.repositories: Dict[str, Dict[str, Dict[str, str]]] = {}
+        if path and os.path.exists(path):
+            with open(path) as index_file:
+                self.repositories = json.load(index_file)
+            logging.info(f"Loaded commit index for {len(self.repositories)} repositories from {path}")
+
+    def repository(self, repository: str) -> Dict[str, Dict[str, str]]:
+        return self.repositories.setdefault(repository, {"commits": {}, "first_commits": {}})
+
+    def commit_date(self, repository: str, sha: str) -> Optional[datetime.datetime]:
+        with self.lock:
+            return parse_timestamp(self.repository(repository)["commits"].get(sha))
+
+    def first_commit(self, repository: str, head_sha: str) -> Optional[str]:
+        with self.lock:
+            return self.repository(repository)["first_commits"].get(head_sha)
+
+    def record(
+        self, repository: str, sha: str, date: datetime.datetime, head_sha: Optional[str] = None
+    ) -> None:
+        with self.lock:
+            entries = self.repository(repository)
+            entries["commits"][sha] = format_timestamp(date)
+            if head_sha:
+                entries["first_commits"][head_sha] = sha
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self.lock:
+            temporary_path = f"{self.path}.tmp"
+            with open(temporary_path, "w") as index_file:
+                json.dump(self.repositories, index_file, separators=(",", ":"))
+            os.replace(temporary_path, self.path)
+
+
+class CommitDateResolver:
+    """Resolves the first or last commit date of a pull request with at most one request each."""
+
+    def __init__(self, repo_object: Any, index: Optional[CommitDateIndex] = None) -> None:
+        self.repo_object = repo_object
+        self.repository = repo_object.full_name
+        self.index = index or CommitDateIndex()
+        self.requests = 0
+
+    def request(self, url: str, parameters: Dict[str, Any]) -> Any:
+        self.requests += 1
+        _, data = self.repo_object._requester.requestJsonAndCheck("GET", url, parameters=parameters)
+        return data
+
+    @staticmethod
+    def committer_date(commit: Dict[str, Any]) -> datetime.datetime:
+        return parse_timestamp(commit["commit"]["committer"]["date"])
+
+    def last_commit_date(self, pr: Any) -> datetime.datetime:
+        # The last commit of a PR is its head, a single-item commits page
+        # starting at it carries the date
+        head_sha = pr.head.sha
+        date = self.index.commit_date(self.repository, head_sha)
+        if date is None:
+            commits = self.request(f"{self.repo_object.url}/commits", {"sha": head_sha, "per_page": 1})
+            date = self.committer_date(commits[0])
+            self.index.record(self.repository, head_sha, date)
+        return date
+
+    def first_commit_date(self, pr: Any) -> datetime.datetime:
+        head_sha = pr.head.sha
+        first_sha = self.index.first_commit(self.repository, head_sha)
+        if first_sha:
+            return self.index.commit_date(self.repository, first_sha)
+        # Compare pages list commits oldest first from the merge-base, the
+        # first item of the first page is the PR's first commit
+        comparison = self.request(
+            f"{self.repo_object.url}/compare/{pr.base.sha}...{head_sha}", {"per_page": 1}
+        )
+        if comparison["commits"]:
+            commit = comparison["commits"][0]
+        else:
+            # Base moved past the head after the merge
+            commit = self.request(f"{pr.url}/commits", {"per_page": 1})[0]
+        date = self.committer_date(commit)
+        self.index.record(self.repository, commit["sha"], date, head_sha=head_sha)
+        return date
@@ -0,0 +1,91 @@
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600}
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def parse_duration(value: str) -> float:
+    """Seconds in "300", "90s", "15m" or "1.5h"."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smh]?)\s*", value)
+    if not match:
+        raise ValueError(f"Invalid duration {value!r}, expected e.g. 300, 90s, 15m or 1h")
+    return float(match.group(1)) * DURATION_UNITS[match.group(2) or "s"]
+
+
+class Deadline:
+    """Wall-clock budget of a best-effort run.
+
+    Calculators stop starting new work once it passes and account what they
+    finished against what they planned, the report then carries the ratio
+    and a partial flag.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.expires_at: Optional[float] = None
+        self.done = 0
+        self.planned = 0
+        self.stopped = False
+
+    def start(self, seconds: Optional[float]) -> None:
+        with self.lock:
+            self.expires_at = time.monotonic() + seconds if seconds else None
+            self.done = self.planned = 0
+            self.stopped = False
+
+    @property
+    def active(self) -> bool:
+        return self.expires_at is not None
+
+    def remaining(self) -> Optional[float]:
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        if self.expires_at is None or time.monotonic() < self.expires_at:
+            return False
+        with self.lock:
+            if not self.stopped:
+                logging.warning("Deadline reached, finishing with the data fetched so far")
+            self.stopped = True
+        return True
+
+    def check(self) -> None:
+        if self.expired:
+            raise DeadlineExceeded()
+
+    def allows_wait(self, seconds: float) -> bool:
+        remaining = self.remaining()
+        if remaining is None or seconds < remaining:
+            return True
+        with self.lock:
+            self.stopped = True
+        logging.warning(f"Waiting {seconds:.0f}s would pass the deadline, giving up on the request")
+        return False
+
+    def account(self, done: int, planned: int) -> None:
+        with self.lock:
+            self.done += done
+            self.planned += planned
+
+    def annotate(self, report: Dict[str, Any]) -> Dict[str, Any]:
+        """Adds the work accounted since the previous report, reports only change shape under a deadline."""
+        if self.active:
+            with self.lock:
+                report["completeness"] = round(self.done / self.planned, 4) if self.planned else 1.0
+                report["partial"] = self.stopped
+                self.done = self.planned = 0
+        return report
+
+
+deadline = Deadline()
@@ -1,46 +1,59 @@
 import datetime
 import os
 import json
-from github import Github
 import argparse
 import logging
+from column_file import ColumnFile
+from deadline import DeadlineExceeded, deadline, parse_duration
+from git_source import GitRepository
+from warehouse import Warehouse, parse_timestamp
+from report_sink import ReportSink
 
 #Throttling
 SECONDS_BETWEEN_REQUESTS=0.12
 SECONDS_BETWEEN_WRITES=0.5
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
 class DeploymentFrequency:
-    def __init__(self, owner, repo, workflows, branch, number_of_days, token, github_host):
+    def __init__(self, owner, repo, workflows, branch, number_of_days, token, github_host, warehouse=None, git_repository=None, deployment_tags=None, dataset=None, columns=None, since=None):
         self.owner, self.repo = owner, repo
+        self.since = since
         self.branch = branch
         self.number_of_days = number_of_days
         self.token = token
-        try:
-            self.github = (
-                Github(login_or_token=token, base_url=github_host)
-                if github_host
-                else Github(token)
-            )
-            self.owner = owner
-        except GithubException as e:
-            logging.error(f"Failed to initialize GitHub client: {e}")
-            raise
-        except Exception as e:
-            logging.error(
-                f"Unexpected error during initialization: {e} - verify that your github credentials are valid"
-            )
-            raise
-        self.repo_object = self.github.get_repo(f"{self.owner}/{self.repo}")
+        self.warehouse = warehouse
+        self.git_repository = git_repository
+        self.deployment_tags = deployment_tags
+        self.dataset = dataset
+        self.columns = columns
+        if dataset is not None:
+            self.repo_object = dataset.repo
+        elif warehouse is None and git_repository is None and columns is None:
+            # PyGithub is only loaded when the API backend is used
+            from github import GithubException
+            from github_auth import create_github
+
+            try:
+                self.github = create_github(token, github_host)
+                self.owner = owner
+            except GithubException as e:
+                logging.error(f"Failed to initialize GitHub client: {e}")
+                raise
+            except Exception as e:
+                logging.error(
+                    f"Unexpected error during initialization: {e} - verify that your github credentials are valid"
+                )
+                raise
+            self.repo_object = self.github.get_repo(f"{self.owner}/{self.repo}")
         try:
             self.workflows = json.loads(workflows)
-        except JSONDecodeError:
+        except json.JSONDecodeError:
             logging.error("Invalid JSON format for workflows. Using an empty list.")
             self.workflows = []
 
     def get_workflows(self):
-        if not self.workflows:
+        if not self.workflows and self.dataset:
+            workflow_ids = self.dataset.workflows()
+        elif not self.workflows:
             workflows = self.repo_object.get_workflows()
             workflow_ids = [workflow.id for workflow in workflows]
             logging.info(f"Found {len(workflow_ids)} workflows in Repo")
@@ -49,24 +62,90 @@ class DeploymentFrequency:
             logging.info(f"Workflows: {workflow_ids}")
         return workflow_ids
 
+    def window_start(self):
+        if self.since is not None:
+            return self.since
+        return datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=self.number_of_days)
+
     def fetch_workflow_runs(self):
-        workflow_ids = self.get_workflows()
+        if self.warehouse:
+            return self.query_workflow_runs()
+        if self.git_repository:
+            return self.query_git_deployments()
+        if self.columns:
+            return self.query_column_runs()
         workflow_runs_list = []
         unique_dates = set()
-        for workflow_id in workflow_ids:
-            for run in self.repo_object.get_workflow(workflow_id).get_runs():
-                run_date = run.created_at.replace(tzinfo=None)
-                if run.head_branch == self.branch and run_date > datetime.datetime.now() - datetime.timedelta(days=self.number_of_days):
-                    workflow_runs_list.append(run)
-                    unique_dates.add(run_date.date())
+        workflow_ids = []
+        scanned = 0
+        # Runs come newest first, a deadline leaves out the oldest ones of the
+        # workflow it interrupts and the workflows after it
+        try:
+            workflow_ids = self.get_workflows()
+            since = self.window_start()
+            for workflow_id in workflow_ids:
+                if self.dataset:
+                    for run in self.dataset.workflow_runs(workflow_id, self.branch):
+                        workflow_runs_list.append(run)
+                        unique_dates.add(run.created_at.date())
+                else:
+                    runs = self.repo_object.get_workflow(workflow_id).get_runs(created=f">={since.date().isoformat()}")
+                    for run in runs:
+                        deadline.check()
+                        if run.head_branch == self.branch and run.created_at > since:
+                            workflow_runs_list.append(run)
+                            unique_dates.add(run.created_at.date())
+                scanned += 1
+                deadline.check()
+        except DeadlineExceeded:
+            logging.warning(f"Scanned the runs of {scanned} of {len(workflow_ids)} workflows before the deadline")
+        # Not getting to list the workflows counts as one unit missed
+        deadline.account(scanned, len(workflow_ids) if workflow_ids else int(deadline.stopped))
+        return workflow_runs_list, unique_dates
+
+    def query_workflow_runs(self):
+        since = self.window_start()
+        workflow_runs_list = self.warehouse.deployment_runs(
+            f"{self.owner}/{self.repo}", self.branch, self.workflows, since
+        )
+        unique_dates = {parse_timestamp(run["created_at"]).date() for run in workflow_runs_list}
         return workflow_runs_list, unique_dates
 
+    def query_column_runs(self):
+        since = self.window_start()
+        deployment_times = self.columns.deployment_times(
+            f"{self.owner}/{self.repo}", self.branch, self.workflows, since
+        )
+        return deployment_times, {deployed_at.date() for deployed_at in deployment_times}
+
+    def query_git_deployments(self):
+        # Tags matching the pattern are deployments, otherwise every merge
+        # into the branch is
+        since = self.window_start()
+        self.git_repository.fetch(since, tags=bool(self.deployment_tags))
+        if self.deployment_tags:
+            deployment_times = self.git_repository.tag_times(self.deployment_tags, since)
+        else:
+            deployment_times = sorted(merge.committed_at for merge in self.git_repository.merges(since))
+            if not deployment_times:
+                logging.warning(f"No merge commits on {self.branch} in the window, squash and rebase merges are not counted in git mode")
+        return deployment_times, {deployed_at.date() for deployed_at in deployment_times}
+
+    def fetch_deployment_times(self):
+        workflow_runs_list, _ = self.fetch_workflow_runs()
+        if self.warehouse:
+            return sorted(parse_timestamp(run["created_at"]) for run in workflow_runs_list)
+        if self.git_repository or self.columns:
+            return workflow_runs_list
+        return sorted(run.created_at for run in workflow_runs_list)
+
     def calculate_deployments_per_day(self, workflow_runs_list):
         if self.number_of_days > 0:
             return len(workflow_runs_list) / self.number_of_days
         return 0
 
-    def compute_rating(self, deployments_per_day):
+    @staticmethod
+    def compute_rating(deployments_per_day):
         daily_deployment = 1
         weekly_deployment = 1 / 7
         monthly_deployment = 1 / 30
@@ -94,16 +173,21 @@ class DeploymentFrequency:
         logging.info(f"Deployment frequency over the last {self.number_of_days} days is {deployments_per_day} per day")
         logging.info(f"Rating: {rating} ({color})")
 
-        return json.dumps({
+        return self.build_report(deployments_per_day, rating, len(workflow_runs_list), unique_dates)
+
+    @staticmethod
+    def build_report(deployments_per_day, rating, total_deployments, unique_dates):
+        return json.dumps(deadline.annotate({
             "deployment_frequency": round(deployments_per_day, 2),
             "rating": rating,
             "number_of_unique_deployment_days": len(unique_dates),
             "number_of_unique_deployment_weeks": len({date.isocalendar()[1] for date in unique_dates}),
             "number_of_unique_deployment_months": len({date.month for date in unique_dates}),
-            "total_deployments": len(workflow_runs_list),
-        }, default=str)
+            "total_deployments": total_deployments,
+        }), default=str)
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     parser = argparse.ArgumentParser(description='Calculate Deployment Frequency.')
     parser.add_argument('--owner', required=True, help='Owner of the repository')
     parser.add_argument('--repo', required=True, help='Repository name')
@@ -117,12 +201,26 @@ if __name__ == "__main__":
     parser.add_argument('--branch', default='main', help='Branch name')
     parser.add_argument('--time-frame', type=int, default=30, help='Time Frame in days')
     parser.add_argument('--platform', default='github-actions', choices=['github-actions', 'self-hosted'], help='CI/CD platform type')
+    parser.add_argument('--warehouse', default=None, help='Read from this local warehouse database instead of the GitHub API')
+    parser.add_argument('--git-repo', default=None, help='Count merges (or tags) in this local clone instead of workflow runs')
+    parser.add_argument('--columns', default=None, help='Read workflow runs from this column file (see column_file.py) instead of the GitHub API')
+    parser.add_argument('--deployment-tags', default=None, help='Tag pattern (e.g. v*) marking deployments in --git-repo')
+    parser.add_argument('--report-file', default=None, help='Append the report to this NDJSON file instead of GITHUB_ENV')
+    parser.add_argument('--deadline', type=parse_duration, default=None, help='Stop fetching after this long (e.g. 300, 15m, 1h) and report what was covered')
     args = parser.parse_args()
+    deadline.start(args.deadline)
 
-    deployment_frequency = DeploymentFrequency(args.owner, args.repo, args.workflows, args.branch, args.time_frame, token = args.token, github_host = args.github_host)
+    warehouse = Warehouse(args.warehouse) if args.warehouse else None
+    git_repository = GitRepository(args.git_repo, args.branch) if args.git_repo else None
+    columns = ColumnFile(args.columns) if args.columns else None
+    deployment_frequency = DeploymentFrequency(args.owner, args.repo, args.workflows, args.branch, args.time_frame, token = args.token, github_host = args.github_host, warehouse = warehouse, git_repository = git_repository, deployment_tags = args.deployment_tags, columns = columns)
     report = deployment_frequency()
     print(report)
     
-    if args.platform == "github-actions":
+    if args.report_file:
+        sink = ReportSink(args.report_file)
+        sink.add("deployment_frequency", args.owner, args.repo, report, time_frame=args.time_frame, branch=args.branch)
+        sink.flush()
+    elif args.platform == "github-actions":
        with open(os.getenv("GITHUB_ENV"), "a") as github_env:
            github_env.write(f"deployment_frequency_report={report}\n")
@@ -314,4 +314,21 @@ function GetFormattedMarkdownForNoResult([string] $workflows, [string] $numberOf
     return $markdown
 }
 
+#Delegate to the Python engine when it is installed. The PowerShell implementation below
+#stays as the fallback, set DORA_POWERSHELL_ENGINE=true to force it
+$python = Get-Command python3 -ErrorAction SilentlyContinue
+if ($python -and $env:DORA_POWERSHELL_ENGINE -ne "true")
+{
+    $engineArgs = @("$PSScriptRoot/dora_cli.py", "deploymentfrequency", "-ownerRepo", $ownerRepo, "-branch", $branch, "-numberOfDays", $numberOfDays)
+    if ($workflows) { $engineArgs += @("-workflows", $workflows) }
+    if ($patToken) { $engineArgs += @("-patToken", $patToken) }
+    if ($actionsToken) { $engineArgs += @("-actionsToken", $actionsToken) }
+    $engineOutput = & $python.Source @engineArgs
+    if ($LASTEXITCODE -eq 0)
+    {
+        return $engineOutput
+    }
+    Write-Host "Python engine failed, falling back to PowerShell"
+}
+
 main -ownerRepo $ownerRepo -workflows $workflows -branch $branch -numberOfDays $numberOfDays -patToken $patToken -actionsToken $actionsToken
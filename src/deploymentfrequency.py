@@ -1,10 +1,15 @@
-import datetime
+import argparse
 import os
 import base64
 import json
 import httpx
 from loguru import logger
+from deadline import deadline, parse_duration
+from github_auth import token_provider
+from github_client import SHARE_REQUESTS_HELP, request_key, shared_requests, token_identity
+from payloads import decode_workflow_runs, decode_workflows, epoch_date, loads
 import asyncio
+import time
 
 PAGE_SIZE = 100
 
@@ -19,11 +24,15 @@ class DeploymentFrequency:
         self.branch = branch
         self.number_of_days = number_of_days
         self.pat_token = pat_token
-        self.auth_header = self.get_auth_header
+        # Installation tokens expire, the header is built per request
+        self.current_token = token_provider(pat_token)
 
     @property
     def get_auth_header(self):
-        encoded_credentials = base64.b64encode(f":{self.pat_token}".encode()).decode()
+        return self.auth_header_for(self.current_token(self.workflow_url))
+
+    def auth_header_for(self, token):
+        encoded_credentials = base64.b64encode(f"x-access-token:{token}".encode()).decode()
         headers = {
             "Authorization": f"Basic {encoded_credentials}",
             "Content-Type": "application/json",
@@ -43,7 +52,18 @@ class DeploymentFrequency:
     #         except Exception as e:
     #             logger.error(f"An error occurred: {e}")
 
-    async def send_api_requests(self, url, params=None):
+    async def send_api_requests(self, url, params=None, decode=loads):
+        # With --share-requests, identical GETs made with the same token, like
+        # the workflow list fetched twice per call, share one response
+        token = self.current_token(url)
+        if not shared_requests.enabled:
+            return await self.request_api(url, params, decode, token)
+        return await shared_requests.acall(
+            request_key(token_identity(token), url, params, decode.__name__),
+            lambda: self.request_api(url, params, decode, token),
+        )
+
+    async def request_api(self, url, params=None, decode=loads, token=None):
         backoff_time = 1
         max_backoff_time = 60
 
@@ -51,13 +71,15 @@ class DeploymentFrequency:
             while True:
                 try:
                     response = await client.get(
-                        url, headers=self.auth_header, params=params
+                        url, headers=self.auth_header_for(token if token is not None else self.current_token(url)), params=params
                     )
 
                     if response.status_code == 429 or response.status_code == 403:
                         reset_time = float(response.headers.get("X-RateLimit-Reset", 0))
                         current_time = time.time()
                         wait_time = max(reset_time - current_time, 3)
+                        if not deadline.allows_wait(wait_time):
+                            break
                         logger.warning(
                             f"Rate limit exceeded. Waiting for {wait_time} seconds."
                         )
@@ -65,10 +87,13 @@ class DeploymentFrequency:
                         continue
 
                     response.raise_for_status()
-                    return response.json()
+                    # Straight from the bytes into the fields that are used
+                    return decode(response.content)
 
                 except httpx.HTTPStatusError as e:
                     if e.response.status_code in {500, 502, 503, 504}:
+                        if not deadline.allows_wait(backoff_time):
+                            break
                         logger.warning(
                             f"Server error ({e.response.status_code}). Retrying in {backoff_time} seconds."
                         )
@@ -84,33 +109,34 @@ class DeploymentFrequency:
 
     async def get_workflows(self):
         if not (self.workflows):
-            workflows = await self.send_api_requests(self.workflow_url)
-            if workflows:
-                workflow_ids = [workflow["id"] for workflow in workflows["workflows"]]
+            workflow_ids = await self.send_api_requests(self.workflow_url, decode=decode_workflows)
+            if workflow_ids:
                 logger.info(f"Found {len(workflow_ids)} workflows in Repo")
                 return workflow_ids
         else:
             return self.workflows
 
     async def fetch_workflow_runs(self):
-        workflow_ids = await self.get_workflows()
+        workflow_ids = await self.get_workflows() or []
         workflow_runs_list = []
         unique_dates = set()
+        scanned = 0
+        since = time.time() - self.number_of_days * 86400
         for workflow_id in workflow_ids:
+            if deadline.expired:
+                break
             runs_url = f"{self.workflow_url}/{workflow_id}/runs"
             params = {"per_page": PAGE_SIZE, "status": "completed"}
-            runs_response = await self.send_api_requests(runs_url, params=params)
-            for run in runs_response["workflow_runs"]:
-                run_date = datetime.datetime.strptime(
-                    run["created_at"], "%Y-%m-%dT%H:%M:%SZ"
-                )
-                if run[
-                    "head_branch"
-                ] == self.branch and run_date > datetime.datetime.now() - datetime.timedelta(
-                    days=self.number_of_days
-                ):
+            runs_response = await self.send_api_requests(runs_url, params=params, decode=decode_workflow_runs)
+            if not runs_response:
+                continue
+            scanned += 1
+            _, runs = runs_response
+            for run in runs:
+                if run.head_branch == self.branch and run.created_at > since:
                     workflow_runs_list.append(run)
-                    unique_dates.add(run_date.date())
+                    unique_dates.add(epoch_date(run.created_at))
+        deadline.account(scanned, len(workflow_ids))
         return workflow_runs_list, unique_dates
 
     def calculate_deployments_per_day(self, workflow_runs_list):
@@ -151,14 +177,14 @@ class DeploymentFrequency:
 
         print("Unique Dates", unique_dates)
         return json.dumps(
-            {
+            deadline.annotate({
                 "deployment_frequency": round(deployments_per_day, 2),
                 "rating": rating,
                 "number_of_unique_deployment_days": len(unique_dates),
                 "number_of_unique_deployment_weeks": len({date.isocalendar()[1] for date in unique_dates}),
                 "number_of_unique_deployment_month":len({date.month for date in unique_dates}),
                 "total_deployments": len(workflow_runs_list),
-            },
+            }),
             default=str,
         )
 
@@ -170,6 +196,23 @@ if __name__ == "__main__":
     workflows = os.getenv("WORKFLOWS", "[]")
     branch = os.getenv("BRANCH", "main")
     time_frame = int(os.getenv("TIMEFRAME_IN_DAYS", 30))
+    parser = argparse.ArgumentParser(description="Calculate Deployment Frequency through the GitHub REST API.")
+    parser.add_argument(
+        "--deadline",
+        type=parse_duration,
+        default=os.getenv("DEADLINE"),
+        help="Stop fetching after this long (e.g. 300, 15m, 1h) and report what was covered, defaults to $DEADLINE",
+    )
+    parser.add_argument(
+        "--share-requests",
+        action="store_true",
+        default=bool(os.getenv("SHARE_REQUESTS")),
+        help=f"{SHARE_REQUESTS_HELP}, defaults to $SHARE_REQUESTS",
+    )
+    args = parser.parse_args()
+    deadline.start(args.deadline)
+    if args.share_requests:
+        shared_requests.enable()
 
     deployment_frequency = DeploymentFrequency(
         owner, repo, workflows, branch, time_frame, pat_token
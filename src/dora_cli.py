@@ -0,0 +1,182 @@
+import argparse
+import json
+import logging
+import os
+import sys
+from typing import List, Optional, Tuple
+from urllib.parse import quote
+
+from github import Github
+from github_auth import APP_ID_ENV, APP_INSTALLATION_IDS_ENV, APP_PRIVATE_KEY_ENV, create_github
+from commit_index import CommitDateIndex
+from deployment_frequency import DeploymentFrequency
+from lead_time_for_changes import LeadTimeForChanges
+
+
+# Same marker the PowerShell scripts print before their JSON result
+JSON_MARKER = "###JSON_START###"
+
+
+def badge_url(label: str, message: str, color: str) -> str:
+    return f"https://img.shields.io/badge/frequency-{quote(message)}-{color}?logo=github&label={quote(label)}"
+
+
+def display_deployment_frequency(deployments_per_day: float) -> Tuple[str, str, float, str]:
+    # Rating, color, metric and unit as deploymentfrequency.ps1 shows them
+    if deployments_per_day <= 0:
+        return "None", "lightgrey", 0, "per day"
+    if deployments_per_day > 1:
+        return "Elite", "brightgreen", round(deployments_per_day, 2), "per day"
+    if deployments_per_day >= 1 / 7:
+        return "High", "green", round(deployments_per_day * 7, 2), "times per week"
+    if deployments_per_day >= 1 / 30:
+        return "Medium", "yellow", round(deployments_per_day * 30, 2), "times per month"
+    if deployments_per_day > 1 / 365:
+        return "Low", "red", round(deployments_per_day * 30, 2), "times per month"
+    return "Low", "red", round(deployments_per_day * 365, 2), "times per year"
+
+
+def display_lead_time(lead_time_in_hours: float) -> Tuple[str, str, float, str]:
+    # Rating, color, metric and unit as leadtimeforchanges.ps1 shows them
+    if lead_time_in_hours <= 0:
+        return "None", "lightgrey", 0, "hours"
+    if lead_time_in_hours < 1:
+        return "Elite", "brightgreen", round(lead_time_in_hours * 60, 2), "minutes"
+    if lead_time_in_hours <= 24:
+        return "Elite", "brightgreen", round(lead_time_in_hours, 2), "hours"
+    if lead_time_in_hours <= 24 * 30:
+        return "High", "green", round(lead_time_in_hours / 24, 2), "days"
+    if lead_time_in_hours <= 24 * 30 * 6:
+        return "Medium", "yellow", round(lead_time_in_hours / 24 / 30, 2), "months"
+    return "Low", "red", round(lead_time_in_hours / 24 / 30, 2), "months"
+
+
+def resolve_workflows(github: Github, owner_repo: str, workflows: str) -> Tuple[List[int], List[str]]:
+    # The PowerShell parameters name workflows, the engine works with ids
+    names = [name.strip() for name in workflows.split(",") if name.strip()]
+    ids, found = [], []
+    for workflow in github.get_repo(owner_repo).get_workflows():
+        if workflow.name in names and workflow.id not in ids:
+            ids.append(workflow.id)
+            found.append(workflow.name)
+    return ids, found
+
+
+def deployment_frequency(args: argparse.Namespace, token: Optional[str]) -> List[str]:
+    owner, repo = args.ownerRepo.split("/", 1)
+    workflow_ids, workflow_names = resolve_workflows(create_github(token), args.ownerRepo, args.workflows)
+    report = json.loads(
+        DeploymentFrequency(
+            owner, repo, json.dumps(workflow_ids), args.branch, args.numberOfDays, token=token, github_host=None
+        )()
+    )
+    # The report rounds to two decimals, displays start from the exact rate
+    deployments_per_day = report["total_deployments"] / args.numberOfDays if args.numberOfDays > 0 else 0
+    rating, color, display_metric, display_unit = display_deployment_frequency(deployments_per_day)
+    result = {
+        "DeploymentFrequency": round(deployments_per_day * 7, 2),
+        "Rating": rating,
+        "NumberOfUniqueDeploymentDays": report["number_of_unique_deployment_days"],
+        "TotalDeployments": report["total_deployments"],
+    }
+    label = "Deployment frequency"
+    if report["total_deployments"] and args.numberOfDays > 0:
+        markdown = [
+            f"![Deployment Frequency]({badge_url(label, f'{display_metric} {display_unit}', color)})",
+            "**Definition:** For the primary application or service, how often is it successfully deployed to production.",
+            f"**Results:** Deployment frequency is **{display_metric} {display_unit}** with a **{rating}** rating, over the last **{args.numberOfDays} days**.",
+            "**Details**:",
+            f"- Repository: {args.ownerRepo} using {args.branch} branch",
+            f"- Workflow(s) used: {', '.join(workflow_names)}",
+            f"- Active days of deployment: {report['number_of_unique_deployment_days']} days",
+            "---",
+        ]
+    else:
+        markdown = [
+            f"![Deployment Frequency]({badge_url(label, 'none', 'lightgrey')})",
+            "",
+            f"No data to display for {args.ownerRepo} for workflow(s) {args.workflows} over the last {args.numberOfDays} days",
+            "",
+            "---",
+        ]
+    return [JSON_MARKER, json.dumps(result, separators=(",", ":")), "", "", *markdown]
+
+
+def lead_time_for_changes(args: argparse.Namespace, token: Optional[str]) -> List[str]:
+    owner, repo = args.ownerRepo.split("/", 1)
+    workflow_ids, workflow_names = resolve_workflows(create_github(token), args.ownerRepo, args.workflows)
+    commit_index = CommitDateIndex(args.commitIndex)
+    report = json.loads(
+        LeadTimeForChanges(
+            owner, repo, json.dumps(workflow_ids), args.branch, args.numberOfDays, token=token, github_host=None,
+            commit_counting_method=args.commitCountingMethod or "last", ignore_workflows=not workflow_ids,
+            commit_index=commit_index,
+        )()
+    )
+    commit_index.save()
+    lead_time_in_hours = report["lead_time_for_changes_in_hours"]
+    rating, color, display_metric, display_unit = display_lead_time(lead_time_in_hours)
+    result = {
+        "PRAverageTimeDuration": report["pr_average_time_duration"],
+        "WorkflowAverageTimeDuration": report["workflow_average_time_duration"],
+        "LeadTimeForChangesInHours": lead_time_in_hours,
+        "Rating": rating,
+    }
+    label = "Lead time for changes"
+    if lead_time_in_hours > 0 and args.numberOfDays > 0:
+        markdown = [
+            f"![Lead time for changes]({badge_url(label, f'{display_metric} {display_unit}', color)})",
+            "**Definition:** For the primary application or service, how long does it take to go from code committed to code successfully running in production.",
+            f"**Results:** Lead time for changes is **{display_metric} {display_unit}** with a **{rating}** rating, over the last **{args.numberOfDays} days**.",
+            "**Details**:",
+            f"- Repository: {args.ownerRepo} using {args.branch} branch",
+            f"- Workflow(s) used: {', '.join(workflow_names)}",
+            "---",
+        ]
+    else:
+        markdown = [
+            f"![Lead time for changes]({badge_url(label, 'none', 'lightgrey')})",
+            "",
+            f"No data to display for {args.ownerRepo} over the last {args.numberOfDays} days",
+            "",
+            "---",
+        ]
+    return [JSON_MARKER, json.dumps(result, separators=(",", ":")), "", "", *markdown]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    # Parameter names follow deploymentfrequency.ps1 and leadtimeforchanges.ps1
+    # so their callers can switch engines without changes
+    parser = argparse.ArgumentParser(description="DORA metrics with the PowerShell scripts' parameters and output.")
+    subparsers = parser.add_subparsers(dest="metric", required=True)
+    for metric in ("deploymentfrequency", "leadtimeforchanges"):
+        subparser = subparsers.add_parser(metric)
+        subparser.add_argument("-ownerRepo", "--owner-repo", dest="ownerRepo", required=True, help="owner/repo")
+        subparser.add_argument("-workflows", "--workflows", dest="workflows", default="", help="Comma separated workflow names")
+        subparser.add_argument("-branch", "--branch", dest="branch", default="main", help="Branch name")
+        subparser.add_argument("-numberOfDays", "--number-of-days", dest="numberOfDays", type=int, default=30, help="Time Frame in days")
+        subparser.add_argument("-patToken", "--pat-token", dest="patToken", default="", help="Personal access token")
+        subparser.add_argument("-actionsToken", "--actions-token", dest="actionsToken", default="", help="GITHUB_TOKEN of the workflow")
+        subparser.add_argument("-appId", "--app-id", dest="appId", default="", help="GitHub App id")
+        subparser.add_argument("-appInstallationId", "--app-installation-id", dest="appInstallationId", default="", help="GitHub App installation id")
+        subparser.add_argument("-appPrivateKey", "--app-private-key", dest="appPrivateKey", default="", help="GitHub App private key, base64 DER or PEM")
+        if metric == "leadtimeforchanges":
+            subparser.add_argument("-commitCountingMethod", "--commit-counting-method", dest="commitCountingMethod", default="last", choices=["", "first", "last"], help="Which PR commit starts the clock")
+            subparser.add_argument("-commitIndex", "--commit-index", dest="commitIndex", default=None, help="JSON file memoizing commit dates across runs")
+    args = parser.parse_args()
+
+    token = args.patToken.strip() or args.actionsToken.strip() or None
+    if args.appId and token is None:
+        os.environ.update({
+            APP_ID_ENV: args.appId,
+            APP_INSTALLATION_IDS_ENV: args.appInstallationId,
+            APP_PRIVATE_KEY_ENV: args.appPrivateKey,
+        })
+    elif token is None and APP_ID_ENV not in os.environ:
+        logging.info("No authentication detected")
+    if args.metric == "deploymentfrequency":
+        lines = deployment_frequency(args, token)
+    else:
+        lines = lead_time_for_changes(args, token)
+    sys.stdout.write("\n".join(lines) + "\n")
@@ -0,0 +1,92 @@
+import datetime
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from warehouse import Warehouse, format_timestamp
+
+
+EVENTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    delivery_id TEXT UNIQUE,
+    event TEXT NOT NULL,
+    action TEXT,
+    repository TEXT,
+    received_at TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+"""
+
+HANDLED_EVENTS = {"pull_request", "pull_request_review", "workflow_run", "deployment_status"}
+
+
+class EventStore(Warehouse):
+    """Append-only log of GitHub webhook deliveries, projected into the warehouse tables."""
+
+    def __init__(self, path: str) -> None:
+        super().__init__(path)
+        with self.lock, self.connection:
+            self.connection.executescript(EVENTS_SCHEMA)
+
+    def append(
+        self, delivery_id: Optional[str], event: str, payload: Dict[str, Any]
+    ) -> bool:
+        repository = (payload.get("repository") or {}).get("full_name")
+        with self.transaction():
+            cursor = self.connection.execute(
+                "INSERT OR IGNORE INTO events (delivery_id, event, action, repository, received_at, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    delivery_id,
+                    event,
+                    payload.get("action"),
+                    repository,
+                    format_timestamp(datetime.datetime.now(datetime.timezone.utc)),
+                    json.dumps(payload),
+                ),
+            )
+        if not cursor.rowcount:
+            logging.info(f"Skipping already stored delivery {delivery_id}")
+        return bool(cursor.rowcount)
+
+    def record(
+        self, delivery_id: Optional[str], event: str, payload: Dict[str, Any]
+    ) -> bool:
+        """Appends and projects a delivery in one transaction, a failed projection stores nothing."""
+        with self.transaction():
+            stored = self.append(delivery_id, event, payload)
+            if stored:
+                self.apply(event, payload)
+        return stored
+
+    def apply(self, event: str, payload: Dict[str, Any]) -> None:
+        repository = payload["repository"]["full_name"]
+        self.record_repository(repository, payload["repository"].get("id"))
+        if event == "pull_request":
+            pull_request = payload["pull_request"]
+            self.upsert_pull_request(repository, pull_request)
+            requested_team = payload.get("requested_team")
+            if requested_team and payload.get("action") == "review_requested":
+                self.add_review_request(repository, pull_request["number"], requested_team)
+            elif requested_team and payload.get("action") == "review_request_removed":
+                self.remove_review_request(repository, pull_request["number"], requested_team["slug"])
+        elif event == "pull_request_review":
+            self.upsert_pull_request(repository, payload["pull_request"])
+            self.upsert_review(repository, payload["pull_request"]["number"], payload["review"])
+        elif event == "workflow_run":
+            self.upsert_workflow_run(repository, payload["workflow_run"])
+        elif event == "deployment_status":
+            self.upsert_deployment_status(
+                repository, payload.get("deployment") or {}, payload["deployment_status"]
+            )
+
+    def pending_head_commits(self, repository: str) -> List[Any]:
+        # Webhook PR payloads carry the head SHA and commit count but no
+        # commit dates
+        return self.select(
+            "SELECT p.number, p.head_sha, p.commits FROM pull_requests p "
+            "WHERE p.repository = ? AND p.merged_at IS NOT NULL AND p.head_sha IS NOT NULL "
+            "AND NOT EXISTS (SELECT 1 FROM commits c WHERE c.repository = p.repository AND c.sha = p.head_sha)",
+            (repository,),
+        )
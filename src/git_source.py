@@ -0,0 +1,118 @@
+import datetime
+import logging
+import subprocess
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+
+# Merged branches usually start before the merge, fetch this much extra
+# history so their commits are in the shallow clone
+FETCH_MARGIN_DAYS = 30
+
+
+class GitCommit(NamedTuple):
+    sha: str
+    parents: List[str]
+    committed_at: datetime.datetime
+
+
+def from_unix(timestamp: str) -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(int(timestamp), tz=datetime.timezone.utc)
+
+
+class GitRepository:
+    """Reads merge and tag timing from a local clone, without API calls."""
+
+    def __init__(self, path: str, branch: str) -> None:
+        self.path = path
+        self.branch = branch
+        self.ref = None
+
+    def git(self, *args: str, check: bool = True) -> subprocess.CompletedProcess:
+        return subprocess.run(
+            ["git", "-C", self.path, *args], capture_output=True, text=True, check=check
+        )
+
+    def fetch(self, since: datetime.datetime, tags: bool = False) -> None:
+        shallow = self.git("rev-parse", "--is-shallow-repository").stdout.strip() == "true"
+        if not shallow:
+            return
+        shallow_since = (since - datetime.timedelta(days=FETCH_MARGIN_DAYS)).strftime("%Y-%m-%d")
+        logging.info(f"Deepening shallow clone of {self.branch} to {shallow_since}")
+        args = ["fetch", "--quiet", f"--shallow-since={shallow_since}", "origin", self.branch]
+        if tags:
+            args.insert(1, "--tags")
+        self.git(*args)
+
+    def resolve_ref(self) -> str:
+        if self.ref is None:
+            for candidate in (f"origin/{self.branch}", self.branch):
+                if self.git("rev-parse", "--verify", "--quiet", candidate, check=False).returncode == 0:
+                    self.ref = candidate
+                    break
+            else:
+                raise ValueError(f"Branch {self.branch} not found in {self.path}")
+        return self.ref
+
+    def first_parent_log(self, since: datetime.datetime) -> Iterator[GitCommit]:
+        # Streams the first-parent history of the branch, newest first
+        process = subprocess.Popen(
+            [
+                "git", "-C", self.path, "log", "--first-parent", "--format=%H%x09%P%x09%ct",
+                f"--since={since.isoformat()}", self.resolve_ref(),
+            ],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            for line in process.stdout:
+                sha, parents, committed_at = line.rstrip("\n").split("\t")
+                yield GitCommit(sha, parents.split(), from_unix(committed_at))
+        finally:
+            process.stdout.close()
+            process.wait()
+
+    def merges(self, since: datetime.datetime) -> List[GitCommit]:
+        return [commit for commit in self.first_parent_log(since) if len(commit.parents) > 1]
+
+    def commit_times(self, shas: List[str]) -> Dict[str, datetime.datetime]:
+        if not shas:
+            return {}
+        result = self.git("log", "--no-walk=unsorted", "--format=%H %ct", *shas, check=False)
+        return {
+            sha: from_unix(committed_at)
+            for sha, committed_at in (line.split() for line in result.stdout.splitlines())
+        }
+
+    def first_branch_commit_time(self, merge: GitCommit) -> Optional[datetime.datetime]:
+        # Oldest commit brought in by the merge, the same range GitHub
+        # compares for the pull request
+        result = self.git(
+            "log", "--reverse", "--format=%ct", f"{merge.parents[0]}..{merge.parents[1]}", check=False
+        )
+        lines = result.stdout.splitlines()
+        return from_unix(lines[0]) if result.returncode == 0 and lines else None
+
+    def merge_lead_times(
+        self, since: datetime.datetime, commit_counting_method: str = "last"
+    ) -> Iterator[datetime.timedelta]:
+        merges = self.merges(since)
+        if commit_counting_method == "last":
+            start_times = self.commit_times([merge.parents[1] for merge in merges])
+            starts = [start_times.get(merge.parents[1]) for merge in merges]
+        else:
+            starts = [self.first_branch_commit_time(merge) for merge in merges]
+        missing = 0
+        for merge, started_at in zip(merges, starts):
+            if started_at is None:
+                missing += 1
+                continue
+            yield merge.committed_at - started_at
+        if missing:
+            logging.warning(f"Skipped {missing} merges whose branch commits are outside the clone")
+
+    def tag_times(self, pattern: str, since: datetime.datetime) -> List[datetime.datetime]:
+        result = self.git(
+            "for-each-ref", "--format=%(creatordate:unix)", f"refs/tags/{pattern}"
+        )
+        times = (from_unix(line) for line in result.stdout.split())
+        return sorted(time for time in times if time > since)
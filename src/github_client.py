@@ -0,0 +1,326 @@
+import asyncio
+import copy
+import hashlib
+import json
+import logging
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager, nullcontext
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator, Optional, Tuple
+
+
+class LazyCompletionCounter:
+    """Counts the hidden per-object GETs PyGithub issues to complete list-endpoint objects."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts: Counter = Counter()
+        self._installed = False
+
+    def install(self) -> None:
+        from github.GithubObject import CompletableGithubObject
+
+        with self._lock:
+            if self._installed:
+                return
+            original_complete = CompletableGithubObject._CompletableGithubObject__complete
+            counter = self
+
+            def counting_complete(obj: CompletableGithubObject) -> None:
+                counter.record(type(obj).__name__)
+                return original_complete(obj)
+
+            CompletableGithubObject._CompletableGithubObject__complete = counting_complete
+            self._installed = True
+
+    def record(self, object_type: str) -> None:
+        with self._lock:
+            self._counts[object_type] += 1
+        logging.debug(f"Lazy completion fetch for {object_type}")
+
+    @property
+    def total(self) -> int:
+        with self._lock:
+            return sum(self._counts.values())
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+
+
+# Installed by create_github, local backends never load PyGithub
+lazy_completions = LazyCompletionCounter()
+
+
+# Completed GETs are reused this long, well below anything a 30 day window notices
+SHARED_REQUEST_TTL = 120.0
+SHARED_REQUEST_ENTRIES = 256
+SHARE_REQUESTS_HELP = "Coalesce identical GitHub GETs of this process and reuse them for two minutes"
+
+
+class Flight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Identical GETs in flight share one request, completed ones are reused for a short TTL.
+
+    Once installed (entry points opt in with --share-requests) it sits under
+    every PyGithub client of the process, so the same repository looked up
+    for several teams or an object completed twice costs one call. The httpx
+    calculators bypass PyGithub, they enable it and go through acall only
+    while it is enabled. Requests only share a response when made with the
+    same credentials, and every caller gets its own copy. Errors reach every
+    waiter and are not kept, nor are None results.
+    """
+
+    def __init__(self, ttl: float = SHARED_REQUEST_TTL, max_entries: int = SHARED_REQUEST_ENTRIES) -> None:
+        self._lock = threading.Lock()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._in_flight: Dict[Hashable, Flight] = {}
+        self._async_in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._recent: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._counts: Counter = Counter()
+        self._installed = False
+        self.enabled = False
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def install(self) -> None:
+        from github.Requester import Requester
+
+        self.enable()
+        with self._lock:
+            if self._installed:
+                return
+            original_request = Requester.requestJsonAndCheck
+            shared = self
+
+            def shared_request(requester, verb, url, parameters=None, headers=None, input=None):
+                if verb != "GET" or input is not None:
+                    return original_request(requester, verb, url, parameters, headers, input)
+                with credentials(requester.auth, url) as identity:
+                    return shared.call(
+                        request_key(identity, requester.hostname, url, parameters, headers),
+                        lambda: original_request(requester, verb, url, parameters, headers, input),
+                    )
+
+            Requester.requestJsonAndCheck = shared_request
+            self._installed = True
+
+    def _recent_value(self, key: Hashable) -> Tuple[bool, Any]:
+        entry = self._recent.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._recent[key]
+            return False, None
+        self._recent.move_to_end(key)
+        self._counts["recent"] += 1
+        return True, copy.deepcopy(value)
+
+    def _finish(self, key: Hashable, value: Any, failed: bool) -> None:
+        self._counts["fetched"] += 1
+        if failed or value is None:
+            return
+        self._recent[key] = (time.monotonic() + self.ttl, copy.deepcopy(value))
+        self._recent.move_to_end(key)
+        while len(self._recent) > self.max_entries:
+            self._recent.popitem(last=False)
+
+    def call(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        with self._lock:
+            found, value = self._recent_value(key)
+            if found:
+                return value
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = Flight()
+            else:
+                self._counts["coalesced"] += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.deepcopy(flight.value)
+        try:
+            flight.value = fetch()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+                self._finish(key, flight.value, flight.error is not None)
+            flight.done.set()
+        return flight.value
+
+    async def acall(self, key: Hashable, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        with self._lock:
+            found, value = self._recent_value(key)
+            if found:
+                return value
+            future = self._async_in_flight.get(key)
+            if future is not None:
+                self._counts["coalesced"] += 1
+        if future is not None:
+            return copy.deepcopy(await asyncio.shield(future))
+        future = self._async_in_flight[key] = asyncio.get_running_loop().create_future()
+        failed = True
+        try:
+            value = await fetch()
+            failed = False
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            # Marks the error as seen when nobody else waited on it
+            future.exception()
+            raise
+        finally:
+            with self._lock:
+                del self._async_in_flight[key]
+                self._finish(key, value if not failed else None, failed)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+
+def request_key(*parts: Any) -> Hashable:
+    # Parameters and headers arrive as dicts, equal ones must give equal keys
+    return tuple(json.dumps(part, sort_keys=True, default=str) for part in parts)
+
+
+def token_identity(token: str) -> str:
+    # Keys hold a digest, never the token itself
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def auth_identity(auth: Any) -> Hashable:
+    """What a response may be shared by: the installation or token a request is made with."""
+    if auth is None:
+        return None
+    installation_id = getattr(auth, "installation_id", None)
+    if installation_id is not None:
+        return f"installation:{installation_id}"
+    if type(auth).__name__ == "Token":
+        return f"token:{token_identity(auth.token)}"
+    return f"{type(auth).__name__}:{id(auth)}"
+
+
+def credentials(auth: Any, url: str):
+    # Pools pick the member serving the request up front and pin it, so the
+    # key names the credentials the request is really sent with
+    if hasattr(auth, "pinned"):
+        return auth.pinned(url)
+    return nullcontext(auth_identity(auth))
+
+
+shared_requests = SingleFlight()
+
+
+class NeverRaised(Exception):
+    pass
+
+
+def github_errors() -> type:
+    """GithubException once PyGithub is loaded, until then nothing can raise it.
+
+    For except clauses of code shared by the API and local backends.
+    """
+    github = sys.modules.get("github")
+    return github.GithubException if github is not None else NeverRaised
+
+
+def payload_value(github_object: Any, key: str, default: Any = None) -> Any:
+    """Read a field from the payload an object was built from, without completing it."""
+    return github_object._rawData.get(key, default)
+
+
+# Statuses GitHub answers with when requests come in too fast
+THROTTLED_STATUSES = {403, 429}
+LATENCY_TOLERANCE = 2.0
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit for the API fan-outs.
+
+    The limit grows by one after a full window of healthy tasks and halves
+    when GitHub throttles or fails, at most once per window.
+    """
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 32) -> None:
+        self._condition = threading.Condition()
+        self.limit = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self.peak = 0
+        self.backoffs = 0
+        self._healthy = 0
+        self._latency: float | None = None
+        self._last_backoff = 0.0
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        started = time.monotonic()
+        try:
+            yield
+        except github_errors() as e:
+            if e.status in THROTTLED_STATUSES or e.status >= 500:
+                self.back_off()
+            raise
+        else:
+            self.record_success(time.monotonic() - started)
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def record_success(self, latency: float) -> None:
+        with self._condition:
+            healthy = self._latency is None or latency <= LATENCY_TOLERANCE * self._latency
+            self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+            self._healthy = self._healthy + 1 if healthy else 0
+            if self._healthy >= self.limit and self.limit < self.maximum:
+                self.limit += 1
+                self._healthy = 0
+                self._condition.notify_all()
+
+    def back_off(self) -> None:
+        with self._condition:
+            now = time.monotonic()
+            # Tasks already in flight fail together, count them as one signal
+            if now - self._last_backoff < (self._latency or 1.0):
+                return
+            self._last_backoff = now
+            self.limit = max(self.minimum, self.limit // 2)
+            self._healthy = 0
+            self.backoffs += 1
+        logging.warning(f"Throttled by GitHub, concurrency limit lowered to {self.limit}")
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._condition:
+            return {"limit": self.limit, "peak": self.peak, "backoffs": self.backoffs}
+
+
+concurrency = AdaptiveLimiter()
@@ -0,0 +1,158 @@
+import bisect
+import datetime
+import json
+import logging
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+
+PAGERDUTY_API_URL = "https://api.pagerduty.com"
+PAGERDUTY_PAGE_SIZE = 100
+
+
+class Incident(NamedTuple):
+    id: str
+    started_at: datetime.datetime
+    resolved_at: Optional[datetime.datetime]
+
+
+def parse_datetime(value: Optional[str]) -> Optional[datetime.datetime]:
+    if not value:
+        return None
+    parsed = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=datetime.timezone.utc)
+    return parsed
+
+
+def to_incident(payload: Dict[str, Any]) -> Incident:
+    resolved_at = payload.get("resolved_at")
+    if not resolved_at and payload.get("status") == "resolved":
+        resolved_at = payload.get("last_status_change_at")
+    return Incident(
+        id=str(payload.get("id") or payload.get("incident_number")),
+        started_at=parse_datetime(payload["created_at"]),
+        resolved_at=parse_datetime(resolved_at),
+    )
+
+
+def matches_service(payload: Dict[str, Any], services: List[str]) -> bool:
+    if not services:
+        return True
+    service = payload.get("service") or {}
+    return service.get("id") in services or service.get("summary") in services
+
+
+def load_incidents(path: str, services: Optional[List[str]] = None) -> List[Incident]:
+    """Read incidents from a PagerDuty-style JSON export (a list or an {"incidents": [...]} page)."""
+    with open(path) as export_file:
+        data = json.load(export_file)
+    payloads = data["incidents"] if isinstance(data, dict) else data
+    incidents = [
+        to_incident(payload) for payload in payloads if matches_service(payload, services or [])
+    ]
+    logging.info(f"Loaded {len(incidents)} incidents from {path}")
+    return incidents
+
+
+def fetch_pagerduty_incidents(
+    api_token: str,
+    since: datetime.datetime,
+    until: datetime.datetime,
+    services: Optional[List[str]] = None,
+) -> List[Incident]:
+    import httpx
+
+    headers = {
+        "Authorization": f"Token token={api_token}",
+        "Accept": "application/vnd.pagerduty+json;version=2",
+    }
+    params = {
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "limit": PAGERDUTY_PAGE_SIZE,
+        "offset": 0,
+        "time_zone": "UTC",
+    }
+    if services:
+        params["service_ids[]"] = services
+    incidents = []
+    with httpx.Client(base_url=PAGERDUTY_API_URL, headers=headers) as client:
+        while True:
+            response = client.get("/incidents", params=params)
+            response.raise_for_status()
+            page = response.json()
+            incidents.extend(to_incident(payload) for payload in page["incidents"])
+            if not page.get("more"):
+                break
+            params["offset"] += PAGERDUTY_PAGE_SIZE
+    logging.info(f"Fetched {len(incidents)} incidents from PagerDuty")
+    return incidents
+
+
+def attribute_incidents(
+    deployments: List[datetime.datetime],
+    incidents: Iterable[Incident],
+    attribution_window: Optional[datetime.timedelta] = None,
+) -> Dict[int, List[Incident]]:
+    """Map each deployment index, in time order, to the incidents that started after it and before the next one.
+
+    Both sides are walked once in start order, so the cost is the two sorts
+    rather than deployments x incidents.
+    """
+    deployments = sorted(deployments)
+    attributed: Dict[int, List[Incident]] = {}
+    deployment_index = -1
+    for incident in sorted(incidents, key=lambda incident: incident.started_at):
+        while (
+            deployment_index + 1 < len(deployments)
+            and deployments[deployment_index + 1] <= incident.started_at
+        ):
+            deployment_index += 1
+        if deployment_index < 0:
+            continue
+        if (
+            attribution_window is not None
+            and incident.started_at - deployments[deployment_index] > attribution_window
+        ):
+            continue
+        attributed.setdefault(deployment_index, []).append(incident)
+    return attributed
+
+
+def restored_at(incident: Incident, deployments: List[datetime.datetime]) -> Optional[datetime.datetime]:
+    """When the incident was resolved, or else the first deployment after it started.
+
+    deployments must be sorted.
+    """
+    if incident.resolved_at is not None:
+        return incident.resolved_at
+    next_deployment = bisect.bisect_right(deployments, incident.started_at)
+    if next_deployment < len(deployments):
+        return deployments[next_deployment]
+    return None
+
+
+def in_window(
+    incidents: Iterable[Incident], since: datetime.datetime
+) -> List[Incident]:
+    return [incident for incident in incidents if incident.started_at > since]
+
+
+def collect_incidents(
+    since: datetime.datetime,
+    incidents_file: Optional[str] = None,
+    pagerduty_token: Optional[str] = None,
+    services: Optional[List[str]] = None,
+) -> List[Incident]:
+    if (incidents_file or pagerduty_token) and not services:
+        logging.warning("No service given, incidents of every service are counted against this repository")
+    if incidents_file:
+        incidents = load_incidents(incidents_file, services)
+    elif pagerduty_token:
+        incidents = fetch_pagerduty_incidents(
+            pagerduty_token, since, datetime.datetime.now(datetime.timezone.utc), services
+        )
+    else:
+        logging.warning("No incident source given, assuming no incidents")
+        incidents = []
+    return in_window(incidents, since)
@@ -1,16 +1,21 @@
 import datetime
 import os
 import json
-from github import Github
 import argparse
+import itertools
 import logging
+from column_file import ColumnFile
+from commit_index import CommitDateIndex, CommitDateResolver
+from deadline import DeadlineExceeded, deadline, parse_duration
+from git_source import GitRepository
+from github_client import SHARE_REQUESTS_HELP, lazy_completions, shared_requests
+from warehouse import Warehouse
+from report_sink import ReportSink
 
 #Throttling, set to None to restore default behavior
 SECONDS_BETWEEN_REQUESTS=0.12
 SECONDS_BETWEEN_WRITES=0.5
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-
 class LeadTimeForChanges:
     def __init__(
         self,
@@ -22,20 +27,48 @@ class LeadTimeForChanges:
         token,
         github_host,
         commit_counting_method="last",
-        ignore_workflows=True
+        ignore_workflows=True,
+        warehouse=None,
+        commit_index=None,
+        git_repository=None,
+        dataset=None,
+        columns=None,
+        since=None,
     ):
         self.owner = owner
+        self.since = since
         self.repo = repo
         self.branch = branch
         self.number_of_days = number_of_days
         self.commit_counting_method = commit_counting_method
+        self.warehouse = warehouse
+        self.git_repository = git_repository
+        self.dataset = dataset
+        self.columns = columns
+        self.token = token
+        self.github_host = github_host
+        self.commit_index = commit_index
+        self.repo_object = None
+        if dataset is not None:
+            self.repo_object = dataset.repo
+            self.commit_dates = dataset.commit_dates
+        # A local clone answers the PR side, the API is only needed for workflows
+        elif warehouse is None and columns is None and (git_repository is None or not ignore_workflows):
+            self.connect()
+        self.ignore_workflows = ignore_workflows
         try:
-            self.github = (
-                Github(login_or_token=token, base_url=github_host)
-                if github_host
-                else Github(token)
-            )
-            self.owner = owner
+            self.workflows = json.loads(workflows) if workflows else None
+        except json.JSONDecodeError:
+            logging.error("Invalid JSON format for workflows. Using an empty list.")
+            self.workflows = []
+
+    def connect(self):
+        # PyGithub is only loaded when the API backend is used
+        from github import GithubException
+        from github_auth import create_github
+
+        try:
+            self.github = create_github(self.token, self.github_host)
         except GithubException as e:
             logging.error(f"Failed to initialize GitHub client: {e}")
             raise
@@ -45,12 +78,7 @@ class LeadTimeForChanges:
             )
             raise
         self.repo_object = self.github.get_repo(f"{self.owner}/{self.repo}")
-        self.ignore_workflows = ignore_workflows
-        try:
-            self.workflows = json.loads(workflows) if workflows else None
-        except JSONDecodeError:
-            logging.error("Invalid JSON format for workflows. Using an empty list.")
-            self.workflows = []
+        self.commit_dates = CommitDateResolver(self.repo_object, self.commit_index)
 
     def __call__(self):
         logging.info(f"Owner/Repo: {self.owner}/{self.repo}")
@@ -64,30 +92,74 @@ class LeadTimeForChanges:
         return self.evaluate_lead_time(pr_result, workflow_result)
 
     def get_pull_requests(self):
-        return list(self.repo_object.get_pulls(state='closed', base=self.branch))
+        if self.dataset:
+            return self.dataset.merged_pull_requests(self.branch)
+        # A PR merged in the window was updated in it, newest updates first
+        # lets the listing stop at the window start
+        window_start = self.window_start()
+        prs = self.repo_object.get_pulls(state='closed', base=self.branch, sort='updated', direction='desc')
+        return itertools.takewhile(lambda pr: pr.updated_at >= window_start, prs)
+
+    def window_start(self):
+        if self.since is not None:
+            return self.since
+        return datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=self.number_of_days)
 
     def process_pull_requests(self):
-        prs = self.get_pull_requests()
+        if self.warehouse:
+            return self.warehouse.pull_request_lead_times(
+                f"{self.owner}/{self.repo}", self.branch, self.window_start(), self.commit_counting_method
+            )
+        if self.columns:
+            return self.columns.pull_request_lead_times(
+                f"{self.owner}/{self.repo}", self.branch, self.window_start(), self.commit_counting_method
+            )
+        # A shared dataset already holds the PRs, the clone is only read without one
+        if self.git_repository and self.dataset is None:
+            merges = self.process_merges()
+            if merges[0]:
+                return merges
+            # Squash and rebase merges leave no merge commit on the branch
+            logging.warning(f"No merge commits on {self.branch} in the window, timing merged PRs through the API instead")
+            if self.repo_object is None:
+                self.connect()
         pr_counter = 0
         total_pr_hours = 0
-        # Ensure now is also offset-aware by using UTC
-        now_utc = datetime.datetime.now(datetime.timezone.utc)
-        for pr in prs:
-            if pr.merged and pr.merge_commit_sha and pr.merged_at > now_utc - datetime.timedelta(days=self.number_of_days):
+        window_start = self.window_start()
+        # The PR listing goes before the per-PR commit requests
+        prs = []
+        try:
+            for pr in self.get_pull_requests():
+                if pr.merged_at is not None and pr.merge_commit_sha and pr.merged_at > window_start:
+                    prs.append(pr)
+                deadline.check()
+            for pr in prs:
+                deadline.check()
+                if self.commit_counting_method == "last":
+                    start_date = self.commit_dates.last_commit_date(pr)
+                elif self.commit_counting_method == "first":
+                    start_date = self.commit_dates.first_commit_date(pr)
                 pr_counter += 1
-                commits = list(pr.get_commits())
-                if commits:
-                    if self.commit_counting_method == "last":
-                        start_date = commits[-1].commit.committer.date
-                    elif self.commit_counting_method == "first":
-                        start_date = commits[0].commit.committer.date
-                    merged_at = pr.merged_at
-                    duration = merged_at - start_date
-                    total_pr_hours += duration.total_seconds() / 3600
+                merged_at = pr.merged_at
+                duration = merged_at - start_date
+                total_pr_hours += duration.total_seconds() / 3600
+        except DeadlineExceeded:
+            logging.warning(f"Timed {pr_counter} of {len(prs)} merged PRs listed before the deadline")
+        deadline.account(pr_counter, len(prs) if prs else int(deadline.stopped))
+        logging.info(f"Resolved commit dates of {pr_counter} PRs with {self.commit_dates.requests} requests")
         return pr_counter, total_pr_hours
 
+    def process_merges(self):
+        self.git_repository.fetch(self.window_start())
+        lead_times = list(
+            self.git_repository.merge_lead_times(self.window_start(), self.commit_counting_method)
+        )
+        return len(lead_times), sum(lead_time.total_seconds() for lead_time in lead_times) / 3600
+
     def get_workflows(self):
-        if not self.workflows:
+        if not self.workflows and self.dataset:
+            workflow_ids = self.dataset.workflows()
+        elif not self.workflows:
             workflows = self.repo_object.get_workflows()
             workflow_ids = [workflow.id for workflow in workflows]
             logging.info(f"Found {len(workflow_ids)} workflows in Repo")
@@ -97,19 +169,41 @@ class LeadTimeForChanges:
         return workflow_ids
 
     def process_workflows(self):
-        workflow_ids = self.get_workflows()
+        if self.warehouse:
+            return self.warehouse.workflow_durations(
+                f"{self.owner}/{self.repo}", self.branch, self.workflows, self.window_start()
+            )
+        if self.columns:
+            return self.columns.workflow_durations(
+                f"{self.owner}/{self.repo}", self.branch, self.workflows, self.window_start()
+            )
         total_workflow_hours = 0
         workflow_counter = 0
-        for workflow_id in workflow_ids:
-            runs = list(self.repo_object.get_workflow(workflow_id).get_runs())
-            for run in runs:
-                if run.head_branch == self.branch and run.created_at > datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=self.number_of_days):
-                    workflow_counter += 1
-                    duration = run.updated_at - run.created_at
-                    total_workflow_hours += duration.total_seconds() / 3600
+        workflow_ids = []
+        scanned = 0
+        try:
+            workflow_ids = self.get_workflows()
+            since = self.window_start()
+            for workflow_id in workflow_ids:
+                runs = (
+                    self.dataset.workflow_runs(workflow_id, self.branch)
+                    if self.dataset
+                    else self.repo_object.get_workflow(workflow_id).get_runs(created=f">={since.date().isoformat()}")
+                )
+                for run in runs:
+                    deadline.check()
+                    if run.head_branch == self.branch and run.created_at > since:
+                        workflow_counter += 1
+                        duration = run.updated_at - run.created_at
+                        total_workflow_hours += duration.total_seconds() / 3600
+                scanned += 1
+        except DeadlineExceeded:
+            logging.warning(f"Scanned the runs of {scanned} of {len(workflow_ids)} workflows before the deadline")
+        deadline.account(scanned, len(workflow_ids) if workflow_ids else int(deadline.stopped))
         return workflow_counter, total_workflow_hours
         
-    def calculate_rating(self, lead_time_for_changes_in_hours):
+    @staticmethod
+    def calculate_rating(lead_time_for_changes_in_hours):
         daily_deployment = 24
         weekly_deployment = 24 * 7
         monthly_deployment = 24 * 30
@@ -153,7 +247,8 @@ class LeadTimeForChanges:
         }
 
 
-    def evaluate_lead_time(self, pr_result, workflow_result):
+    @classmethod
+    def evaluate_lead_time(cls, pr_result, workflow_result):
         pr_counter, total_pr_hours = pr_result
         if pr_counter == 0:
             pr_counter = 1
@@ -180,13 +275,14 @@ class LeadTimeForChanges:
             "workflow_average_time_duration": round(workflow_average, 2),
             "lead_time_for_changes_in_hours": round(lead_time_for_changes_in_hours, 2),
         }
-        rating = self.calculate_rating(lead_time_for_changes_in_hours)
+        rating = cls.calculate_rating(lead_time_for_changes_in_hours)
         report.update(rating)
 
-        return json.dumps(report, default=str)
+        return json.dumps(deadline.annotate(report), default=str)
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
     parser = argparse.ArgumentParser(description='Calculate lead time for changes.')
     parser.add_argument('--owner', required=True, help='Owner of the repository')
     parser.add_argument('--repo', required=True, help='Repository name')
@@ -201,14 +297,39 @@ if __name__ == "__main__":
             help="Base URL for self-hosted GitHub instance (e.g., https://api.example-github.com)",
             default=None,
         )
+    parser.add_argument('--warehouse', default=None, help='Read from this local warehouse database instead of the GitHub API')
+    parser.add_argument('--columns', default=None, help='Read PRs and workflow runs from this column file (see column_file.py) instead of the GitHub API')
+    parser.add_argument('--commit-index', default=None, help='JSON file memoizing commit dates across runs')
+    parser.add_argument('--git-repo', default=None, help='Time merges into the branch from this local clone instead of listing PRs')
+    parser.add_argument('--report-file', default=None, help='Append the report to this NDJSON file instead of GITHUB_ENV')
+    parser.add_argument('--deadline', type=parse_duration, default=None, help='Stop fetching after this long (e.g. 300, 15m, 1h) and report what was covered')
+    parser.add_argument('--share-requests', action='store_true', help=SHARE_REQUESTS_HELP)
     args = parser.parse_args()
+    deadline.start(args.deadline)
+
+    # Local backends answer without PyGithub, git mode may still fall back to the API
+    if args.share_requests and not args.warehouse and not args.columns:
+        shared_requests.install()
 
+    warehouse = Warehouse(args.warehouse) if args.warehouse else None
+    commit_index = CommitDateIndex(args.commit_index)
     lead_time_for_changes = LeadTimeForChanges(
-        args.owner, args.repo, args.workflows, args.branch, args.time_frame, token=args.token,github_host= args.github_host, ignore_workflows=args.ignore_workflows
+        args.owner, args.repo, args.workflows, args.branch, args.time_frame, token=args.token,github_host= args.github_host, ignore_workflows=args.ignore_workflows, warehouse=warehouse, commit_index=commit_index,
+        git_repository=GitRepository(args.git_repo, args.branch) if args.git_repo else None,
+        columns=ColumnFile(args.columns) if args.columns else None,
     )
     report = lead_time_for_changes()
+    commit_index.save()
     logging.info(f"Lead Time for Changes >> {report}")
+    # Only known after the run, git mode connects when it finds no merges
+    if lead_time_for_changes.repo_object is not None:
+        logging.info(f"Lazy completion fetches: {lazy_completions.snapshot()}")
+        logging.info(f"Shared GitHub requests: {shared_requests.snapshot()}")
     
-    if args.platform == "github-actions":
+    if args.report_file:
+        sink = ReportSink(args.report_file)
+        sink.add("lead_time_for_changes", args.owner, args.repo, report, time_frame=args.time_frame, branch=args.branch)
+        sink.flush()
+    elif args.platform == "github-actions":
        with open(os.getenv("GITHUB_ENV"), "a") as github_env:
            github_env.write(f"lead_time_for_changes_report={report}\n")
@@ -1,9 +1,13 @@
+import argparse
 import httpx
-from datetime import datetime, timedelta, timezone
 import base64
 import json
 import os
 from loguru import logger
+from deadline import deadline, parse_duration
+from github_auth import token_provider
+from github_client import SHARE_REQUESTS_HELP, request_key, shared_requests, token_identity
+from payloads import decode_commits, decode_pull_requests, decode_workflow_runs, decode_workflows, loads
 import asyncio
 import time
 
@@ -28,7 +32,8 @@ class LeadTimeForChanges:
         self.number_of_days = number_of_days
         self.commit_counting_method = commit_counting_method
         self.pat_token = pat_token
-        self.auth_header = self.get_auth_header
+        # Installation tokens expire, the header is built per request
+        self.current_token = token_provider(pat_token)
         self.github_url = f"https://api.github.com/repos/{self.owner}/{self.repo}"
 
     async def __call__(self):
@@ -47,14 +52,28 @@ class LeadTimeForChanges:
 
     @property
     def get_auth_header(self):
-        encoded_credentials = base64.b64encode(f":{self.pat_token}".encode()).decode()
+        return self.auth_header_for(self.current_token(self.github_url))
+
+    def auth_header_for(self, token):
+        encoded_credentials = base64.b64encode(f"x-access-token:{token}".encode()).decode()
         headers = {
             "Authorization": f"Basic {encoded_credentials}",
             "Content-Type": "application/json",
         }
         return headers
 
-    async def send_api_requests(self, url, params=None):
+    async def send_api_requests(self, url, params=None, decode=loads):
+        # With --share-requests, identical GETs made with the same token, like
+        # the workflow list fetched twice per call, share one response
+        token = self.current_token(url)
+        if not shared_requests.enabled:
+            return await self.request_api(url, params, decode, token)
+        return await shared_requests.acall(
+            request_key(token_identity(token), url, params, decode.__name__),
+            lambda: self.request_api(url, params, decode, token),
+        )
+
+    async def request_api(self, url, params=None, decode=loads, token=None):
         backoff_time = 1
         max_backoff_time = 60
 
@@ -62,7 +81,7 @@ class LeadTimeForChanges:
             while True:
                 try:
                     response = await client.get(
-                        url, headers=self.auth_header, params=params
+                        url, headers=self.auth_header_for(token if token is not None else self.current_token(url)), params=params
                     )
 
                     # Check for rate limiting (HTTP status 429)
@@ -70,6 +89,8 @@ class LeadTimeForChanges:
                         reset_time = float(response.headers.get("X-RateLimit-Reset", 0))
                         current_time = time.time()
                         wait_time = max(reset_time - current_time, 3)
+                        if not deadline.allows_wait(wait_time):
+                            break
                         logger.warning(
                             f"Rate limit exceeded. Waiting for {wait_time} seconds."
                         )
@@ -77,10 +98,13 @@ class LeadTimeForChanges:
                         continue
 
                     response.raise_for_status()
-                    return response.json()
+                    # Straight from the bytes into the fields that are used
+                    return decode(response.content)
 
                 except httpx.HTTPStatusError as e:
                     if e.response.status_code in {500, 502, 503, 504}:
+                        if not deadline.allows_wait(backoff_time):
+                            break
                         logger.warning(
                             f"Server error ({e.response.status_code}). Retrying in {backoff_time} seconds."
                         )
@@ -97,68 +121,65 @@ class LeadTimeForChanges:
     async def get_pull_requests(self):
         url = f"{self.github_url}/pulls"
         params = {"state": "closed", "head": self.branch, "per_page": PAGE_SIZE}
-        return await self.send_api_requests(url, params=params)
+        return await self.send_api_requests(url, params=params, decode=decode_pull_requests)
 
     async def process_pull_requests(self):
-        prs = await self.get_pull_requests()
+        prs = await self.get_pull_requests() or []
         pr_counter = 0
+        merged_prs = 0
         total_pr_hours = 0
+        since = time.time() - self.number_of_days * 86400
         for pr in prs:
-            merged_at = pr.get("merged_at")
-            if merged_at and datetime.strptime(merged_at, "%Y-%m-%dT%H:%M:%SZ").replace(
-                tzinfo=timezone.utc
-            ) > datetime.now(timezone.utc) - timedelta(days=self.number_of_days):
+            if pr.merged_at and pr.merged_at > since:
+                merged_prs += 1
+                if deadline.expired:
+                    continue
                 pr_counter += 1
-                commits_url = f"{self.github_url}/pulls/{pr['number']}/commits"
+                commits_url = f"{self.github_url}/pulls/{pr.number}/commits"
                 params = {"per_page": PAGE_SIZE}
                 commits_response = await self.send_api_requests(
-                    commits_url, params=params
+                    commits_url, params=params, decode=decode_commits
                 )
                 if commits_response:
                     if self.commit_counting_method == "last":
-                        start_date = commits_response[-1]["commit"]["committer"]["date"]
+                        start_date = commits_response[-1].committed_at
                     elif self.commit_counting_method == "first":
-                        start_date = commits_response[0]["commit"]["committer"]["date"]
-                    start_date = datetime.strptime(start_date, "%Y-%m-%dT%H:%M:%SZ")
-                    merged_at = datetime.strptime(merged_at, "%Y-%m-%dT%H:%M:%SZ")
-                    duration = merged_at - start_date
-                    total_pr_hours += duration.total_seconds() / 3600
+                        start_date = commits_response[0].committed_at
+                    total_pr_hours += (pr.merged_at - start_date) / 3600
+        deadline.account(pr_counter, merged_prs)
         return pr_counter, total_pr_hours
 
     async def get_workflows(self):
         if not (self.workflows):
             workflow_url = f"{self.github_url}/actions/workflows"
-            workflows = await self.send_api_requests(workflow_url)
-            if workflows:
-                workflow_ids = [workflow["id"] for workflow in workflows["workflows"]]
+            workflow_ids = await self.send_api_requests(workflow_url, decode=decode_workflows)
+            if workflow_ids:
                 logger.info(f"Found {len(workflow_ids)} workflows in Repo")
                 return workflow_ids
         else:
             return self.workflows
 
     async def process_workflows(self):
-        workflow_ids = await self.get_workflows()
+        workflow_ids = await self.get_workflows() or []
         total_workflow_hours = 0
         workflow_counter = 0
+        scanned = 0
+        since = time.time() - self.number_of_days * 86400
         for workflow_id in workflow_ids:
+            if deadline.expired:
+                break
             runs_url = f"{self.github_url}/actions/workflows/{workflow_id}/runs"
             params = {"per_page": PAGE_SIZE, "status": "completed"}
-            runs_response = await self.send_api_requests(runs_url, params=params)
-            for run in runs_response["workflow_runs"]:
-                if run["head_branch"] == self.branch and datetime.strptime(
-                    run["created_at"], "%Y-%m-%dT%H:%M:%SZ"
-                ).replace(tzinfo=timezone.utc) > datetime.now(timezone.utc) - timedelta(
-                    days=self.number_of_days
-                ):
+            runs_response = await self.send_api_requests(runs_url, params=params, decode=decode_workflow_runs)
+            if not runs_response:
+                continue
+            scanned += 1
+            _, runs = runs_response
+            for run in runs:
+                if run.head_branch == self.branch and run.created_at > since:
                     workflow_counter += 1
-                    start_time = datetime.strptime(
-                        run["created_at"], "%Y-%m-%dT%H:%M:%SZ"
-                    )
-                    end_time = datetime.strptime(
-                        run["updated_at"], "%Y-%m-%dT%H:%M:%SZ"
-                    )
-                    duration = end_time - start_time
-                    total_workflow_hours += duration.total_seconds() / 3600
+                    total_workflow_hours += (run.updated_at - run.created_at) / 3600
+        deadline.account(scanned, len(workflow_ids))
         return workflow_counter, total_workflow_hours
 
     def calculate_rating(self, lead_time_for_changes_in_hours):
@@ -226,7 +247,7 @@ class LeadTimeForChanges:
         rating = self.calculate_rating(lead_time_for_changes_in_hours)
         report.update(rating)
 
-        return json.dumps(report, default=str)
+        return json.dumps(deadline.annotate(report), default=str)
 
 
 if __name__ == "__main__":
@@ -236,6 +257,23 @@ if __name__ == "__main__":
     workflows = os.getenv("WORKFLOWS", "[]")
     branch = os.getenv("BRANCH", "main")
     time_frame = int(os.getenv("TIMEFRAME_IN_DAYS", 30))
+    parser = argparse.ArgumentParser(description="Calculate Lead Time for Changes through the GitHub REST API.")
+    parser.add_argument(
+        "--deadline",
+        type=parse_duration,
+        default=os.getenv("DEADLINE"),
+        help="Stop fetching after this long (e.g. 300, 15m, 1h) and report what was covered, defaults to $DEADLINE",
+    )
+    parser.add_argument(
+        "--share-requests",
+        action="store_true",
+        default=bool(os.getenv("SHARE_REQUESTS")),
+        help=f"{SHARE_REQUESTS_HELP}, defaults to $SHARE_REQUESTS",
+    )
+    args = parser.parse_args()
+    deadline.start(args.deadline)
+    if args.share_requests:
+        shared_requests.enable()
 
     lead_time_for_changes = LeadTimeForChanges(
         owner, repo, workflows, branch, time_frame, pat_token=token
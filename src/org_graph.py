@@ -0,0 +1,159 @@
+import argparse
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from github import Github, GithubException
+from github_auth import create_github
+from warehouse import Warehouse
+
+
+ORG_GRAPH_SCHEMA = """
+CREATE TABLE IF NOT EXISTS team_pages (
+    team_slug TEXT NOT NULL,
+    resource TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    etag TEXT,
+    items TEXT NOT NULL,
+    PRIMARY KEY (team_slug, resource, page)
+);
+"""
+
+TEAM_PAGE_SIZE = 100
+
+
+class OrgGraph(Warehouse):
+    """Teams, parent teams, members and repository permissions of an org, kept between runs.
+
+    Every member and repository page is stored with its ETag, so a refresh
+    revalidates each page with a conditional request and only pages that
+    changed are downloaded again.
+    """
+
+    def __init__(self, path: str) -> None:
+        super().__init__(path)
+        with self.lock, self.connection:
+            self.connection.executescript(ORG_GRAPH_SCHEMA)
+
+    def cached_pages(self, team_slug: str, resource: str) -> Dict[int, Tuple[Optional[str], List[Any]]]:
+        return {
+            row["page"]: (row["etag"], json.loads(row["items"]))
+            for row in self.select(
+                "SELECT page, etag, items FROM team_pages WHERE team_slug = ? AND resource = ?",
+                (team_slug, resource),
+            )
+        }
+
+    def store_pages(self, team_slug: str, resource: str, pages: Dict[int, Tuple[Optional[str], List[Any]]]) -> None:
+        with self.lock, self.connection:
+            self.connection.execute(
+                "DELETE FROM team_pages WHERE team_slug = ? AND resource = ?", (team_slug, resource)
+            )
+            self.connection.executemany(
+                "INSERT INTO team_pages (team_slug, resource, page, etag, items) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (team_slug, resource, page, etag, json.dumps(items))
+                    for page, (etag, items) in pages.items()
+                ],
+            )
+
+    def prune_teams(self, slugs: List[str]) -> None:
+        placeholders = ", ".join("?" for _ in slugs)
+        with self.lock, self.connection:
+            for table, column in (
+                ("teams", "slug"),
+                ("team_members", "team_slug"),
+                ("team_repositories", "team_slug"),
+                ("team_pages", "team_slug"),
+            ):
+                self.connection.execute(
+                    f"DELETE FROM {table} WHERE {column} NOT IN ({placeholders})", slugs
+                )
+
+    def parent_team(self, team_slug: str) -> Optional[str]:
+        rows = self.select("SELECT payload FROM teams WHERE slug = ?", (team_slug,))
+        parent = json.loads(rows[0]["payload"]).get("parent") if rows else None
+        return parent["slug"] if parent else None
+
+    def repository_permissions(self, team_slug: str) -> Dict[str, Optional[str]]:
+        return {
+            repository["full_name"]: repository.get("role_name")
+            for _, items in self.cached_pages(team_slug, "repos").values()
+            for repository in items
+        }
+
+
+class OrgGraphLoader:
+    def __init__(self, github_client: Github, graph: OrgGraph) -> None:
+        self.github_client = github_client
+        self.graph = graph
+        self.requests = 0
+        self.revalidated = 0
+
+    def fetch_pages(self, requester: Any, url: str, team_slug: str, resource: str) -> Tuple[bool, List[Any]]:
+        cached = self.graph.cached_pages(team_slug, resource)
+        pages = {}
+        changed = False
+        page = 1
+        while True:
+            etag, items = cached.get(page, (None, None))
+            headers = {"If-None-Match": etag} if etag else {}
+            status, response_headers, body = requester.requestJson(
+                "GET", url, parameters={"per_page": TEAM_PAGE_SIZE, "page": page}, headers=headers
+            )
+            self.requests += 1
+            if status == 304:
+                # Not modified answers do not count against the rate limit
+                self.revalidated += 1
+            elif status >= 400:
+                raise GithubException(status, body, response_headers)
+            else:
+                etag, items = response_headers.get("etag"), json.loads(body)
+                changed = True
+            pages[page] = (etag, items)
+            if len(items) < TEAM_PAGE_SIZE:
+                break
+            page += 1
+        if set(pages) != set(cached):
+            changed = True
+        if changed:
+            self.graph.store_pages(team_slug, resource, pages)
+        return changed, [item for _, items in pages.values() for item in items]
+
+    def refresh(self, owner: str) -> None:
+        org = self.github_client.get_organization(owner)
+        teams = list(org.get_teams())
+        refreshed = 0
+        for team in teams:
+            url = f"/orgs/{owner}/teams/{team.slug}"
+            members_changed, members = self.fetch_pages(org._requester, f"{url}/members", team.slug, "members")
+            repos_changed, repos = self.fetch_pages(org._requester, f"{url}/repos", team.slug, "repos")
+            if members_changed or repos_changed:
+                refreshed += 1
+            self.graph.record_team(
+                team._rawData,
+                [member["login"] for member in members],
+                [repository["full_name"] for repository in repos],
+            )
+        self.graph.prune_teams([team.slug for team in teams])
+        logging.info(
+            f"Org graph of {owner}: {len(teams)} teams, {refreshed} changed, "
+            f"{self.revalidated} of {self.requests} pages revalidated unchanged"
+        )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Refresh the persisted team graph of an organization.")
+    parser.add_argument("--database", required=True, help="Path to the SQLite org graph")
+    parser.add_argument("--owner", required=True, help="Owner of the organization")
+    parser.add_argument("--token", required=True, help="GitHub token")
+    parser.add_argument(
+            "--github-host",
+            help="Base URL for self-hosted GitHub instance (e.g., https://api.github-example.com)",
+            default=None,
+        )
+    args = parser.parse_args()
+
+    github_client = create_github(args.token, args.github_host)
+    OrgGraphLoader(github_client, OrgGraph(args.database)).refresh(args.owner)
@@ -0,0 +1,80 @@
+import datetime
+import json
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+# orjson parses large list pages several times faster than json, it is
+# optional and the stdlib parser is used without it
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class PullRequestItem(NamedTuple):
+    number: int
+    created_at: int
+    updated_at: int
+    merged_at: Optional[int]
+    base_ref: Optional[str]
+
+
+class WorkflowRunItem(NamedTuple):
+    id: int
+    head_branch: Optional[str]
+    created_at: int
+    updated_at: int
+
+
+class CommitItem(NamedTuple):
+    sha: str
+    committed_at: Optional[int]
+
+
+def loads(content: bytes) -> Any:
+    return orjson.loads(content) if orjson else json.loads(content)
+
+
+def epoch(timestamp: Optional[str]) -> Optional[int]:
+    """Seconds since the epoch of a GitHub timestamp such as 2024-05-01T12:00:00Z."""
+    if timestamp is None:
+        return None
+    return int(datetime.datetime.fromisoformat(timestamp).timestamp())
+
+
+def epoch_date(seconds: int) -> datetime.date:
+    return datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc).date()
+
+
+# Each decoder keeps the fields the calculators read, the parsed page is
+# dropped as soon as the items are built
+
+def decode_pull_requests(content: bytes) -> List[PullRequestItem]:
+    return [
+        PullRequestItem(
+            pr["number"],
+            epoch(pr["created_at"]),
+            epoch(pr["updated_at"]),
+            epoch(pr.get("merged_at")),
+            (pr.get("base") or {}).get("ref"),
+        )
+        for pr in loads(content)
+    ]
+
+
+def decode_workflow_runs(content: bytes) -> Tuple[int, List[WorkflowRunItem]]:
+    page = loads(content)
+    return page.get("total_count", 0), [
+        WorkflowRunItem(run["id"], run.get("head_branch"), epoch(run["created_at"]), epoch(run["updated_at"]))
+        for run in page["workflow_runs"]
+    ]
+
+
+def decode_workflows(content: bytes) -> List[int]:
+    return [workflow["id"] for workflow in loads(content)["workflows"]]
+
+
+def decode_commits(content: bytes) -> List[CommitItem]:
+    return [
+        CommitItem(commit["sha"], epoch(((commit.get("commit") or {}).get("committer") or {}).get("date")))
+        for commit in loads(content)
+    ]
@@ -0,0 +1,105 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+
+class Stage(NamedTuple):
+    name: str
+    # Returns the item for the next stage, None drops it
+    handler: Callable[[Any], Awaitable[Optional[Any]]]
+    workers: int = 1
+
+
+class StageStats:
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self.processed = 0
+        self.busy_seconds = 0.0
+        self.max_queue_depth = 0
+        self.depth_samples = 0
+        self.depth_total = 0
+
+    def sample_depth(self, depth: int) -> None:
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        self.depth_samples += 1
+        self.depth_total += depth
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "processed": self.processed,
+            "busy_seconds": round(self.busy_seconds, 2),
+            "max_queue_depth": self.max_queue_depth,
+            "average_queue_depth": round(self.depth_total / self.depth_samples, 2) if self.depth_samples else 0,
+        }
+
+
+class Pipeline:
+    """Stages connected by bounded queues, a full queue holds the stage before it back.
+
+    Items flow to the next stage as soon as they are handled, so the last
+    stage starts on the first item while the first stage is still fetching.
+    A failing handler cancels the whole pipeline.
+    """
+
+    DONE = object()
+
+    def __init__(self, stages: List[Stage], queue_size: int = 4) -> None:
+        self.stages = stages
+        self.queues = [asyncio.Queue(maxsize=queue_size) for _ in stages]
+        self.stats = {stage.name: StageStats(stage.workers) for stage in stages}
+        self.running: List[int] = []
+
+    async def put(self, index: int, item: Any) -> None:
+        await self.queues[index].put(item)
+        self.stats[self.stages[index].name].sample_depth(self.queues[index].qsize())
+
+    async def work(self, index: int) -> None:
+        stage = self.stages[index]
+        stats = self.stats[stage.name]
+        while True:
+            item = await self.queues[index].get()
+            if item is self.DONE:
+                self.running[index] -= 1
+                if self.running[index]:
+                    # Left for the stage's other workers
+                    await self.queues[index].put(self.DONE)
+                elif index + 1 < len(self.stages):
+                    await self.queues[index + 1].put(self.DONE)
+                return
+            started = time.perf_counter()
+            result = await stage.handler(item)
+            stats.busy_seconds += time.perf_counter() - started
+            stats.processed += 1
+            if result is not None and index + 1 < len(self.stages):
+                await self.put(index + 1, result)
+
+    async def run(self, items: Iterable[Any]) -> Dict[str, Dict[str, Any]]:
+        async def feed() -> None:
+            for item in items:
+                await self.put(0, item)
+            await self.queues[0].put(self.DONE)
+
+        self.running = [stage.workers for stage in self.stages]
+        tasks = [asyncio.ensure_future(feed())] + [
+            asyncio.ensure_future(self.work(index))
+            for index, stage in enumerate(self.stages)
+            for _ in range(stage.workers)
+        ]
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in pending:
+            task.cancel()
+        for task in done:
+            if task.exception():
+                raise task.exception()
+        snapshot = {name: stats.snapshot() for name, stats in self.stats.items()}
+        logging.info(
+            "Pipeline stages: "
+            + ", ".join(
+                f"{name} {stats['processed']} items in {stats['busy_seconds']}s "
+                f"(queue max {stats['max_queue_depth']}, avg {stats['average_queue_depth']})"
+                for name, stats in snapshot.items()
+            )
+        )
+        return snapshot
@@ -0,0 +1,203 @@
+import argparse
+import datetime
+import hashlib
+import json
+import logging
+import math
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from checkpoint import Checkpoint
+from report_sink import ReportSink
+from warehouse import Warehouse
+
+
+PAGE_SIZE = 100
+
+
+class RepositoryPlan(NamedTuple):
+    repository: str
+    branches: List[str]
+    items: List[Dict[str, Any]]
+
+
+class ActivityCounts(NamedTuple):
+    pull_requests: int
+    merged_pull_requests: int
+    runs_per_branch: Dict[str, int]
+
+
+def build_plan(config: Dict[str, Any]) -> List[RepositoryPlan]:
+    """Group config items by repository, each repository is fetched once for all its branches."""
+    plans: Dict[str, RepositoryPlan] = {}
+    for item in config["items"]:
+        plan = plans.setdefault(item["repository"], RepositoryPlan(item["repository"], [], []))
+        if item["branch"] not in plan.branches:
+            plan.branches.append(item["branch"])
+        if item not in plan.items:
+            plan.items.append(item)
+    return list(plans.values())
+
+
+def pages(count: int) -> int:
+    return max(1, math.ceil(count / PAGE_SIZE))
+
+
+def estimate_requests(plan: RepositoryPlan, counts: ActivityCounts) -> Dict[str, int]:
+    # Mirrors WarehouseLoader.load_repository: the PR list is read one page
+    # past the window, merged PRs cost a detail and a first and last commit
+    # lookup, every PR a reviews page
+    estimate = {
+        "repository": 1,
+        "pull_request_pages": pages(counts.pull_requests + 1),
+        "pull_request_details": 3 * counts.merged_pull_requests,
+        "reviews": counts.pull_requests,
+        "workflow_run_pages": sum(pages(counts.runs_per_branch.get(branch, 0)) for branch in plan.branches),
+    }
+    estimate["total"] = sum(estimate.values())
+    return estimate
+
+
+def probe_counts(github_client: Any, owner: str, plan: RepositoryPlan, since: datetime.datetime) -> ActivityCounts:
+    # Search and run list totals cost one request each
+    full_name = f"{owner}/{plan.repository}"
+    created = since.date().isoformat()
+    pull_requests = github_client.search_issues(f"repo:{full_name} is:pr created:>={created}").totalCount
+    merged = github_client.search_issues(f"repo:{full_name} is:pr is:merged created:>={created}").totalCount
+    repo = github_client.get_repo(full_name)
+    runs = {
+        branch: repo.get_workflow_runs(branch=branch, created=f">={created}").totalCount
+        for branch in plan.branches
+    }
+    return ActivityCounts(pull_requests, merged, runs)
+
+
+def print_plan(
+    plans: List[RepositoryPlan], estimates: List[Dict[str, int]], config: Dict[str, Any]
+) -> None:
+    per_item_total = 0
+    for plan, estimate in zip(plans, estimates):
+        print(f"{config['owner']}/{plan.repository}: {len(plan.items)} items, branches {', '.join(plan.branches)}")
+        for item in plan.items:
+            print(f"  - {item['branch']}: workflows {', '.join(map(str, item.get('workflows') or [])) or 'all'}")
+        print("  requests: " + ", ".join(f"{key} {value}" for key, value in estimate.items()))
+        # Without grouping every item fetches the PRs again
+        per_item_total += estimate["total"] + (len(plan.items) - 1) * (
+            estimate["total"] - estimate["workflow_run_pages"]
+        )
+    total = sum(estimate["total"] for estimate in estimates)
+    print(f"Expected requests: {total} for {len(plans)} repositories (about {per_item_total} fetching per item)")
+
+
+def execute(
+    plans: List[RepositoryPlan],
+    config: Dict[str, Any],
+    github_client: Any,
+    warehouse: Warehouse,
+    time_frame: int,
+    sink: ReportSink,
+    checkpoint: Optional[Checkpoint] = None,
+) -> None:
+    from calculate_pr_metrics import RepositoryMetrics
+    from deployment_frequency import DeploymentFrequency
+    from lead_time_for_changes import LeadTimeForChanges
+    from warehouse import WarehouseLoader
+
+    owner = config["owner"]
+    # A resumed run keeps the window of the run it continues
+    since = (
+        checkpoint.started_at if checkpoint else datetime.datetime.now(datetime.timezone.utc)
+    ) - datetime.timedelta(days=time_frame)
+    loader = WarehouseLoader(github_client, warehouse)
+    for plan in plans:
+        unit = f"repo:{plan.repository}"
+        completed = checkpoint.completed(unit) if checkpoint else None
+        if completed is not None:
+            logging.info(f"{plan.repository} was completed before the restart")
+            for record in completed:
+                sink.add(**record)
+            continue
+        records = []
+        loader.load_repository(f"{owner}/{plan.repository}", plan.branches, time_frame, since)
+        metrics = RepositoryMetrics(
+            owner, plan.repository, time_frame, token=None, github_host=None, warehouse=warehouse, since=since
+        ).calculate_pr_metrics()
+        records.append(dict(kind="pr_metrics", owner=owner, repository=plan.repository, report=metrics, time_frame=time_frame))
+        for item in plan.items:
+            workflows = item.get("workflows") or []
+            reports = {
+                "deployment_frequency": DeploymentFrequency(
+                    owner, plan.repository, json.dumps(workflows), item["branch"], time_frame,
+                    token=None, github_host=None, warehouse=warehouse, since=since,
+                ),
+                "lead_time_for_changes": LeadTimeForChanges(
+                    owner, plan.repository, json.dumps(workflows), item["branch"], time_frame,
+                    token=None, github_host=None, ignore_workflows=False, warehouse=warehouse, since=since,
+                ),
+            }
+            for kind, calculator in reports.items():
+                records.append(
+                    dict(kind=kind, owner=owner, repository=plan.repository, report=calculator(), time_frame=time_frame, branch=item["branch"])
+                )
+        for record in records:
+            sink.add(**record)
+        if checkpoint:
+            checkpoint.complete(unit, records)
+    sink.flush()
+    if checkpoint:
+        checkpoint.finish()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Plan and run the DORA calculators for every item of a config file.")
+    parser.add_argument("--config", default="src/dora-config-v2.json", help="Path to the DORA config file")
+    parser.add_argument("--token", default=None, help="GitHub token, GitHub App installations are read from the environment")
+    parser.add_argument("--dry-run", action="store_true", help="Print the plan and its expected request count only")
+    parser.add_argument("--probe", action="store_true", help="With --dry-run, count PRs and runs through the API instead of assuming")
+    parser.add_argument("--assumed-prs", type=int, default=50, help="PRs per repository assumed by a dry run")
+    parser.add_argument("--assumed-merged", type=int, default=40, help="Merged PRs per repository assumed by a dry run")
+    parser.add_argument("--assumed-runs", type=int, default=100, help="Workflow runs per branch assumed by a dry run")
+    parser.add_argument("--database", default=":memory:", help="SQLite warehouse the shared fetches are loaded into")
+    parser.add_argument("--checkpoint", default=None, help="State file recording finished repositories, removed once the run succeeds")
+    parser.add_argument("--resume", action="store_true", help="Continue the run recorded in --checkpoint instead of starting over")
+    parser.add_argument("--report-file", default="dora-reports.ndjson", help="NDJSON file the reports are appended to")
+    args = parser.parse_args()
+    if args.resume and not args.checkpoint:
+        parser.error("--resume requires --checkpoint")
+
+    with open(args.config) as config_file:
+        config = json.load(config_file)
+    time_frame = int(config["doraTimeFrame"]) * 7
+    since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=time_frame)
+    plans = build_plan(config)
+
+    # Dry runs without --probe make no requests
+    github_client = None
+    if args.probe or not args.dry_run:
+        from github_auth import create_github
+
+        github_client = create_github(args.token, config.get("githubHost"), per_page=PAGE_SIZE)
+
+    if args.dry_run:
+        estimates = []
+        for plan in plans:
+            counts = (
+                probe_counts(github_client, config["owner"], plan, since)
+                if args.probe
+                else ActivityCounts(
+                    args.assumed_prs,
+                    args.assumed_merged,
+                    {branch: args.assumed_runs for branch in plan.branches},
+                )
+            )
+            estimates.append(estimate_requests(plan, counts))
+        print_plan(plans, estimates, config)
+    else:
+        # A changed config starts a new run
+        config_digest = hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+        checkpoint = (
+            Checkpoint(args.checkpoint, f"plan:{config_digest}", resume=args.resume) if args.checkpoint else None
+        )
+        execute(
+            plans, config, github_client, Warehouse(args.database), time_frame, ReportSink(args.report_file), checkpoint
+        )
@@ -1,18 +1,42 @@
+import hashlib
 import httpx
+import json
 import logging
-from typing import Any, Dict, List, Tuple
+import os
+from typing import Any, Dict, Optional
 
 
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
-)
+def entity_digest(entity_object: Dict[str, Any]) -> str:
+    return hashlib.sha256(
+        json.dumps(entity_object, sort_keys=True, separators=(",", ":"), default=str).encode()
+    ).hexdigest()
+
+
+def merged_view(entity: Dict[str, Any], entity_object: Dict[str, Any]) -> Dict[str, Any]:
+    # The fields of an existing entity a merge upsert of entity_object would write
+    view = {key: entity.get(key) for key in entity_object if key not in ("properties", "relations")}
+    for key in ("properties", "relations"):
+        if key in entity_object:
+            view[key] = {name: (entity.get(key) or {}).get(name) for name in entity_object[key]}
+    return view
 
 
 class PortAPI:
-    def __init__(self,port_client_id:str,port_client_secret:str):
+    def __init__(self,port_client_id:str,port_client_secret:str, entity_cache: Optional[str] = None):
         self.base_url = "https://api.getport.io/v1"
         self.port_client_id = port_client_id
         self.port_client_secret = port_client_secret
+        # Digest of the last payload pushed per blueprint/identifier, identical
+        # upserts are skipped. Kept in memory unless a file is given
+        self.entity_cache = entity_cache
+        self.entity_digests: Dict[str, str] = {}
+        self.remote_entities: Dict[str, Dict[str, Any]] = {}
+        self.writes = 0
+        self.skipped_writes = 0
+        if entity_cache and os.path.exists(entity_cache):
+            with open(entity_cache) as cache_file:
+                self.entity_digests = json.load(cache_file)
+            logging.info(f"Loaded {len(self.entity_digests)} entity digests from {entity_cache}")
 
     @property
     async def headers(self)->Dict[str,str]:
@@ -32,7 +56,7 @@ class PortAPI:
                     f"{self.base_url}/auth/access_token",
                     json=credentials
                 )
-                logging.info(f"Successfully retrieved port token")
+                logging.info("Successfully retrieved port token")
                 response.raise_for_status()
                 return response.json()
             except httpx.RequestError as exc:
@@ -41,7 +65,49 @@ class PortAPI:
                 logging.error(f"Error response {exc.response.status_code} while requesting {exc.request.url!r}: {exc.response.text}")
 
 
+    async def seed_entity_cache(self, blueprint_id: str) -> None:
+        """Read the blueprint's entities once, upserts that would not change them are skipped."""
+        async with httpx.AsyncClient() as client:
+            try:
+                response = await client.get(
+                    f"{self.base_url}/blueprints/{blueprint_id}/entities",
+                    params={"exclude_calculated_properties": "true"},
+                    headers=await self.headers,
+                )
+                response.raise_for_status()
+                entities = response.json()["entities"]
+            except httpx.RequestError as exc:
+                logging.error(f"An error occurred while requesting {exc.request.url!r}: {exc}")
+                return
+            except httpx.HTTPStatusError as exc:
+                logging.error(f"Error response {exc.response.status_code} while requesting {exc.request.url!r}: {exc.response.text}")
+                return
+        for entity in entities:
+            self.remote_entities[f"{blueprint_id}/{entity['identifier']}"] = entity
+        logging.info(f"Seeded entity cache with {len(entities)} {blueprint_id} entities")
+
+    def unchanged(self, key: str, entity_object: Dict[str, Any], digest: str) -> bool:
+        if self.entity_digests.get(key) == digest:
+            return True
+        remote = self.remote_entities.get(key)
+        return remote is not None and entity_digest(merged_view(remote, entity_object)) == digest
+
+    def save_entity_cache(self) -> None:
+        logging.info(f"Port entity writes: {self.writes} sent, {self.skipped_writes} skipped as unchanged")
+        if not self.entity_cache:
+            return
+        temporary_path = f"{self.entity_cache}.tmp"
+        with open(temporary_path, "w") as cache_file:
+            json.dump(self.entity_digests, cache_file, separators=(",", ":"))
+        os.replace(temporary_path, self.entity_cache)
+
     async def add_entity(self, blueprint_id: str, entity_object: Dict[str, Any]):
+        key = f"{blueprint_id}/{entity_object['identifier']}"
+        digest = entity_digest(entity_object)
+        if self.unchanged(key, entity_object, digest):
+            self.skipped_writes += 1
+            logging.info(f"Entity {key} unchanged, skipping upsert")
+            return
         async with httpx.AsyncClient() as client:
             try:
                 response = await client.post(
@@ -51,6 +117,8 @@ class PortAPI:
                 ) #https://api.getport.io/v1/blueprints/githubTeam/entities?upsert=true&merge=true
                 response.raise_for_status()
                 logging.info(f"Entity added: {response.json()}")
+                self.entity_digests[key] = digest
+                self.writes += 1
             except httpx.RequestError as exc:
                 logging.error(f"An error occurred while requesting {exc.request.url!r}: {exc}")
             except httpx.HTTPStatusError as exc:
@@ -0,0 +1,108 @@
+import datetime
+import logging
+import math
+from typing import Any, Iterator, List, NamedTuple
+
+from github import Github
+from github.Issue import Issue
+from github.PullRequest import PullRequest
+from github_client import payload_value
+
+
+# The search API never returns more than 1000 results for a single query
+SEARCH_RESULT_CAP = 1000
+SEARCH_DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+class SearchWindow(NamedTuple):
+    total: int
+    results: Any
+    first_page: List[Issue]
+
+
+class PullRequestSearch:
+    """Lists in-window pull requests through the issue search API instead of per-repo listings."""
+
+    def __init__(self, github_client: Github) -> None:
+        self.github_client = github_client
+
+    def search(
+        self, qualifiers: str, start: datetime.datetime, end: datetime.datetime
+    ) -> Iterator[PullRequest]:
+        seen = set()
+        for window in self.split_windows(qualifiers, start, end):
+            for issue in self.search_window(window):
+                pr = self.to_pull_request(issue)
+                if pr.url not in seen:
+                    seen.add(pr.url)
+                    yield pr
+
+    def build_query(
+        self, qualifiers: str, start: datetime.datetime, end: datetime.datetime
+    ) -> str:
+        return (
+            f"{qualifiers} is:pr "
+            f"created:{start.strftime(SEARCH_DATE_FORMAT)}..{end.strftime(SEARCH_DATE_FORMAT)}"
+        )
+
+    def open_window(
+        self, qualifiers: str, start: datetime.datetime, end: datetime.datetime
+    ) -> SearchWindow:
+        results = self.github_client.search_issues(
+            self.build_query(qualifiers, start, end), sort="created", order="desc"
+        )
+        # get_page records the real total_count; totalCount alone would be
+        # derived from the (capped) link header
+        first_page = results.get_page(0)
+        return SearchWindow(results.totalCount if first_page else 0, results, first_page)
+
+    def split_windows(
+        self, qualifiers: str, start: datetime.datetime, end: datetime.datetime
+    ) -> Iterator[SearchWindow]:
+        # Windows come out newest first, like the results inside each, so a
+        # deadline drops the oldest PRs; each already holds its first page
+        pending = [(start, end)]
+        windows = 0
+        while pending:
+            window_start, window_end = pending.pop()
+            window = self.open_window(qualifiers, window_start, window_end)
+            span = window_end - window_start
+            if window.total <= SEARCH_RESULT_CAP or span <= datetime.timedelta(seconds=1):
+                if window.total > SEARCH_RESULT_CAP:
+                    logging.warning(
+                        f"{window.total} results between {window_start} and {window_end}, only {SEARCH_RESULT_CAP} are reachable"
+                    )
+                if window.total:
+                    windows += 1
+                    yield window
+                continue
+            middle = (window_start + span / 2).replace(microsecond=0)
+            pending.append((window_start, middle))
+            pending.append((middle + datetime.timedelta(seconds=1), window_end))
+        logging.info(f"Searched '{qualifiers}' in {windows} date windows")
+
+    def search_window(self, window: SearchWindow) -> Iterator[Issue]:
+        yield from window.first_page
+        page_count = math.ceil(
+            min(window.total, SEARCH_RESULT_CAP) / self.github_client.per_page
+        )
+        for page in range(1, page_count):
+            yield from window.results.get_page(page)
+
+    @staticmethod
+    def to_pull_request(issue: Issue) -> PullRequest:
+        # Build the PR from the search hit so reviews and details can be
+        # requested without first completing the object
+        pull_request = payload_value(issue, "pull_request") or {}
+        attributes = {
+            "url": pull_request.get("url"),
+            "html_url": pull_request.get("html_url"),
+            "merged_at": pull_request.get("merged_at"),
+            "number": payload_value(issue, "number"),
+            "title": payload_value(issue, "title"),
+            "state": payload_value(issue, "state"),
+            "user": payload_value(issue, "user"),
+            "created_at": payload_value(issue, "created_at"),
+            "closed_at": payload_value(issue, "closed_at"),
+        }
+        return PullRequest(issue._requester, {}, attributes, completed=False)
@@ -0,0 +1,170 @@
+import argparse
+import datetime
+import itertools
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from commit_index import CommitDateIndex, CommitDateResolver
+from deadline import DeadlineExceeded, deadline, parse_duration
+from github_client import SHARE_REQUESTS_HELP, lazy_completions, payload_value, shared_requests
+from report_sink import ReportSink
+
+
+class RepoDataset:
+    """Pull requests, reviews, commit dates and workflow runs of one repository window, each fetched once.
+
+    PRs are listed by last update, which covers both the PRs opened in the
+    window (PR metrics) and the ones merged in it (lead time). Runs are
+    listed per workflow for the window and filtered by branch locally, so
+    several branches share them.
+    """
+
+    def __init__(
+        self,
+        github_client: Any,
+        full_name: str,
+        number_of_days: int,
+        commit_index: Optional[CommitDateIndex] = None,
+    ) -> None:
+        self.github_client = github_client
+        self.repo = github_client.get_repo(full_name)
+        self.start_date = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=number_of_days)
+        self.commit_dates = CommitDateResolver(self.repo, commit_index)
+        self.lock = threading.Lock()
+        self._pull_requests: Optional[List[Any]] = None
+        self._workflows: Optional[List[int]] = None
+        self._details: Dict[int, Any] = {}
+        self._reviews: Dict[int, List[Tuple[str, datetime.datetime]]] = {}
+        self._runs: Dict[Any, List[Any]] = {}
+
+    def pull_requests(self) -> List[Any]:
+        with self.lock:
+            if self._pull_requests is None:
+                prs = self.repo.get_pulls(state="all", sort="updated", direction="desc")
+                self._pull_requests = []
+                try:
+                    for pr in itertools.takewhile(lambda pr: pr.updated_at >= self.start_date, prs):
+                        self._pull_requests.append(pr)
+                        deadline.check()
+                except DeadlineExceeded:
+                    logging.warning("Stopped listing pull requests at the deadline")
+                logging.info(f"Listed {len(self._pull_requests)} pull requests updated since {self.start_date:%Y-%m-%d}")
+            return self._pull_requests
+
+    def opened_pull_requests(self) -> List[Any]:
+        return [pr for pr in self.pull_requests() if pr.created_at >= self.start_date]
+
+    def merged_pull_requests(self, branch: str) -> List[Any]:
+        return [
+            pr
+            for pr in self.pull_requests()
+            if pr.merged_at is not None and pr.merged_at >= self.start_date and pr.base.ref == branch
+        ]
+
+    def pull_request_details(self, pr: Any) -> Any:
+        # The pulls list payload has no additions/deletions/commits totals
+        if payload_value(pr, "additions") is not None:
+            return pr
+        with self.lock:
+            details = self._details.get(pr.number)
+        if details is None:
+            details = self.repo.get_pull(pr.number)
+            with self.lock:
+                self._details[pr.number] = details
+        return details
+
+    def reviews(self, pr: Any) -> List[Tuple[str, datetime.datetime]]:
+        with self.lock:
+            reviews = self._reviews.get(pr.number)
+        if reviews is None:
+            reviews = [(review.state, review.submitted_at) for review in pr.get_reviews()]
+            with self.lock:
+                self._reviews[pr.number] = reviews
+        return reviews
+
+    def workflows(self) -> List[int]:
+        with self.lock:
+            if self._workflows is None:
+                self._workflows = [workflow.id for workflow in self.repo.get_workflows()]
+                logging.info(f"Found {len(self._workflows)} workflows in Repo")
+            return self._workflows
+
+    def workflow_runs(self, workflow_id: Any, branch: str) -> List[Any]:
+        with self.lock:
+            runs = self._runs.get(workflow_id)
+            if runs is None:
+                runs = list(
+                    self.repo.get_workflow(workflow_id).get_runs(
+                        created=f">={self.start_date.date().isoformat()}"
+                    )
+                )
+                self._runs[workflow_id] = runs
+        return [run for run in runs if run.head_branch == branch and run.created_at > self.start_date]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Calculate PR metrics, deployment frequency and lead time from one fetch of a repository.")
+    parser.add_argument("--owner", required=True, help="Owner of the repository")
+    parser.add_argument("--repo", required=True, help="Repository name")
+    parser.add_argument("--token", required=True, help="GitHub token")
+    parser.add_argument(
+            "--github-host",
+            help="Base URL for self-hosted GitHub instance (e.g., https://api.example-github.com)",
+            default=None,
+        )
+    parser.add_argument("--workflows", default="[]", help="GitHub workflows as a JSON string.")
+    parser.add_argument("--branch", default="main", help="Branch name")
+    parser.add_argument("--time-frame", type=int, default=30, help="Time Frame in days")
+    parser.add_argument("--platform", default="github-actions", choices=["github-actions", "self-hosted"], help="CI/CD platform type")
+    parser.add_argument("--ignore_workflows", action="store_true", help="Exclude workflows from lead time. Default is False.")
+    parser.add_argument("--exclude-paths", nargs="*", default=[], help="Glob patterns of files left out of LOC changed")
+    parser.add_argument("--commit-index", default=None, help="JSON file memoizing commit dates across runs")
+    parser.add_argument("--report-file", default=None, help="Append the reports to this NDJSON file instead of GITHUB_ENV")
+    parser.add_argument("--deadline", type=parse_duration, default=None, help="Stop fetching after this long (e.g. 300, 15m, 1h) and report what was covered")
+    parser.add_argument("--share-requests", action="store_true", help=SHARE_REQUESTS_HELP)
+    args = parser.parse_args()
+    deadline.start(args.deadline)
+    if args.share_requests:
+        shared_requests.install()
+
+    from calculate_pr_metrics import RepositoryMetrics
+    from deployment_frequency import DeploymentFrequency
+    from github_auth import create_github
+    from lead_time_for_changes import LeadTimeForChanges
+
+    commit_index = CommitDateIndex(args.commit_index)
+    dataset = RepoDataset(
+        create_github(args.token, args.github_host), f"{args.owner}/{args.repo}", args.time_frame, commit_index
+    )
+    common = dict(token=args.token, github_host=args.github_host, dataset=dataset)
+    metrics = RepositoryMetrics(
+        args.owner, args.repo, args.time_frame, exclude_paths=args.exclude_paths, **common
+    ).calculate_pr_metrics()
+    deployment_frequency_report = DeploymentFrequency(
+        args.owner, args.repo, args.workflows, args.branch, args.time_frame, **common
+    )()
+    lead_time_report = LeadTimeForChanges(
+        args.owner, args.repo, args.workflows, args.branch, args.time_frame,
+        ignore_workflows=args.ignore_workflows,
+        **common,
+    )()
+    commit_index.save()
+    logging.info(f"Lazy completion fetches: {lazy_completions.snapshot()}")
+    logging.info(f"Shared GitHub requests: {shared_requests.snapshot()}")
+
+    metrics_json = json.dumps(metrics, default=str)
+    if args.report_file:
+        sink = ReportSink(args.report_file)
+        sink.add("pr_metrics", args.owner, args.repo, metrics, time_frame=args.time_frame)
+        sink.add("deployment_frequency", args.owner, args.repo, deployment_frequency_report, time_frame=args.time_frame, branch=args.branch)
+        sink.add("lead_time_for_changes", args.owner, args.repo, lead_time_report, time_frame=args.time_frame, branch=args.branch)
+        sink.flush()
+    elif args.platform == "github-actions":
+        with open(os.getenv("GITHUB_ENV"), "a") as github_env:
+            github_env.write(f"metrics={metrics_json}\n")
+            github_env.write(f"deployment_frequency_report={deployment_frequency_report}\n")
+            github_env.write(f"lead_time_for_changes_report={lead_time_report}\n")
@@ -0,0 +1,143 @@
+import argparse
+import asyncio
+import json
+import logging
+import re
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Tuple
+
+if TYPE_CHECKING:
+    # httpx is only needed to upsert, not by the calculators writing reports
+    import port
+
+
+# Port property name -> report field, per report kind
+DORA_PROPERTIES = {
+    "deployment_frequency": {
+        "totalDeployments": "total_deployments",
+        "deploymentRating": "rating",
+        "numberOfUniqueDeploymentDays": "number_of_unique_deployment_days",
+        "numberOfUniqueDeploymentWeeks": "number_of_unique_deployment_weeks",
+        "numberOfUniqueDeploymentMonths": "number_of_unique_deployment_months",
+        "deploymentFrequency": "deployment_frequency",
+    },
+    "lead_time_for_changes": {
+        "leadTimeForChangesInHours": "lead_time_for_changes_in_hours",
+        "leadTimeRating": "rating",
+        "workflowAverageTimeDuration": "workflow_average_time_duration",
+        "prAverageTimeDuration": "pr_average_time_duration",
+    },
+    "pr_metrics": {
+        "averageOpenToCloseTime": "average_open_to_close_time",
+        "averageTimeToFirstReview": "average_time_to_first_review",
+        "averageTimeToApproval": "average_time_to_approval",
+        "prsOpened": "prs_opened",
+        "weeklyPrsMerged": "weekly_prs_merged",
+        "averageReviewsPerPr": "average_reviews_per_pr",
+        "averageCommitsPerPr": "average_commits_per_pr",
+        "averageLocChangedPerPr": "average_loc_changed_per_pr",
+        "averagePrsReviewedPerWeek": "average_prs_reviewed_per_week",
+    },
+    "change_failure_rate": {
+        "changeFailureRate": "change_failure_rate",
+        "changeFailureRating": "rating",
+    },
+    "time_to_restore": {
+        "timeToRestoreInHours": "time_to_restore_in_hours",
+        "timeToRestoreRating": "rating",
+    },
+}
+
+
+def entity_title(repository: str) -> str:
+    cleaned_name = re.sub(r"[^A-Za-z0-9]", " ", repository)
+    return " ".join(word.capitalize() for word in cleaned_name.split())
+
+
+def build_dora_entity(
+    repository: str, time_frame: int, reports: Dict[str, Dict[str, Any]]
+) -> Dict[str, Any]:
+    properties: Dict[str, Any] = {"timeFrameInWeeks": time_frame}
+    for kind, report in reports.items():
+        for property_name, field in DORA_PROPERTIES.get(kind, {}).items():
+            properties[property_name] = report[field]
+    return {
+        "identifier": f"{repository}-{time_frame}",
+        "title": entity_title(repository),
+        "properties": properties,
+        "relations": {"service": repository},
+    }
+
+
+class ReportSink:
+    """Collects calculator reports in memory and writes them once as NDJSON."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.records: List[Dict[str, Any]] = []
+
+    def add(
+        self, kind: str, owner: str, repository: str, report: Any, **context: Any
+    ) -> None:
+        if isinstance(report, str):
+            report = json.loads(report)
+        self.records.append(
+            {"kind": kind, "owner": owner, "repository": repository, **context, "report": report}
+        )
+
+    def flush(self) -> None:
+        # Appending lets every calculator of a job share one artifact
+        with open(self.path, "a") as report_file:
+            report_file.writelines(
+                json.dumps(record, separators=(",", ":"), default=str) + "\n"
+                for record in self.records
+            )
+        logging.info(f"Wrote {len(self.records)} reports to {self.path}")
+        self.records = []
+
+
+def read_reports(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path) as report_file:
+        for line in report_file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def group_reports(
+    records: Iterator[Dict[str, Any]]
+) -> Dict[Tuple[str, int], Dict[str, Dict[str, Any]]]:
+    grouped: Dict[Tuple[str, int], Dict[str, Dict[str, Any]]] = {}
+    for record in records:
+        key = (record["repository"], record["time_frame"])
+        grouped.setdefault(key, {})[record["kind"]] = record["report"]
+    return grouped
+
+
+async def upsert_reports(path: str, blueprint: str, port_api: "port.PortAPI", seed_cache: bool = False) -> None:
+    entities = [
+        build_dora_entity(repository, time_frame, reports)
+        for (repository, time_frame), reports in group_reports(read_reports(path)).items()
+    ]
+    logging.info(f"Upserting {len(entities)} {blueprint} entities from {path}")
+    if seed_cache:
+        await port_api.seed_entity_cache(blueprint)
+    await asyncio.gather(
+        *(port_api.add_entity(blueprint_id=blueprint, entity_object=entity) for entity in entities)
+    )
+    port_api.save_entity_cache()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Upsert the DORA reports of a report file to Port.")
+    parser.add_argument("--report-file", required=True, help="NDJSON file written by the calculators")
+    parser.add_argument("--blueprint", required=True, help="DORA metrics blueprint ID in Port")
+    parser.add_argument("--port-client-id", help="Port Client ID", required=True)
+    parser.add_argument("--port-client-secret", help="Port Client Secret", required=True)
+    parser.add_argument("--entity-cache", default=None, help="JSON file of pushed entity digests, unchanged entities are not written again")
+    parser.add_argument("--seed-entity-cache", action="store_true", help="Read the blueprint's entities first and skip upserts that would not change them")
+    args = parser.parse_args()
+
+    from port import PortAPI
+
+    port_api = PortAPI(args.port_client_id, args.port_client_secret, entity_cache=args.entity_cache)
+    asyncio.run(upsert_reports(args.report_file, args.blueprint, port_api, seed_cache=args.seed_entity_cache))
@@ -0,0 +1,89 @@
+import datetime
+import math
+import random
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+# Two-sided 95% normal quantile
+Z_95 = 1.96
+
+
+def stratify(items: Sequence[Any], key: Callable[[Any], Hashable]) -> Dict[Hashable, List[Any]]:
+    strata: Dict[Hashable, List[Any]] = {}
+    for item in items:
+        strata.setdefault(key(item), []).append(item)
+    return strata
+
+
+def allocate(
+    strata: Dict[Hashable, List[Any]], budget: int, cost: Callable[[Hashable], int]
+) -> Dict[Hashable, int]:
+    """Proportional allocation whose expected request cost stays within the budget.
+
+    Every stratum gets at least one item while the budget allows it, largest
+    strata first.
+    """
+    total_cost = sum(len(items) * cost(key) for key, items in strata.items())
+    if total_cost <= budget:
+        return {key: len(items) for key, items in strata.items()}
+
+    def sizes(fraction: float) -> Dict[Hashable, int]:
+        return {key: min(len(items), max(1, math.floor(fraction * len(items)))) for key, items in strata.items()}
+
+    def spend(allocation: Dict[Hashable, int]) -> int:
+        return sum(count * cost(key) for key, count in allocation.items())
+
+    fraction = budget / total_cost
+    allocation = sizes(fraction)
+    while spend(allocation) > budget and fraction > 0:
+        fraction *= 0.9
+        allocation = sizes(fraction)
+        if all(count == 1 for count in allocation.values()):
+            break
+    # Not even one item per stratum fits, keep the largest strata
+    for key in sorted(strata, key=lambda key: len(strata[key])):
+        if spend(allocation) <= budget:
+            break
+        allocation[key] = 0
+    return allocation
+
+
+def draw(
+    strata: Dict[Hashable, List[Any]], allocation: Dict[Hashable, int], seed: Optional[int] = None
+) -> Dict[Hashable, List[Any]]:
+    generator = random.Random(seed)
+    return {
+        key: generator.sample(strata[key], count) for key, count in allocation.items() if count
+    }
+
+
+def stratified_mean(samples: Dict[Hashable, Tuple[int, List[float]]]) -> Tuple[float, float]:
+    """Mean over strata of known sizes and its 95% half-width, with finite population correction.
+
+    samples maps each stratum to (population size, sampled values). Strata
+    with a single value add no variance term.
+    """
+    population = sum(size for size, values in samples.values() if values)
+    if not population:
+        return 0.0, 0.0
+    mean = 0.0
+    variance = 0.0
+    for size, values in samples.values():
+        if not values:
+            continue
+        weight = size / population
+        stratum_mean = sum(values) / len(values)
+        mean += weight * stratum_mean
+        if len(values) > 1:
+            stratum_variance = sum((value - stratum_mean) ** 2 for value in values) / (len(values) - 1)
+            variance += weight ** 2 * (1 - len(values) / size) * stratum_variance / len(values)
+    return mean, Z_95 * math.sqrt(variance)
+
+
+def scale(record: Dict[str, Any], weight: float) -> Dict[str, Any]:
+    # Counts and durations stand for weight items, other fields are kept
+    return {
+        key: value * weight
+        if isinstance(value, (int, float, datetime.timedelta)) and not isinstance(value, bool)
+        else value
+        for key, value in record.items()
+    }
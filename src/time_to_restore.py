@@ -0,0 +1,131 @@
+import datetime
+import os
+import json
+import argparse
+import logging
+from deadline import deadline, parse_duration
+from deployment_frequency import DeploymentFrequency
+from incidents import collect_incidents, restored_at
+from warehouse import Warehouse
+from report_sink import ReportSink
+
+
+class TimeToRestore:
+    def __init__(
+        self,
+        owner,
+        repo,
+        workflows,
+        branch,
+        number_of_days,
+        token,
+        github_host,
+        incidents_file=None,
+        pagerduty_token=None,
+        services=None,
+        warehouse=None,
+    ):
+        self.owner, self.repo = owner, repo
+        self.branch = branch
+        self.number_of_days = number_of_days
+        self.incidents_file = incidents_file
+        self.pagerduty_token = pagerduty_token
+        self.services = services or []
+        self.deployment_frequency = DeploymentFrequency(
+            owner, repo, workflows, branch, number_of_days, token, github_host, warehouse=warehouse
+        )
+
+    def get_incidents(self):
+        since = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=self.number_of_days)
+        return collect_incidents(since, self.incidents_file, self.pagerduty_token, self.services)
+
+    def restore_durations(self, incidents):
+        # Deployments are only needed to close incidents that were never
+        # resolved in PagerDuty
+        deployments = []
+        if any(incident.resolved_at is None for incident in incidents):
+            deployments = sorted(self.deployment_frequency.fetch_deployment_times())
+        durations = []
+        for incident in incidents:
+            restored = restored_at(incident, deployments)
+            if restored is not None:
+                durations.append(restored - incident.started_at)
+        return durations
+
+    @staticmethod
+    def compute_rating(time_to_restore_in_hours, restored_incidents):
+        if not restored_incidents:
+            return "None", "lightgrey"
+        elif time_to_restore_in_hours < 1:
+            return "Elite", "brightgreen"
+        elif time_to_restore_in_hours <= 24:
+            return "High", "green"
+        elif time_to_restore_in_hours <= 24 * 7:
+            return "Medium", "yellow"
+        else:
+            return "Low", "red"
+
+    def __call__(self):
+        incidents = self.get_incidents()
+        durations = self.restore_durations(incidents)
+        time_to_restore_in_hours = (
+            sum(duration.total_seconds() for duration in durations) / len(durations) / 3600
+            if durations
+            else 0
+        )
+        rating, color = self.compute_rating(time_to_restore_in_hours, len(durations))
+
+        logging.info(f"Owner/Repo: {self.owner}/{self.repo}")
+        logging.info(f"Number of days: {self.number_of_days}")
+        logging.info(f"{len(durations)} of {len(incidents)} incidents were restored")
+        logging.info(f"Time to restore in hours: {time_to_restore_in_hours}")
+        logging.info(f"Rating: {rating} ({color})")
+
+        return json.dumps(deadline.annotate({
+            "time_to_restore_in_hours": round(time_to_restore_in_hours, 2),
+            "rating": rating,
+            "number_of_incidents": len(incidents),
+            "number_of_restored_incidents": len(durations),
+        }), default=str)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description='Calculate Time to Restore Service.')
+    parser.add_argument('--owner', required=True, help='Owner of the repository')
+    parser.add_argument('--repo', required=True, help='Repository name')
+    parser.add_argument('--token', required=True, help='GitHub token')
+    parser.add_argument(
+            "--github-host",
+            help="Base URL for self-hosted GitHub instance (e.g., https://api.example-github.com)",
+            default=None,
+        )
+    parser.add_argument('--workflows', required=True, help='GitHub workflows as a JSON string.')
+    parser.add_argument('--branch', default='main', help='Branch name')
+    parser.add_argument('--time-frame', type=int, default=30, help='Time Frame in days')
+    parser.add_argument('--incidents-file', default=None, help='PagerDuty incidents JSON export')
+    parser.add_argument('--pagerduty-token', default=None, help='PagerDuty API token, used when no incidents file is given')
+    parser.add_argument('--service', action='append', required=True, help='PagerDuty service id or name of this repository, can be repeated')
+    parser.add_argument('--platform', default='github-actions', choices=['github-actions', 'self-hosted'], help='CI/CD platform type')
+    parser.add_argument('--warehouse', default=None, help='Read deployments from this local warehouse database instead of the GitHub API')
+    parser.add_argument('--report-file', default=None, help='Append the report to this NDJSON file instead of GITHUB_ENV')
+    parser.add_argument('--deadline', type=parse_duration, default=None, help='Stop fetching after this long (e.g. 300, 15m, 1h) and report what was covered')
+    args = parser.parse_args()
+    deadline.start(args.deadline)
+
+    time_to_restore = TimeToRestore(
+        args.owner, args.repo, args.workflows, args.branch, args.time_frame,
+        token=args.token, github_host=args.github_host,
+        incidents_file=args.incidents_file, pagerduty_token=args.pagerduty_token,
+        services=args.service,
+        warehouse=Warehouse(args.warehouse) if args.warehouse else None,
+    )
+    report = time_to_restore()
+    print(report)
+
+    if args.report_file:
+        sink = ReportSink(args.report_file)
+        sink.add("time_to_restore", args.owner, args.repo, report, time_frame=args.time_frame, branch=args.branch)
+        sink.flush()
+    elif args.platform == "github-actions":
+       with open(os.getenv("GITHUB_ENV"), "a") as github_env:
+           github_env.write(f"time_to_restore_report={report}\n")
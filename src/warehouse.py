@@ -0,0 +1,589 @@
+import argparse
+import datetime
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from github import Github
+
+    import commit_index
+
+
+GITHUB_TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS repositories (
+    full_name TEXT PRIMARY KEY,
+    id INTEGER
+);
+CREATE TABLE IF NOT EXISTS pull_requests (
+    repository TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    base_branch TEXT,
+    head_sha TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT,
+    merged_at TEXT,
+    commits INTEGER,
+    additions INTEGER,
+    deletions INTEGER,
+    PRIMARY KEY (repository, number)
+);
+CREATE INDEX IF NOT EXISTS pull_requests_by_branch
+    ON pull_requests (repository, base_branch, created_at);
+CREATE TABLE IF NOT EXISTS commits (
+    repository TEXT NOT NULL,
+    sha TEXT NOT NULL,
+    committed_at TEXT NOT NULL,
+    PRIMARY KEY (repository, sha)
+);
+CREATE TABLE IF NOT EXISTS pull_request_commits (
+    repository TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    sha TEXT NOT NULL,
+    PRIMARY KEY (repository, number, position)
+);
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY,
+    repository TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    user_login TEXT,
+    state TEXT,
+    submitted_at TEXT
+);
+CREATE INDEX IF NOT EXISTS reviews_by_pr ON reviews (repository, number, submitted_at);
+CREATE TABLE IF NOT EXISTS review_requests (
+    team_slug TEXT NOT NULL,
+    repository TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    PRIMARY KEY (team_slug, repository, number)
+);
+CREATE TABLE IF NOT EXISTS workflow_runs (
+    id INTEGER PRIMARY KEY,
+    repository TEXT NOT NULL,
+    workflow_id INTEGER,
+    workflow_file TEXT,
+    head_branch TEXT,
+    status TEXT,
+    conclusion TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT
+);
+CREATE INDEX IF NOT EXISTS workflow_runs_by_branch
+    ON workflow_runs (repository, head_branch, created_at);
+CREATE TABLE IF NOT EXISTS deployments (
+    id INTEGER PRIMARY KEY,
+    repository TEXT NOT NULL,
+    deployment_id INTEGER,
+    environment TEXT,
+    ref TEXT,
+    sha TEXT,
+    state TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS deployments_by_repository
+    ON deployments (repository, created_at);
+CREATE TABLE IF NOT EXISTS teams (
+    slug TEXT PRIMARY KEY,
+    id INTEGER,
+    payload TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS team_members (
+    team_slug TEXT NOT NULL,
+    login TEXT NOT NULL,
+    PRIMARY KEY (team_slug, login)
+);
+CREATE TABLE IF NOT EXISTS team_repositories (
+    team_slug TEXT NOT NULL,
+    repository TEXT NOT NULL,
+    PRIMARY KEY (team_slug, repository)
+);
+"""
+
+
+def parse_timestamp(value: Optional[str]) -> Optional[datetime.datetime]:
+    if value is None:
+        return None
+    return datetime.datetime.strptime(value, GITHUB_TIMESTAMP_FORMAT).replace(
+        tzinfo=datetime.timezone.utc
+    )
+
+
+def format_timestamp(value: datetime.datetime) -> str:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc).strftime(GITHUB_TIMESTAMP_FORMAT)
+
+
+class Warehouse:
+    """Normalized local copy of the GitHub data the metric calculators read."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.depth = 0
+        with self.lock, self.connection:
+            self.connection.executescript(SCHEMA)
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Commits the writes made inside it together, nested transactions join the outer one."""
+        with self.lock:
+            self.depth += 1
+            try:
+                if self.depth > 1:
+                    yield
+                else:
+                    with self.connection:
+                        yield
+            finally:
+                self.depth -= 1
+
+    def select(self, query: str, parameters: Any = ()) -> List[sqlite3.Row]:
+        with self.lock:
+            return self.connection.execute(query, parameters).fetchall()
+
+    # Writes
+
+    def record_repository(self, full_name: str, repository_id: Optional[int]) -> None:
+        with self.transaction():
+            self.connection.execute(
+                "INSERT OR REPLACE INTO repositories (full_name, id) VALUES (?, ?)",
+                (full_name, repository_id),
+            )
+
+    def upsert_pull_request(self, repository: str, pull_request: Dict[str, Any]) -> None:
+        # Trimmed PR payloads (review events, list pages) never overwrite
+        # totals taken from a full payload, and stale deliveries are ignored
+        with self.transaction():
+            self.connection.execute(
+                """
+                INSERT INTO pull_requests (
+                    repository, number, base_branch, head_sha, created_at, updated_at,
+                    merged_at, commits, additions, deletions
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (repository, number) DO UPDATE SET
+                    base_branch = COALESCE(excluded.base_branch, pull_requests.base_branch),
+                    head_sha = COALESCE(excluded.head_sha, pull_requests.head_sha),
+                    updated_at = excluded.updated_at,
+                    merged_at = excluded.merged_at,
+                    commits = COALESCE(excluded.commits, pull_requests.commits),
+                    additions = COALESCE(excluded.additions, pull_requests.additions),
+                    deletions = COALESCE(excluded.deletions, pull_requests.deletions)
+                WHERE pull_requests.updated_at IS NULL
+                    OR excluded.updated_at >= pull_requests.updated_at
+                """,
+                (
+                    repository,
+                    pull_request["number"],
+                    (pull_request.get("base") or {}).get("ref"),
+                    (pull_request.get("head") or {}).get("sha"),
+                    pull_request["created_at"],
+                    pull_request.get("updated_at"),
+                    pull_request.get("merged_at"),
+                    pull_request.get("commits"),
+                    pull_request.get("additions"),
+                    pull_request.get("deletions"),
+                ),
+            )
+            for team in pull_request.get("requested_teams") or []:
+                self.add_review_request(repository, pull_request["number"], team)
+
+    def add_review_request(self, repository: str, number: int, team: Dict[str, Any]) -> None:
+        with self.transaction():
+            self.connection.execute(
+                "INSERT OR IGNORE INTO review_requests (team_slug, repository, number) VALUES (?, ?, ?)",
+                (team["slug"], repository, number),
+            )
+            self.connection.execute(
+                "INSERT OR IGNORE INTO teams (slug, id, payload) VALUES (?, ?, ?)",
+                (team["slug"], team.get("id"), json.dumps(team)),
+            )
+
+    def remove_review_request(self, repository: str, number: int, team_slug: str) -> None:
+        with self.transaction():
+            self.connection.execute(
+                "DELETE FROM review_requests WHERE team_slug = ? AND repository = ? AND number = ?",
+                (team_slug, repository, number),
+            )
+
+    def record_pull_request_commits(
+        self,
+        repository: str,
+        number: int,
+        commits: Iterable[Tuple[str, datetime.datetime]],
+        first_position: int = 0,
+    ) -> None:
+        with self.transaction():
+            for position, (sha, committed_at) in enumerate(commits, start=first_position):
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO commits (repository, sha, committed_at) VALUES (?, ?, ?)",
+                    (repository, sha, format_timestamp(committed_at)),
+                )
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO pull_request_commits (repository, number, position, sha) "
+                    "VALUES (?, ?, ?, ?)",
+                    (repository, number, position, sha),
+                )
+
+    def upsert_review(self, repository: str, number: int, review: Dict[str, Any]) -> None:
+        with self.transaction():
+            self.connection.execute(
+                "INSERT OR REPLACE INTO reviews (id, repository, number, user_login, state, submitted_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    review["id"],
+                    repository,
+                    number,
+                    (review.get("user") or {}).get("login"),
+                    (review.get("state") or "").upper(),
+                    review.get("submitted_at"),
+                ),
+            )
+
+    def upsert_workflow_run(self, repository: str, run: Dict[str, Any]) -> None:
+        with self.transaction():
+            self.connection.execute(
+                "INSERT OR REPLACE INTO workflow_runs "
+                "(id, repository, workflow_id, workflow_file, head_branch, status, conclusion, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    run["id"],
+                    repository,
+                    run.get("workflow_id"),
+                    os.path.basename(run.get("path") or "") or None,
+                    run.get("head_branch"),
+                    run.get("status"),
+                    run.get("conclusion"),
+                    run["created_at"],
+                    run.get("updated_at"),
+                ),
+            )
+
+    def upsert_deployment_status(
+        self, repository: str, deployment: Dict[str, Any], status: Dict[str, Any]
+    ) -> None:
+        with self.transaction():
+            self.connection.execute(
+                "INSERT OR REPLACE INTO deployments "
+                "(id, repository, deployment_id, environment, ref, sha, state, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    status["id"],
+                    repository,
+                    deployment.get("id"),
+                    status.get("environment") or deployment.get("environment"),
+                    deployment.get("ref"),
+                    deployment.get("sha"),
+                    status.get("state"),
+                    status["created_at"],
+                ),
+            )
+
+    def record_team(
+        self, team: Dict[str, Any], members: List[str], repositories: List[str]
+    ) -> None:
+        with self.transaction():
+            self.connection.execute(
+                "INSERT OR REPLACE INTO teams (slug, id, payload) VALUES (?, ?, ?)",
+                (team["slug"], team.get("id"), json.dumps(team)),
+            )
+            self.connection.execute("DELETE FROM team_members WHERE team_slug = ?", (team["slug"],))
+            self.connection.executemany(
+                "INSERT INTO team_members (team_slug, login) VALUES (?, ?)",
+                [(team["slug"], login) for login in members],
+            )
+            self.connection.execute("DELETE FROM team_repositories WHERE team_slug = ?", (team["slug"],))
+            self.connection.executemany(
+                "INSERT INTO team_repositories (team_slug, repository) VALUES (?, ?)",
+                [(team["slug"], repository) for repository in repositories],
+            )
+
+    # Reads
+
+    def repository_id(self, repository: str) -> Optional[int]:
+        rows = self.select("SELECT id FROM repositories WHERE full_name = ?", (repository,))
+        return rows[0]["id"] if rows else None
+
+    @staticmethod
+    def workflow_filter(workflows: List[Any]) -> Tuple[str, List[Any]]:
+        if not workflows:
+            return "", []
+        names = [str(workflow) for workflow in workflows]
+        placeholders = ", ".join("?" for _ in names)
+        return (
+            f" AND (CAST(workflow_id AS TEXT) IN ({placeholders}) OR workflow_file IN ({placeholders}))",
+            names + names,
+        )
+
+    def workflow_runs(
+        self,
+        repository: str,
+        branch: str,
+        workflows: List[Any],
+        since: datetime.datetime,
+    ) -> List[sqlite3.Row]:
+        workflow_clause, workflow_parameters = self.workflow_filter(workflows)
+        return self.select(
+            "SELECT id, workflow_id, created_at, updated_at FROM workflow_runs "
+            "WHERE repository = ? AND head_branch = ? AND created_at > ?" + workflow_clause,
+            [repository, branch, format_timestamp(since)] + workflow_parameters,
+        )
+
+    def deployment_runs(
+        self,
+        repository: str,
+        branch: str,
+        workflows: List[Any],
+        since: datetime.datetime,
+    ) -> List[sqlite3.Row]:
+        """Successful deployments of the branch, or its workflow runs when the repository reports no deployments."""
+        if not self.select("SELECT 1 FROM deployments WHERE repository = ? LIMIT 1", (repository,)):
+            return self.workflow_runs(repository, branch, workflows, since)
+        return self.select(
+            "SELECT id, deployment_id, environment, created_at FROM deployments "
+            "WHERE repository = ? AND ref = ? AND state = 'success' AND created_at > ?",
+            (repository, branch, format_timestamp(since)),
+        )
+
+    def workflow_durations(
+        self,
+        repository: str,
+        branch: str,
+        workflows: List[Any],
+        since: datetime.datetime,
+    ) -> Tuple[int, float]:
+        workflow_clause, workflow_parameters = self.workflow_filter(workflows)
+        row = self.select(
+            "SELECT COUNT(*) AS runs, "
+            "COALESCE(SUM((strftime('%s', updated_at) - strftime('%s', created_at)) / 3600.0), 0) AS hours "
+            "FROM workflow_runs WHERE repository = ? AND head_branch = ? AND created_at > ?"
+            + workflow_clause,
+            [repository, branch, format_timestamp(since)] + workflow_parameters,
+        )[0]
+        return row["runs"], row["hours"]
+
+    def pull_request_lead_times(
+        self,
+        repository: str,
+        branch: str,
+        since: datetime.datetime,
+        commit_counting_method: str = "last",
+    ) -> Tuple[int, float]:
+        row = self.select(
+            """
+            WITH ranked_commits AS (
+                SELECT pc.number, c.committed_at,
+                    ROW_NUMBER() OVER (PARTITION BY pc.number ORDER BY pc.position) AS from_first,
+                    ROW_NUMBER() OVER (PARTITION BY pc.number ORDER BY pc.position DESC) AS from_last
+                FROM pull_request_commits pc
+                JOIN commits c ON c.repository = pc.repository AND c.sha = pc.sha
+                WHERE pc.repository = :repository
+            )
+            SELECT COUNT(*) AS prs,
+                COALESCE(SUM((strftime('%s', p.merged_at) - strftime('%s', rc.committed_at)) / 3600.0), 0) AS hours
+            FROM pull_requests p
+            JOIN ranked_commits rc ON rc.number = p.number
+            WHERE p.repository = :repository AND p.base_branch = :branch AND p.merged_at > :since
+                AND CASE :method WHEN 'first' THEN rc.from_first ELSE rc.from_last END = 1
+            """,
+            {
+                "repository": repository,
+                "branch": branch,
+                "since": format_timestamp(since),
+                "method": commit_counting_method,
+            },
+        )[0]
+        return row["prs"], row["hours"]
+
+    def pull_request_metric_inputs(
+        self, repository: str, since: datetime.datetime
+    ) -> List[Tuple[Any, ...]]:
+        reviews: Dict[int, List[Tuple[str, datetime.datetime]]] = {}
+        for review in self.select(
+            "SELECT r.number, r.state, r.submitted_at FROM reviews r "
+            "JOIN pull_requests p ON p.repository = r.repository AND p.number = r.number "
+            "WHERE r.repository = ? AND p.created_at >= ? AND r.submitted_at IS NOT NULL "
+            "ORDER BY r.number, r.submitted_at",
+            (repository, format_timestamp(since)),
+        ):
+            reviews.setdefault(review["number"], []).append(
+                (review["state"], parse_timestamp(review["submitted_at"]))
+            )
+        return [
+            (
+                parse_timestamp(pr["created_at"]),
+                parse_timestamp(pr["merged_at"]),
+                pr["commits"] or 0,
+                (pr["additions"] or 0) + (pr["deletions"] or 0),
+                reviews.get(pr["number"], []),
+            )
+            for pr in self.select(
+                "SELECT number, created_at, merged_at, commits, additions, deletions "
+                "FROM pull_requests WHERE repository = ? AND created_at >= ?",
+                (repository, format_timestamp(since)),
+            )
+        ]
+
+    def team_response(
+        self, team_slug: str, since: datetime.datetime
+    ) -> Tuple[int, int, datetime.timedelta]:
+        row = self.select(
+            """
+            WITH member_reviews AS (
+                SELECT q.repository, q.number, r.submitted_at,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY q.repository, q.number ORDER BY r.submitted_at
+                    ) AS nth
+                FROM review_requests q
+                JOIN reviews r ON r.repository = q.repository AND r.number = q.number
+                JOIN team_members m ON m.team_slug = q.team_slug AND m.login = r.user_login
+                WHERE q.team_slug = :team AND r.submitted_at IS NOT NULL
+            )
+            SELECT COUNT(*) AS requests, COUNT(mr.submitted_at) AS responded,
+                COALESCE(SUM(strftime('%s', mr.submitted_at) - strftime('%s', p.created_at)), 0) AS seconds
+            FROM review_requests q
+            JOIN pull_requests p ON p.repository = q.repository AND p.number = q.number
+            LEFT JOIN member_reviews mr
+                ON mr.repository = q.repository AND mr.number = q.number AND mr.nth = 1
+            WHERE q.team_slug = :team AND p.created_at >= :since
+            """,
+            {"team": team_slug, "since": format_timestamp(since)},
+        )[0]
+        return row["requests"], row["responded"], datetime.timedelta(seconds=row["seconds"])
+
+    def team_payloads(self) -> List[Dict[str, Any]]:
+        return [json.loads(row["payload"]) for row in self.select("SELECT payload FROM teams ORDER BY slug")]
+
+    def team_members(self, team_slug: str) -> List[str]:
+        return [
+            row["login"]
+            for row in self.select("SELECT login FROM team_members WHERE team_slug = ?", (team_slug,))
+        ]
+
+    def team_repositories(self, team_slug: str) -> List[str]:
+        return [
+            row["repository"]
+            for row in self.select(
+                "SELECT repository FROM team_repositories WHERE team_slug = ?", (team_slug,)
+            )
+        ]
+
+    def teams_for_repository(self, repository: str) -> List[sqlite3.Row]:
+        return self.select(
+            "SELECT DISTINCT t.slug, t.id FROM review_requests q JOIN teams t ON t.slug = q.team_slug "
+            "WHERE q.repository = ?",
+            (repository,),
+        )
+
+
+class WarehouseLoader:
+    """Fetches a time window of repository and team data from GitHub into the warehouse."""
+
+    def __init__(
+        self, github_client: "Github", warehouse: Warehouse, commit_index: Optional["commit_index.CommitDateIndex"] = None
+    ) -> None:
+        self.github_client = github_client
+        self.warehouse = warehouse
+        self.commit_index = commit_index
+
+    def load_repository(
+        self,
+        full_name: str,
+        branches: List[str],
+        time_frame: int,
+        since: Optional[datetime.datetime] = None,
+    ) -> None:
+        start_date = since or datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
+            days=time_frame
+        )
+        from commit_index import CommitDateResolver
+
+        repo = self.github_client.get_repo(full_name)
+        self.warehouse.record_repository(repo.full_name, repo.id)
+        # The lead time queries read a merged PR's first and last commit only,
+        # each costs at most one request instead of paging the PR's commits
+        commit_dates = CommitDateResolver(repo, self.commit_index)
+        logging.info(f"Loading pull requests of {repo.full_name} into {self.warehouse.path}")
+
+        # Listed by update, like the API calculators, so a PR opened before
+        # the window and merged inside it is loaded too
+        prs = repo.get_pulls(state="all", sort="updated", direction="desc")
+        for pr in itertools.takewhile(lambda pr: pr.updated_at >= start_date, prs):
+            if pr.merged_at is not None and pr.merged_at < start_date:
+                continue
+            if pr.merged_at is not None:
+                details = repo.get_pull(pr.number)
+                self.warehouse.upsert_pull_request(repo.full_name, details._rawData)
+                last_commit_at = commit_dates.last_commit_date(details)
+                first_commit_at = commit_dates.first_commit_date(details)
+                first_sha = commit_dates.index.first_commit(repo.full_name, details.head.sha)
+                self.warehouse.record_pull_request_commits(repo.full_name, pr.number, [(first_sha, first_commit_at)])
+                self.warehouse.record_pull_request_commits(
+                    repo.full_name,
+                    pr.number,
+                    [(details.head.sha, last_commit_at)],
+                    first_position=max(details.commits - 1, 0),
+                )
+            else:
+                self.warehouse.upsert_pull_request(repo.full_name, pr._rawData)
+            for review in pr.get_reviews():
+                self.warehouse.upsert_review(repo.full_name, pr.number, review._rawData)
+
+        for branch in branches:
+            logging.info(f"Loading workflow runs of {repo.full_name} on {branch}")
+            for run in repo.get_workflow_runs(
+                branch=branch, created=f">={start_date.date().isoformat()}"
+            ):
+                self.warehouse.upsert_workflow_run(repo.full_name, run._rawData)
+        logging.info(f"Resolved commit dates of {repo.full_name} with {commit_dates.requests} requests")
+
+    def load_teams(self, owner: str) -> None:
+        org = self.github_client.get_organization(owner)
+        for team in org.get_teams():
+            logging.info(f"Loading members and repositories of team {team.slug}")
+            self.warehouse.record_team(
+                team._rawData,
+                [member.login for member in team.get_members()],
+                [repo.full_name for repo in team.get_repos()],
+            )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Load GitHub data into the local metrics warehouse.")
+    parser.add_argument("--database", required=True, help="Path to the SQLite warehouse")
+    parser.add_argument("--owner", required=True, help="Owner of the repositories")
+    parser.add_argument("--repo", action="append", default=[], help="Repository name, can be repeated")
+    parser.add_argument("--branch", action="append", default=[], help="Branch whose workflow runs are loaded, can be repeated")
+    parser.add_argument("--teams", action="store_true", help="Also load the organization's teams")
+    parser.add_argument("--token", required=True, help="GitHub token")
+    parser.add_argument("--time-frame", type=int, default=30, help="Time Frame in days")
+    parser.add_argument(
+            "--github-host",
+            help="Base URL for self-hosted GitHub instance (e.g., https://api.github-example.com)",
+            default=None,
+        )
+    parser.add_argument("--commit-index", default=None, help="JSON file memoizing commit dates across runs")
+    args = parser.parse_args()
+
+    from commit_index import CommitDateIndex
+    from github_auth import create_github
+
+    github_client = create_github(args.token, args.github_host)
+    commit_dates = CommitDateIndex(args.commit_index)
+    loader = WarehouseLoader(github_client, Warehouse(args.database), commit_dates)
+    for repo_name in args.repo:
+        loader.load_repository(f"{args.owner}/{repo_name}", args.branch or ["main"], args.time_frame)
+    commit_dates.save()
+    if args.teams:
+        loader.load_teams(args.owner)
@@ -0,0 +1,241 @@
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from github import Github
+from github_auth import create_github
+from calculate_pr_metrics import RepositoryMetrics
+from calculate_team_metrics import TeamMetrics
+from deployment_frequency import DeploymentFrequency
+from event_store import HANDLED_EVENTS, EventStore
+from lead_time_for_changes import LeadTimeForChanges
+from port import PortAPI
+from report_sink import build_dora_entity
+from warehouse import WarehouseLoader
+
+
+class MetricsRefresher:
+    """Recomputes the aggregates touched by an event and pushes them to Port."""
+
+    def __init__(
+        self,
+        store: EventStore,
+        config: Dict[str, Any],
+        port_api: Optional[PortAPI],
+        github_client: Optional[Github],
+    ) -> None:
+        self.store = store
+        self.config = config
+        self.owner = config["owner"]
+        self.time_frame = int(config["doraTimeFrame"]) * 7
+        self.dora_blueprint = config["port"]["blueprints"].get("service")
+        self.team_blueprint = config["port"]["blueprints"].get("team")
+        self.port_api = port_api
+        self.github_client = github_client
+
+    def items_for(self, repository: str) -> List[Dict[str, Any]]:
+        return [
+            item
+            for item in self.config["items"]
+            if f"{self.owner}/{item['repository']}" == repository
+        ]
+
+    def resolve_head_commits(self, repository: str) -> None:
+        # Webhook payloads carry no commit dates, the head commit is looked
+        # up once per merged PR
+        if not self.github_client:
+            return
+        pending = self.store.pending_head_commits(repository)
+        if not pending:
+            return
+        repo = self.github_client.get_repo(repository)
+        for pr in pending:
+            commit = repo.get_commit(pr["head_sha"])
+            self.store.record_pull_request_commits(
+                repository,
+                pr["number"],
+                [(commit.sha, commit.commit.committer.date)],
+                first_position=max((pr["commits"] or 1) - 1, 0),
+            )
+
+    def refresh_repository(self, repository: str) -> None:
+        self.resolve_head_commits(repository)
+        repo_name = repository.split("/", 1)[1]
+        metrics = RepositoryMetrics(
+            self.owner, repo_name, self.time_frame, token=None, github_host=None, warehouse=self.store
+        ).calculate_pr_metrics()
+        for item in self.items_for(repository):
+            workflows = json.dumps(item.get("workflows") or [])
+            deployment_frequency_report = DeploymentFrequency(
+                self.owner, repo_name, workflows, item["branch"], self.time_frame,
+                token=None, github_host=None, warehouse=self.store,
+            )()
+            lead_time_for_changes_report = LeadTimeForChanges(
+                self.owner, repo_name, workflows, item["branch"], self.time_frame,
+                token=None, github_host=None, warehouse=self.store,
+            )()
+            entity = build_dora_entity(
+                item["repository"],
+                self.time_frame,
+                {
+                    "pr_metrics": metrics,
+                    "deployment_frequency": json.loads(deployment_frequency_report),
+                    "lead_time_for_changes": json.loads(lead_time_for_changes_report),
+                },
+            )
+            self.push(self.dora_blueprint, entity)
+
+    def refresh_team(self, team_slug: str, team_id: int) -> None:
+        team_metrics = TeamMetrics(
+            self.owner, self.time_frame, token=None, github_host=None, warehouse=self.store
+        )
+        total_requests, responded_requests, total_response_time = self.store.team_response(
+            team_slug, team_metrics.start_date
+        )
+        response_rate, response_time = team_metrics.summarize_response_metrics(
+            team_slug, total_requests, responded_requests, total_response_time, responded_requests
+        )
+        entity = {
+            "identifier": str(team_id),
+            "properties": {
+                "responseRate": response_rate["response_rate"],
+                "averageResponseTime": response_time["average_response_time"],
+                "timeFrame": self.time_frame,
+            },
+            "relations": {},
+        }
+        self.push(self.team_blueprint, entity)
+
+    def refresh(self, event: str, payload: Dict[str, Any]) -> None:
+        repository = payload["repository"]["full_name"]
+        if event in {"pull_request", "pull_request_review"} and self.team_blueprint:
+            for team in self.store.teams_for_repository(repository):
+                self.refresh_team(team["slug"], team["id"])
+        self.refresh_repository(repository)
+
+    def push(self, blueprint: Optional[str], entity: Dict[str, Any]) -> None:
+        if not blueprint:
+            return
+        if not self.port_api:
+            logging.info(f"{blueprint} entity {entity['identifier']}: {json.dumps(entity)}")
+            return
+        asyncio.run(self.port_api.add_entity(blueprint_id=blueprint, entity_object=entity))
+
+
+def reconcile(store: EventStore, refresher: MetricsRefresher, github_client: Github) -> None:
+    """Backfill the store from the API for every configured item and team."""
+    loader = WarehouseLoader(github_client, store)
+    repositories: Dict[str, List[str]] = {}
+    for item in refresher.config["items"]:
+        repositories.setdefault(f"{refresher.owner}/{item['repository']}", []).append(item["branch"])
+    for repository, branches in repositories.items():
+        loader.load_repository(repository, branches, refresher.time_frame)
+
+    if refresher.team_blueprint:
+        loader.load_teams(refresher.owner)
+        for team in store.team_payloads():
+            refresher.refresh_team(team["slug"], team["id"])
+    for repository in repositories:
+        refresher.refresh_repository(repository)
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    store: EventStore
+    refresher: MetricsRefresher
+    webhook_secret: Optional[str] = None
+
+    def verify_signature(self, body: bytes) -> bool:
+        if not self.webhook_secret:
+            return True
+        expected = "sha256=" + hmac.new(
+            self.webhook_secret.encode(), body, hashlib.sha256
+        ).hexdigest()
+        return hmac.compare_digest(expected, self.headers.get("X-Hub-Signature-256", ""))
+
+    def reply(self, status: int, message: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain")
+        self.end_headers()
+        self.wfile.write(message.encode())
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not self.verify_signature(body):
+            self.reply(401, "invalid signature")
+            return
+        event = self.headers.get("X-GitHub-Event", "")
+        if event not in HANDLED_EVENTS:
+            self.reply(202, f"ignored {event} event")
+            return
+        try:
+            payload = json.loads(body)
+        except json.JSONDecodeError:
+            self.reply(400, "invalid JSON payload")
+            return
+
+        try:
+            stored = self.store.record(self.headers.get("X-GitHub-Delivery"), event, payload)
+        except Exception as e:
+            # Nothing was kept, GitHub's redelivery stores the event again
+            logging.error(f"Failed to store {event} event: {e}")
+            self.reply(500, "failed to store event")
+            return
+        if stored:
+            try:
+                self.refresher.refresh(event, payload)
+            except Exception as e:
+                # The event is stored, the next delivery or reconciliation
+                # picks the refresh up again
+                logging.error(f"Failed to refresh metrics after {event} event: {e}")
+        self.reply(200, "ok")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Serve GitHub webhooks and keep DORA metrics up to date.")
+    parser.add_argument("--config", default="src/dora-config-v2.json", help="Path to the DORA config file")
+    parser.add_argument("--database", default="dora-events.db", help="Path to the SQLite event store")
+    parser.add_argument("--host", default="0.0.0.0", help="Interface to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    parser.add_argument("--webhook-secret", default=None, help="Secret used to sign the GitHub webhooks")
+    parser.add_argument("--token", default=None, help="GitHub token, used to resolve commit dates and reconcile")
+    parser.add_argument(
+            "--github-host",
+            help="Base URL for self-hosted GitHub instance (e.g., https://api.github-example.com)",
+            default=None,
+        )
+    parser.add_argument("--port-client-id", default=None, help="Port Client ID")
+    parser.add_argument("--port-client-secret", default=None, help="Port Client Secret")
+    parser.add_argument("--reconcile", action="store_true", help="Backfill the store from the API, refresh every entity and exit")
+    args = parser.parse_args()
+
+    with open(args.config) as config_file:
+        config = json.load(config_file)
+
+    github_client = None
+    if args.token:
+        github_client = create_github(args.token, args.github_host)
+    port_api = (
+        PortAPI(args.port_client_id, args.port_client_secret)
+        if args.port_client_id and args.port_client_secret
+        else None
+    )
+    store = EventStore(args.database)
+    refresher = MetricsRefresher(store, config, port_api, github_client)
+
+    if args.reconcile:
+        if not github_client:
+            parser.error("--reconcile requires --token")
+        reconcile(store, refresher, github_client)
+    else:
+        WebhookHandler.store = store
+        WebhookHandler.refresher = refresher
+        WebhookHandler.webhook_secret = args.webhook_secret
+        server = ThreadingHTTPServer((args.host, args.port), WebhookHandler)
+        logging.info(f"Listening for GitHub webhooks on {args.host}:{args.port}")
+        server.serve_forever()
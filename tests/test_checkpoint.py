@@ -0,0 +1,55 @@
+import datetime
+
+from checkpoint import Checkpoint
+
+
+def test_resume_keeps_window_and_completed_units(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    first = Checkpoint(path, "metrics:octo", resume=True)
+    first.complete("octo/app", {"prs": 3})
+    first.advance("octo/api", 2)
+
+    resumed = Checkpoint(path, "metrics:octo", resume=True)
+
+    assert resumed.started_at == first.started_at
+    assert resumed.completed("octo/app") == {"prs": 3}
+    assert resumed.cursor("octo/api") == 2
+
+
+def test_complete_clears_cursor(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    checkpoint = Checkpoint(path, "metrics:octo")
+    checkpoint.advance("octo/app", 4)
+    checkpoint.complete("octo/app", 1)
+
+    assert Checkpoint(path, "metrics:octo", resume=True).cursor("octo/app") is None
+
+
+def test_ignores_checkpoint_of_another_run(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    Checkpoint(path, "metrics:octo").complete("octo/app", 1)
+
+    other = Checkpoint(path, "metrics:other", resume=True)
+
+    assert other.completed("octo/app") is None
+    assert other.run_key == "metrics:other"
+
+
+def test_without_resume_starts_over(tmp_path):
+    path = str(tmp_path / "checkpoint.json")
+    Checkpoint(path, "metrics:octo").complete("octo/app", 1)
+
+    checkpoint = Checkpoint(path, "metrics:octo")
+
+    assert checkpoint.completed("octo/app") is None
+    assert checkpoint.started_at <= datetime.datetime.now(datetime.timezone.utc)
+
+
+def test_finish_removes_file(tmp_path):
+    path = tmp_path / "checkpoint.json"
+    checkpoint = Checkpoint(str(path), "metrics:octo")
+    checkpoint.complete("octo/app", 1)
+
+    checkpoint.finish()
+
+    assert not path.exists()
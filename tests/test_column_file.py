@@ -0,0 +1,125 @@
+import datetime
+import pickle
+
+import pytest
+
+from column_file import ColumnFile, export_columns
+from warehouse import Warehouse, parse_timestamp
+
+SINCE = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def pull_request(number, created_at, merged_at, base="main"):
+    return {
+        "number": number,
+        "base": {"ref": base},
+        "created_at": created_at,
+        "updated_at": merged_at or created_at,
+        "merged_at": merged_at,
+        "commits": 2,
+    }
+
+
+def workflow_run(id, created_at, updated_at, branch="main", path=".github/workflows/deploy.yaml"):
+    return {
+        "id": id,
+        "workflow_id": 10,
+        "path": path,
+        "head_branch": branch,
+        "created_at": created_at,
+        "updated_at": updated_at,
+    }
+
+
+@pytest.fixture
+def warehouse(tmp_path):
+    warehouse = Warehouse(str(tmp_path / "warehouse.db"))
+    for repository in ("octo/app", "octo/api"):
+        warehouse.upsert_pull_request(
+            repository, pull_request(1, "2026-01-02T00:00:00Z", "2026-01-03T00:00:00Z")
+        )
+        warehouse.record_pull_request_commits(
+            repository,
+            1,
+            [
+                ("a1", parse_timestamp("2026-01-01T12:00:00Z")),
+                ("a2", parse_timestamp("2026-01-02T06:00:00Z")),
+            ],
+        )
+        warehouse.upsert_pull_request(
+            repository, pull_request(2, "2026-01-04T00:00:00Z", None)
+        )
+        warehouse.upsert_pull_request(
+            repository, pull_request(3, "2026-01-04T00:00:00Z", "2026-01-05T00:00:00Z", base="dev")
+        )
+    warehouse.upsert_workflow_run(
+        "octo/app", workflow_run(100, "2025-12-30T00:00:00Z", "2025-12-30T01:00:00Z")
+    )
+    warehouse.upsert_workflow_run(
+        "octo/app", workflow_run(101, "2026-01-03T00:00:00Z", "2026-01-03T00:30:00Z")
+    )
+    warehouse.upsert_workflow_run(
+        "octo/app", workflow_run(102, "2026-01-04T00:00:00Z", "2026-01-04T02:00:00Z", branch="dev")
+    )
+    warehouse.upsert_workflow_run(
+        "octo/app",
+        workflow_run(103, "2026-01-05T00:00:00Z", "2026-01-05T01:00:00Z", path=".github/workflows/lint.yaml"),
+    )
+    return warehouse
+
+
+def test_round_trip_matches_warehouse(warehouse, tmp_path):
+    path = str(tmp_path / "dora.col")
+
+    assert export_columns(warehouse, path) == {"pull_requests": 6, "workflow_runs": 4}
+
+    columns = ColumnFile(path)
+    for repository in ("octo/app", "octo/api"):
+        for method in ("first", "last"):
+            assert columns.pull_request_lead_times(repository, "main", SINCE, method) == pytest.approx(
+                warehouse.pull_request_lead_times(repository, "main", SINCE, method)
+            )
+    for workflows in ([], ["deploy.yaml"], [10]):
+        assert columns.workflow_durations("octo/app", "main", workflows, SINCE) == pytest.approx(
+            warehouse.workflow_durations("octo/app", "main", workflows, SINCE)
+        )
+        assert [moment.isoformat() for moment in columns.deployment_times("octo/app", "main", workflows, SINCE)] == [
+            parse_timestamp(row["created_at"]).isoformat()
+            for row in warehouse.workflow_runs("octo/app", "main", workflows, SINCE)
+        ]
+
+
+def test_lead_times_by_commit_counting_method(warehouse, tmp_path):
+    path = str(tmp_path / "dora.col")
+    export_columns(warehouse, path)
+    columns = ColumnFile(path)
+
+    assert columns.pull_request_lead_times("octo/app", "main", SINCE, "first") == (1, 36.0)
+    assert columns.pull_request_lead_times("octo/app", "main", SINCE, "last") == (1, 18.0)
+
+
+def test_unknown_names_select_nothing(warehouse, tmp_path):
+    path = str(tmp_path / "dora.col")
+    export_columns(warehouse, path)
+    columns = ColumnFile(path)
+
+    assert columns.pull_request_lead_times("octo/missing", "main", SINCE) == (0, 0.0)
+    assert columns.deployment_times("octo/app", "release", [], SINCE) == []
+    assert columns.workflow_durations("octo/app", "main", ["missing.yaml"], SINCE) == (0, 0.0)
+
+
+def test_pickle_reopens_by_path(warehouse, tmp_path):
+    path = str(tmp_path / "dora.col")
+    export_columns(warehouse, path)
+
+    columns = pickle.loads(pickle.dumps(ColumnFile(path)))
+
+    assert columns.strings == ColumnFile(path).strings
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other.col"
+    path.write_bytes(b"not a column file")
+
+    with pytest.raises(ValueError):
+        ColumnFile(str(path))
@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+from commit_index import CommitDateIndex, CommitDateResolver
+from warehouse import parse_timestamp
+
+
+def commit(sha, date):
+    return {"sha": sha, "commit": {"committer": {"date": date}}}
+
+
+class FakeRequester:
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+
+    def requestJsonAndCheck(self, verb, url, parameters=None):
+        self.calls.append((url, parameters))
+        return {}, self.responses[url]
+
+
+def repo(responses):
+    return SimpleNamespace(full_name="octo/app", url="/repos/octo/app", _requester=FakeRequester(responses))
+
+
+def pull_request(number=1, head="head", base="base"):
+    return SimpleNamespace(
+        head=SimpleNamespace(sha=head), base=SimpleNamespace(sha=base), url=f"/repos/octo/app/pulls/{number}"
+    )
+
+
+def test_last_commit_is_the_head_commit():
+    repo_object = repo({"/repos/octo/app/commits": [commit("head", "2026-01-02T00:00:00Z")]})
+    resolver = CommitDateResolver(repo_object)
+
+    assert resolver.last_commit_date(pull_request()) == parse_timestamp("2026-01-02T00:00:00Z")
+    assert repo_object._requester.calls == [("/repos/octo/app/commits", {"sha": "head", "per_page": 1})]
+
+
+def test_first_commit_from_the_comparison():
+    repo_object = repo({"/repos/octo/app/compare/base...head": {"commits": [commit("first", "2026-01-01T00:00:00Z")]}})
+    resolver = CommitDateResolver(repo_object)
+
+    assert resolver.first_commit_date(pull_request()) == parse_timestamp("2026-01-01T00:00:00Z")
+    assert resolver.index.first_commit("octo/app", "head") == "first"
+    assert resolver.requests == 1
+
+
+def test_first_commit_falls_back_to_the_pull_request_commits():
+    repo_object = repo(
+        {
+            "/repos/octo/app/compare/base...head": {"commits": []},
+            "/repos/octo/app/pulls/1/commits": [commit("first", "2026-01-01T00:00:00Z")],
+        }
+    )
+
+    assert CommitDateResolver(repo_object).first_commit_date(pull_request()) == parse_timestamp("2026-01-01T00:00:00Z")
+    assert len(repo_object._requester.calls) == 2
+
+
+def test_index_answers_without_requests(tmp_path):
+    path = str(tmp_path / "commit-index.json")
+    repo_object = repo(
+        {
+            "/repos/octo/app/commits": [commit("head", "2026-01-02T00:00:00Z")],
+            "/repos/octo/app/compare/base...head": {"commits": [commit("first", "2026-01-01T00:00:00Z")]},
+        }
+    )
+    index = CommitDateIndex(path)
+    resolver = CommitDateResolver(repo_object, index)
+    resolver.last_commit_date(pull_request())
+    resolver.first_commit_date(pull_request())
+    index.save()
+
+    reloaded = CommitDateResolver(repo({}), CommitDateIndex(path))
+
+    assert reloaded.last_commit_date(pull_request()) == parse_timestamp("2026-01-02T00:00:00Z")
+    assert reloaded.first_commit_date(pull_request()) == parse_timestamp("2026-01-01T00:00:00Z")
+    assert reloaded.requests == 0
@@ -0,0 +1,68 @@
+import pytest
+
+from deadline import Deadline, DeadlineExceeded, parse_duration
+
+
+@pytest.mark.parametrize(
+    "value, seconds",
+    [("300", 300.0), ("90s", 90.0), ("15m", 900.0), ("1.5h", 5400.0), (" 2 m ", 120.0)],
+)
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == seconds
+
+
+@pytest.mark.parametrize("value", ["", "fast", "10d", "-5m"])
+def test_parse_duration_rejects(value):
+    with pytest.raises(ValueError):
+        parse_duration(value)
+
+
+def test_reports_keep_their_shape_without_a_deadline():
+    deadline = Deadline()
+    deadline.start(None)
+    deadline.account(1, 2)
+
+    assert deadline.annotate({"prs": 3}) == {"prs": 3}
+    assert not deadline.expired
+    assert deadline.remaining() is None
+
+
+def test_annotate_reports_completeness_and_resets():
+    deadline = Deadline()
+    deadline.start(3600)
+    deadline.account(3, 4)
+    deadline.account(1, 4)
+
+    assert deadline.annotate({}) == {"completeness": 0.5, "partial": False}
+    # The next report only counts the work accounted after this one
+    assert deadline.annotate({}) == {"completeness": 1.0, "partial": False}
+
+
+def test_expired_deadline_marks_reports_partial():
+    deadline = Deadline()
+    deadline.start(0.000001)
+    deadline.account(1, 3)
+
+    with pytest.raises(DeadlineExceeded):
+        deadline.check()
+    assert deadline.annotate({}) == {"completeness": 0.3333, "partial": True}
+
+
+def test_long_waits_stop_the_run():
+    deadline = Deadline()
+    deadline.start(60)
+
+    assert deadline.allows_wait(1)
+    assert not deadline.allows_wait(120)
+    assert deadline.annotate({})["partial"]
+
+
+def test_start_resets_accounting():
+    deadline = Deadline()
+    deadline.start(0.000001)
+    deadline.account(1, 2)
+    assert deadline.expired
+
+    deadline.start(3600)
+
+    assert deadline.annotate({}) == {"completeness": 1.0, "partial": False}
@@ -0,0 +1,45 @@
+import datetime
+import json
+from types import SimpleNamespace
+
+import github_auth
+from deadline import deadline
+from deployment_frequency import DeploymentFrequency
+from warehouse import Warehouse
+
+SINCE = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def run(id, created_at, branch="main"):
+    return SimpleNamespace(
+        id=id,
+        head_branch=branch,
+        created_at=created_at,
+        _rawData={"id": id, "head_branch": branch, "created_at": created_at.strftime("%Y-%m-%dT%H:%M:%SZ")},
+    )
+
+
+RUNS = [
+    run(1, SINCE - datetime.timedelta(hours=1)),
+    run(2, SINCE + datetime.timedelta(hours=1)),
+    run(3, SINCE + datetime.timedelta(days=1)),
+    run(4, SINCE + datetime.timedelta(days=1), branch="dev"),
+]
+
+
+def test_api_and_warehouse_agree_on_the_window(monkeypatch, tmp_path):
+    workflow = SimpleNamespace(get_runs=lambda created: RUNS)
+    repo = SimpleNamespace(get_workflow=lambda workflow_id: workflow)
+    monkeypatch.setattr(github_auth, "create_github", lambda token, host: SimpleNamespace(get_repo=lambda name: repo))
+    warehouse = Warehouse(str(tmp_path / "warehouse.db"))
+    for workflow_run in RUNS:
+        warehouse.upsert_workflow_run("octo/app", workflow_run._rawData)
+    deadline.start(None)
+
+    from_api = DeploymentFrequency("octo", "app", "[10]", "main", 30, token="pat", github_host=None, since=SINCE)
+    from_warehouse = DeploymentFrequency(
+        "octo", "app", "[]", "main", 30, token=None, github_host=None, warehouse=warehouse, since=SINCE
+    )
+
+    assert [workflow_run.id for workflow_run in from_api.fetch_workflow_runs()[0]] == [2, 3]
+    assert json.loads(from_api()) == json.loads(from_warehouse())
@@ -0,0 +1,84 @@
+import datetime
+import json
+
+import pytest
+
+from deployment_frequency import DeploymentFrequency
+from event_store import HANDLED_EVENTS, EventStore
+
+
+def pull_request_payload(number: int = 1):
+    return {
+        "action": "closed",
+        "repository": {"full_name": "octo/app", "id": 7},
+        "pull_request": {
+            "number": number,
+            "base": {"ref": "main"},
+            "head": {"sha": "abc"},
+            "created_at": "2026-01-01T00:00:00Z",
+            "updated_at": "2026-01-02T00:00:00Z",
+            "merged_at": "2026-01-02T00:00:00Z",
+            "commits": 2,
+        },
+    }
+
+
+def test_record_appends_and_applies(tmp_path):
+    store = EventStore(str(tmp_path / "events.db"))
+
+    assert store.record("delivery-1", "pull_request", pull_request_payload())
+
+    assert len(store.select("SELECT * FROM events")) == 1
+    assert [row["number"] for row in store.select("SELECT number FROM pull_requests")] == [1]
+
+
+def test_record_skips_redelivery(tmp_path):
+    store = EventStore(str(tmp_path / "events.db"))
+    store.record("delivery-1", "pull_request", pull_request_payload())
+
+    assert not store.record("delivery-1", "pull_request", pull_request_payload())
+    assert len(store.select("SELECT * FROM events")) == 1
+
+
+def test_failed_apply_stores_nothing(tmp_path):
+    store = EventStore(str(tmp_path / "events.db"))
+    payload = pull_request_payload()
+    del payload["pull_request"]
+
+    with pytest.raises(KeyError):
+        store.record("delivery-1", "pull_request", payload)
+
+    assert store.select("SELECT * FROM events") == []
+    assert store.select("SELECT * FROM repositories") == []
+    # The redelivery is stored once the payload can be applied
+    assert store.record("delivery-1", "pull_request", pull_request_payload())
+
+
+def deployment_status_payload(status_id: int, state: str, ref: str = "main"):
+    return {
+        "action": "created",
+        "repository": {"full_name": "octo/app", "id": 7},
+        "deployment": {"id": 30, "ref": ref, "sha": "abc", "environment": "production"},
+        "deployment_status": {"id": status_id, "state": state, "created_at": "2026-01-02T00:00:00Z"},
+    }
+
+
+def test_deployment_status_reaches_deployment_frequency(tmp_path):
+    store = EventStore(str(tmp_path / "events.db"))
+    since = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+    store.upsert_workflow_run(
+        "octo/app", {"id": 1, "head_branch": "main", "created_at": "2026-01-02T00:00:00Z"}
+    )
+
+    assert "deployment_status" in HANDLED_EVENTS
+    assert store.record("delivery-1", "deployment_status", deployment_status_payload(40, "in_progress"))
+    assert store.record("delivery-2", "deployment_status", deployment_status_payload(41, "success"))
+    assert store.record("delivery-3", "deployment_status", deployment_status_payload(42, "success", "dev"))
+
+    report = DeploymentFrequency(
+        "octo", "app", "[]", "main", 30, token=None, github_host=None, warehouse=store, since=since
+    )()
+
+    # Once a repository reports deployments they replace its workflow runs
+    assert json.loads(report)["total_deployments"] == 1
+    assert [row["id"] for row in store.deployment_runs("octo/app", "main", [], since)] == [41]
@@ -0,0 +1,79 @@
+import datetime
+import os
+import subprocess
+
+import pytest
+
+from git_source import GitRepository
+
+START = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+@pytest.fixture
+def clone(tmp_path, monkeypatch):
+    for name in ("GIT_DIR", "GIT_WORK_TREE", "GIT_INDEX_FILE"):
+        monkeypatch.delenv(name, raising=False)
+    path = str(tmp_path / "clone")
+
+    def git(*args, hours=0):
+        moment = (START + datetime.timedelta(hours=hours)).isoformat()
+        environment = dict(
+            os.environ,
+            GIT_AUTHOR_NAME="dev",
+            GIT_AUTHOR_EMAIL="dev@example.com",
+            GIT_COMMITTER_NAME="dev",
+            GIT_COMMITTER_EMAIL="dev@example.com",
+            GIT_AUTHOR_DATE=moment,
+            GIT_COMMITTER_DATE=moment,
+        )
+        subprocess.run(["git", "-C", path, *args], check=True, capture_output=True, env=environment)
+
+    os.makedirs(path)
+    git("init", "--quiet", "--initial-branch=main")
+    git("commit", "--quiet", "--allow-empty", "-m", "initial", hours=0)
+    git("checkout", "--quiet", "-b", "feature")
+    git("commit", "--quiet", "--allow-empty", "-m", "first", hours=1)
+    git("commit", "--quiet", "--allow-empty", "-m", "last", hours=3)
+    git("checkout", "--quiet", "main")
+    git("commit", "--quiet", "--allow-empty", "-m", "direct", hours=4)
+    git("merge", "--quiet", "--no-ff", "-m", "merge feature", "feature", hours=5)
+    git("tag", "v1", hours=5)
+    git("commit", "--quiet", "--allow-empty", "-m", "after", hours=6)
+    git("tag", "-a", "v2", "-m", "release", hours=7)
+    return GitRepository(path, "main")
+
+
+def test_first_parent_log_is_newest_first(clone):
+    commits = list(clone.first_parent_log(START - datetime.timedelta(days=1)))
+
+    assert [commit.committed_at.hour for commit in commits] == [6, 5, 4, 0]
+    # Feature branch commits are not on the first-parent history
+    assert len(commits) == 4
+
+
+def test_merges(clone):
+    (merge,) = clone.merges(START - datetime.timedelta(days=1))
+
+    assert len(merge.parents) == 2
+    assert merge.committed_at == START + datetime.timedelta(hours=5)
+
+
+def test_merge_lead_times(clone):
+    since = START - datetime.timedelta(days=1)
+
+    assert list(clone.merge_lead_times(since, "last")) == [datetime.timedelta(hours=2)]
+    assert list(clone.merge_lead_times(since, "first")) == [datetime.timedelta(hours=4)]
+    assert list(clone.merge_lead_times(START + datetime.timedelta(hours=5, minutes=30))) == []
+
+
+def test_tag_times(clone):
+    assert clone.tag_times("v*", START + datetime.timedelta(hours=6)) == [START + datetime.timedelta(hours=7)]
+
+
+def test_fetch_leaves_full_clones_alone(clone):
+    clone.fetch(START)
+
+
+def test_unknown_branch(clone):
+    with pytest.raises(ValueError):
+        GitRepository(clone.path, "missing").resolve_ref()
@@ -0,0 +1,94 @@
+import pytest
+from github import Auth
+
+import github_auth
+from github_auth import InstallationScope, PooledAuth, request_owner, token_provider
+
+
+class Installation:
+    def __init__(self, installation_id, token):
+        self.installation_id = installation_id
+        self.token = token
+
+
+@pytest.fixture
+def pool():
+    octo = Installation(1, "octo-installation")
+    selected = Installation(2, "selected-installation")
+    other = Installation(3, "other-installation")
+    pool = PooledAuth([octo, selected, other])
+    pool.scopes = {
+        1: InstallationScope("octo", None),
+        2: InstallationScope("octo", {"octo/app"}),
+        3: InstallationScope("other", None),
+    }
+    return pool
+
+
+@pytest.mark.parametrize(
+    "url, owner",
+    [
+        ("/repos/Octo/App/pulls", ("octo", "app")),
+        ("https://api.github.com/repos/octo/app/actions/workflows", ("octo", "app")),
+        ("https://github.example.com/api/v3/repos/octo/app", ("octo", "app")),
+        ("/orgs/Octo/teams", ("octo", None)),
+        ("/users/someone/repos", ("someone", None)),
+        ("/search/issues", (None, None)),
+        ("/user", (None, None)),
+    ],
+)
+def test_request_owner(url, owner):
+    assert request_owner(url) == owner
+
+
+def test_can_see(pool):
+    octo, selected, other = pool.auths
+
+    assert pool.can_see(octo, "octo", "api")
+    assert pool.can_see(selected, "octo", "app")
+    assert not pool.can_see(selected, "octo", "api")
+    assert pool.can_see(selected, "octo", None)
+    assert not pool.can_see(other, "octo", "app")
+    # Tokens see whatever their user sees
+    assert pool.can_see(Auth.Token("pat"), "anyone", "anything")
+
+
+def test_next_auth_rotates_among_members_that_can_see(pool):
+    octo, selected, other = pool.auths
+
+    assert {pool.next_auth("/repos/octo/app/pulls") for _ in range(4)} == {octo, selected}
+    assert {pool.next_auth("/repos/octo/api/pulls") for _ in range(4)} == {octo}
+    assert {pool.next_auth("/orgs/other/teams") for _ in range(4)} == {other}
+    assert {pool.next_auth("/search/issues") for _ in range(6)} == {octo, selected, other}
+
+
+def test_next_auth_falls_back_to_every_member(pool):
+    assert {pool.next_auth("/repos/unknown/app") for _ in range(6)} == set(pool.auths)
+
+
+def test_pinned_token_serves_the_whole_request(pool):
+    with pool.pinned("/repos/other/app") as identity:
+        assert identity == "installation:3"
+        assert {pool.token for _ in range(3)} == {"other-installation"}
+        with pool.pinned("/repos/octo/app") as nested:
+            assert nested == "installation:3"
+
+
+def test_token_provider_picks_by_url(pool, monkeypatch):
+    monkeypatch.setattr(github_auth, "build_auth", lambda token: pool)
+    current_token = token_provider("pat")
+
+    assert {current_token("https://api.github.com/repos/other/app/pulls") for _ in range(3)} == {
+        "other-installation"
+    }
+    assert {current_token("https://api.github.com/repos/octo/api/pulls") for _ in range(3)} == {
+        "octo-installation"
+    }
+
+
+def test_token_provider_without_pool(monkeypatch):
+    monkeypatch.delenv(github_auth.APP_ID_ENV, raising=False)
+    monkeypatch.delenv(github_auth.TOKEN_POOL_ENV, raising=False)
+
+    assert token_provider("pat")("/repos/octo/app") == "pat"
+    assert token_provider(None)("/repos/octo/app") == ""
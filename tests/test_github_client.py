@@ -0,0 +1,133 @@
+import asyncio
+import sys
+import threading
+import time
+
+import pytest
+
+from github_client import (
+    NeverRaised,
+    SingleFlight,
+    auth_identity,
+    github_errors,
+    request_key,
+    token_identity,
+)
+
+
+class Token:
+    def __init__(self, token):
+        self.token = token
+
+
+class AppInstallationAuth:
+    def __init__(self, installation_id):
+        self.installation_id = installation_id
+
+
+def test_concurrent_calls_share_one_fetch():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    fetches = []
+
+    def fetch():
+        fetches.append(1)
+        started.set()
+        release.wait()
+        return {"id": 1}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.call("key", fetch)))
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=lambda: results.append(flight.call("key", fetch))) for _ in range(3)]
+    for follower in followers:
+        follower.start()
+    waiting_until = time.monotonic() + 5
+    while flight.snapshot().get("coalesced", 0) < 3 and time.monotonic() < waiting_until:
+        time.sleep(0.01)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert flight.snapshot()["coalesced"] == 3
+    assert len(fetches) == 1
+    assert results == [{"id": 1}] * 4
+
+
+def test_recent_results_are_copies():
+    flight = SingleFlight()
+    first = flight.call("key", lambda: {"labels": ["a"]})
+    first["labels"].append("mutated")
+
+    second = flight.call("key", lambda: pytest.fail("fetched again"))
+
+    assert second == {"labels": ["a"]}
+    assert flight.snapshot()["recent"] == 1
+
+
+def test_errors_and_none_are_not_kept():
+    flight = SingleFlight()
+    with pytest.raises(RuntimeError):
+        flight.call("key", lambda: (_ for _ in ()).throw(RuntimeError("boom")))
+    assert flight.call("key", lambda: None) is None
+
+    assert flight.call("key", lambda: 1) == 1
+
+
+def test_expired_results_are_fetched_again():
+    flight = SingleFlight(ttl=-1)
+    flight.call("key", lambda: 1)
+
+    assert flight.call("key", lambda: 2) == 2
+
+
+def test_acall_coalesces():
+    flight = SingleFlight()
+    fetches = []
+
+    async def fetch():
+        fetches.append(1)
+        await asyncio.sleep(0.01)
+        return [1]
+
+    async def run():
+        return await asyncio.gather(*(flight.acall("key", fetch) for _ in range(3)))
+
+    assert asyncio.run(run()) == [[1]] * 3
+    assert len(fetches) == 1
+
+
+def test_request_key_ignores_dict_order():
+    assert request_key("token", "/repos", {"a": 1, "b": 2}) == request_key("token", "/repos", {"b": 2, "a": 1})
+    assert request_key("token", "/repos", {"a": 1}) != request_key("other", "/repos", {"a": 1})
+
+
+def test_keys_differ_per_credential():
+    assert auth_identity(None) is None
+    assert auth_identity(Token("one")) == auth_identity(Token("one"))
+    assert auth_identity(Token("one")) != auth_identity(Token("two"))
+    assert "one" not in auth_identity(Token("one"))
+    assert auth_identity(AppInstallationAuth(5)) == "installation:5"
+    assert auth_identity(AppInstallationAuth(5)) != auth_identity(AppInstallationAuth(6))
+
+
+def test_token_identity_is_a_digest():
+    assert token_identity("secret") != "secret"
+    assert len(token_identity("secret")) == 64
+
+
+def test_github_errors_without_pygithub(monkeypatch):
+    monkeypatch.delitem(sys.modules, "github", raising=False)
+
+    assert github_errors() is NeverRaised
+
+
+def test_sharing_is_opt_in():
+    flight = SingleFlight()
+    assert not flight.enabled
+
+    flight.enable()
+
+    assert flight.enabled
@@ -0,0 +1,64 @@
+import datetime
+
+from incidents import Incident, attribute_incidents, in_window, restored_at
+
+
+def at(hour: int) -> datetime.datetime:
+    return datetime.datetime(2026, 1, 1, hour, tzinfo=datetime.timezone.utc)
+
+
+def incident(id: str, started: int, resolved: int = None) -> Incident:
+    return Incident(id, at(started), at(resolved) if resolved is not None else None)
+
+
+def test_attribute_incidents_to_the_preceding_deployment():
+    deployments = [at(1), at(5), at(9)]
+    incidents = [incident("a", 2), incident("b", 6), incident("c", 7), incident("d", 10)]
+
+    attributed = attribute_incidents(deployments, incidents)
+
+    assert {index: [i.id for i in found] for index, found in attributed.items()} == {
+        0: ["a"],
+        1: ["b", "c"],
+        2: ["d"],
+    }
+
+
+def test_attribute_incidents_sorts_unsorted_input():
+    deployments = [at(9), at(1), at(5)]
+    incidents = [incident("d", 10), incident("b", 6), incident("a", 2)]
+
+    attributed = attribute_incidents(deployments, incidents)
+
+    assert {index: [i.id for i in found] for index, found in attributed.items()} == {
+        0: ["a"],
+        1: ["b"],
+        2: ["d"],
+    }
+
+
+def test_attribute_incidents_skips_incidents_before_the_first_deployment():
+    assert attribute_incidents([at(5)], [incident("a", 2)]) == {}
+
+
+def test_attribute_incidents_within_window():
+    attributed = attribute_incidents(
+        [at(1)], [incident("a", 2), incident("b", 6)], attribution_window=datetime.timedelta(hours=2)
+    )
+
+    assert [i.id for i in attributed[0]] == ["a"]
+
+
+def test_restored_at_prefers_resolution():
+    assert restored_at(incident("a", 2, resolved=3), [at(5)]) == at(3)
+
+
+def test_restored_at_falls_back_to_next_deployment():
+    deployments = [at(1), at(5), at(9)]
+
+    assert restored_at(incident("a", 5), deployments) == at(9)
+    assert restored_at(incident("b", 10), deployments) is None
+
+
+def test_in_window():
+    assert [i.id for i in in_window([incident("a", 1), incident("b", 3)], at(2))] == ["b"]
@@ -0,0 +1,65 @@
+import datetime
+from types import SimpleNamespace
+
+import github_auth
+from deadline import deadline
+from lead_time_for_changes import LeadTimeForChanges
+
+SINCE = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class FakeClone:
+    def __init__(self, lead_times):
+        self.lead_times = lead_times
+
+    def fetch(self, since):
+        pass
+
+    def merge_lead_times(self, since, commit_counting_method):
+        return iter(self.lead_times)
+
+
+def fake_github(monkeypatch, pulls):
+    connections = []
+    repo = SimpleNamespace(full_name="octo/app", get_pulls=lambda **kwargs: pulls)
+
+    def create_github(token, host):
+        connections.append(token)
+        return SimpleNamespace(get_repo=lambda name: repo)
+
+    monkeypatch.setattr(github_auth, "create_github", create_github)
+    return connections
+
+
+def lead_time(clone):
+    deadline.start(None)
+    return LeadTimeForChanges(
+        "octo", "app", "[]", "main", 30, token="pat", github_host=None, git_repository=clone, since=SINCE
+    )
+
+
+def test_git_mode_times_merges_without_the_api(monkeypatch):
+    connections = fake_github(monkeypatch, [])
+    calculator = lead_time(FakeClone([datetime.timedelta(hours=2), datetime.timedelta(hours=4)]))
+
+    assert calculator.process_pull_requests() == (2, 6.0)
+    assert connections == []
+    assert calculator.repo_object is None
+
+
+def test_git_mode_falls_back_to_the_api_without_merges(monkeypatch):
+    merged_at = SINCE + datetime.timedelta(days=1)
+    pull = SimpleNamespace(
+        updated_at=merged_at, merged_at=merged_at, merge_commit_sha="abc", head=SimpleNamespace(sha="head")
+    )
+    connections = fake_github(monkeypatch, [pull])
+    calculator = lead_time(FakeClone([]))
+
+    monkeypatch.setattr(
+        "commit_index.CommitDateResolver.last_commit_date", lambda self, pr: merged_at - datetime.timedelta(hours=3)
+    )
+
+    assert calculator.process_pull_requests() == (1, 3.0)
+    assert connections == ["pat"]
+    # The entry point reports the API counters when this is set
+    assert calculator.repo_object is not None
@@ -0,0 +1,104 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from github import GithubException
+
+import org_graph
+from org_graph import OrgGraph, OrgGraphLoader
+
+
+class FakeRequester:
+    """Serves team pages, answering 304 when the client's ETag is current."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.calls = []
+
+    def requestJson(self, verb, url, parameters=None, headers=None):
+        page = parameters["page"]
+        self.calls.append((url, page, headers.get("If-None-Match")))
+        if url not in self.pages:
+            return 404, {}, "{}"
+        items = self.pages[url][page - 1] if page <= len(self.pages[url]) else []
+        etag = f'"{url}:{page}:{json.dumps(items)}"'
+        if headers.get("If-None-Match") == etag:
+            return 304, {"etag": etag}, ""
+        return 200, {"etag": etag}, json.dumps(items)
+
+
+def team(slug, parent=None):
+    payload = {"slug": slug, "id": len(slug), "parent": {"slug": parent} if parent else None}
+    return SimpleNamespace(slug=slug, _rawData=payload)
+
+
+@pytest.fixture
+def org_pages():
+    return {
+        "/orgs/octo/teams/core/members": [[{"login": "alice"}, {"login": "bob"}]],
+        "/orgs/octo/teams/core/repos": [[{"full_name": "octo/app", "role_name": "maintain"}]],
+        "/orgs/octo/teams/web/members": [[{"login": "carol"}]],
+        "/orgs/octo/teams/web/repos": [[]],
+    }
+
+
+def loader_for(graph, pages, teams):
+    requester = FakeRequester(pages)
+    org = SimpleNamespace(_requester=requester, get_teams=lambda: teams)
+    return OrgGraphLoader(SimpleNamespace(get_organization=lambda owner: org), graph), requester
+
+
+def test_refresh_revalidates_unchanged_pages(tmp_path, org_pages):
+    graph = OrgGraph(str(tmp_path / "graph.db"))
+    teams = [team("core"), team("web", parent="core")]
+    first, _ = loader_for(graph, org_pages, teams)
+    first.refresh("octo")
+
+    second, requester = loader_for(graph, org_pages, teams)
+    second.refresh("octo")
+
+    assert (first.revalidated, second.revalidated, second.requests) == (0, 4, 4)
+    assert all(etag for _, _, etag in requester.calls)
+    assert sorted(graph.team_members("core")) == ["alice", "bob"]
+    assert graph.repository_permissions("core") == {"octo/app": "maintain"}
+    assert graph.parent_team("web") == "core"
+
+
+def test_changed_page_is_downloaded_again(tmp_path, org_pages):
+    graph = OrgGraph(str(tmp_path / "graph.db"))
+    teams = [team("core")]
+    loader_for(graph, org_pages, teams)[0].refresh("octo")
+    org_pages["/orgs/octo/teams/core/members"] = [[{"login": "alice"}]]
+
+    loader = loader_for(graph, org_pages, teams)[0]
+    loader.refresh("octo")
+
+    assert graph.team_members("core") == ["alice"]
+    assert loader.revalidated == 1
+
+
+def test_paginates_full_pages(tmp_path, org_pages, monkeypatch):
+    monkeypatch.setattr(org_graph, "TEAM_PAGE_SIZE", 2)
+    org_pages["/orgs/octo/teams/core/members"] = [[{"login": "alice"}, {"login": "bob"}], [{"login": "dave"}]]
+    graph = OrgGraph(str(tmp_path / "graph.db"))
+
+    loader_for(graph, org_pages, [team("core")])[0].refresh("octo")
+
+    assert sorted(graph.team_members("core")) == ["alice", "bob", "dave"]
+
+
+def test_removed_teams_are_pruned(tmp_path, org_pages):
+    graph = OrgGraph(str(tmp_path / "graph.db"))
+    loader_for(graph, org_pages, [team("core"), team("web")])[0].refresh("octo")
+
+    loader_for(graph, org_pages, [team("core")])[0].refresh("octo")
+
+    assert [payload["slug"] for payload in graph.team_payloads()] == ["core"]
+    assert graph.cached_pages("web", "members") == {}
+
+
+def test_errors_are_raised(tmp_path):
+    graph = OrgGraph(str(tmp_path / "graph.db"))
+
+    with pytest.raises(GithubException):
+        loader_for(graph, {}, [team("core")])[0].refresh("octo")
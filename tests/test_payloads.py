@@ -0,0 +1,76 @@
+import datetime
+import json
+
+import pytest
+
+import payloads
+from payloads import (
+    CommitItem,
+    PullRequestItem,
+    WorkflowRunItem,
+    decode_commits,
+    decode_pull_requests,
+    decode_workflow_runs,
+    decode_workflows,
+    epoch,
+    epoch_date,
+)
+
+PULL_REQUESTS = [
+    {
+        "number": 1,
+        "created_at": "2026-01-01T00:00:00Z",
+        "updated_at": "2026-01-02T00:00:00Z",
+        "merged_at": "2026-01-02T00:00:00Z",
+        "base": {"ref": "main"},
+        "title": "dropped",
+    },
+    {"number": 2, "created_at": "2026-01-01T00:00:00Z", "updated_at": "2026-01-01T00:00:00Z", "merged_at": None},
+]
+
+
+@pytest.fixture(params=["orjson", "json"])
+def parser(request, monkeypatch):
+    if request.param == "json":
+        monkeypatch.setattr(payloads, "orjson", None)
+    elif payloads.orjson is None:
+        pytest.skip("orjson is not installed")
+    return request.param
+
+
+def test_epoch():
+    assert epoch("2026-01-01T00:00:00Z") == 1767225600
+    assert epoch(None) is None
+    assert epoch_date(1767225600 + 3600) == datetime.date(2026, 1, 1)
+
+
+def test_decode_pull_requests(parser):
+    assert decode_pull_requests(json.dumps(PULL_REQUESTS).encode()) == [
+        PullRequestItem(1, 1767225600, 1767312000, 1767312000, "main"),
+        PullRequestItem(2, 1767225600, 1767225600, None, None),
+    ]
+
+
+def test_decode_workflow_runs(parser):
+    page = {
+        "total_count": 5,
+        "workflow_runs": [
+            {"id": 9, "head_branch": "main", "created_at": "2026-01-01T00:00:00Z", "updated_at": "2026-01-01T01:00:00Z"}
+        ],
+    }
+
+    assert decode_workflow_runs(json.dumps(page).encode()) == (5, [WorkflowRunItem(9, "main", 1767225600, 1767229200)])
+    assert decode_workflow_runs(b'{"workflow_runs": []}') == (0, [])
+
+
+def test_decode_workflows(parser):
+    assert decode_workflows(b'{"total_count": 2, "workflows": [{"id": 3}, {"id": 4}]}') == [3, 4]
+
+
+def test_decode_commits(parser):
+    commits = [
+        {"sha": "a", "commit": {"committer": {"date": "2026-01-01T00:00:00Z"}}},
+        {"sha": "b", "commit": {}},
+    ]
+
+    assert decode_commits(json.dumps(commits).encode()) == [CommitItem("a", 1767225600), CommitItem("b", None)]
@@ -0,0 +1,81 @@
+import datetime
+
+import warehouse as warehouse_module
+from checkpoint import Checkpoint
+from planner import ActivityCounts, RepositoryPlan, build_plan, estimate_requests, execute
+from report_sink import ReportSink, read_reports
+from warehouse import Warehouse, format_timestamp
+
+CONFIG = {
+    "owner": "octo",
+    "items": [
+        {"repository": "app", "branch": "main", "workflows": ["deploy.yaml"]},
+        {"repository": "app", "branch": "release", "workflows": []},
+        {"repository": "app", "branch": "main", "workflows": ["deploy.yaml"]},
+        {"repository": "api", "branch": "main"},
+    ],
+}
+
+
+def test_build_plan_groups_items_by_repository():
+    plans = build_plan(CONFIG)
+
+    assert [plan.repository for plan in plans] == ["app", "api"]
+    assert plans[0].branches == ["main", "release"]
+    assert len(plans[0].items) == 2
+
+
+def test_estimate_requests():
+    plan = RepositoryPlan("app", ["main", "release"], [])
+
+    estimate = estimate_requests(plan, ActivityCounts(150, 40, {"main": 250}))
+
+    assert estimate == {
+        "repository": 1,
+        "pull_request_pages": 2,
+        "pull_request_details": 120,
+        "reviews": 150,
+        "workflow_run_pages": 4,
+        "total": 277,
+    }
+
+
+class FakeLoader:
+    loaded = []
+
+    def __init__(self, github_client, warehouse):
+        self.warehouse = warehouse
+
+    def load_repository(self, full_name, branches, time_frame, since):
+        FakeLoader.loaded.append((full_name, since))
+        self.warehouse.upsert_workflow_run(
+            full_name,
+            {"id": len(full_name), "head_branch": "main", "path": "deploy.yaml",
+             "created_at": format_timestamp(since + datetime.timedelta(days=1))},
+        )
+
+
+def test_resumed_run_skips_completed_repositories_and_keeps_the_window(tmp_path, monkeypatch):
+    monkeypatch.setattr(warehouse_module, "WarehouseLoader", FakeLoader)
+    FakeLoader.loaded = []
+    path = str(tmp_path / "checkpoint.json")
+    report_path = str(tmp_path / "reports.ndjson")
+    checkpoint = Checkpoint(path, "plan:test")
+    checkpoint.state["started_at"] = "2026-01-10T00:00:00Z"
+    previous = [dict(kind="pr_metrics", owner="octo", repository="app", report={"prs_opened": 1}, time_frame=7)]
+    checkpoint.complete("repo:app", previous)
+
+    resumed = Checkpoint(path, "plan:test", resume=True)
+    execute(build_plan(CONFIG), CONFIG, None, Warehouse(":memory:"), 7, ReportSink(report_path), resumed)
+
+    assert FakeLoader.loaded == [("octo/api", datetime.datetime(2026, 1, 3, tzinfo=datetime.timezone.utc))]
+    records = list(read_reports(report_path))
+    assert records[0]["report"] == {"prs_opened": 1}
+    assert [(record["repository"], record["kind"]) for record in records[1:]] == [
+        ("api", "pr_metrics"),
+        ("api", "deployment_frequency"),
+        ("api", "lead_time_for_changes"),
+    ]
+    assert records[2]["report"]["total_deployments"] == 1
+    # A finished run removes its checkpoint
+    assert not (tmp_path / "checkpoint.json").exists()
@@ -0,0 +1,67 @@
+import datetime
+
+import pr_search
+from pr_search import PullRequestSearch
+
+START = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+class FakeResults:
+    def __init__(self, created, requests):
+        self.created = created
+        self.requests = requests
+        self.totalCount = len(created)
+
+    def get_page(self, page):
+        self.requests.append(page)
+        return self.created[page * 2:page * 2 + 2]
+
+
+class FakeGithub:
+    per_page = 2
+
+    def __init__(self, created):
+        self.created = created
+        self.queries = []
+        self.pages = []
+
+    def search_issues(self, query, sort, order):
+        self.queries.append(query)
+        window = query.split("created:")[1]
+        start, end = (
+            datetime.datetime.strptime(edge, pr_search.SEARCH_DATE_FORMAT).replace(tzinfo=datetime.timezone.utc)
+            for edge in window.split("..")
+        )
+        in_window = sorted((moment for moment in self.created if start <= moment <= end), reverse=True)
+        return FakeResults(in_window, self.pages)
+
+
+def test_windows_come_newest_first(monkeypatch):
+    monkeypatch.setattr(pr_search, "SEARCH_RESULT_CAP", 2)
+    created = [START + datetime.timedelta(days=day) for day in (1, 2, 3, 5, 8, 9)]
+    github_client = FakeGithub(created)
+
+    windows = list(PullRequestSearch(github_client).split_windows("repo:octo/app", START, START + datetime.timedelta(days=10)))
+
+    firsts = [window.first_page[0] for window in windows]
+    assert firsts == sorted(firsts, reverse=True)
+    assert sum(window.total for window in windows) == len(created)
+    assert all(window.total <= 2 for window in windows)
+
+
+def test_search_window_reuses_the_first_page():
+    created = [START + datetime.timedelta(days=day) for day in (1, 2, 3)]
+    github_client = FakeGithub(created)
+    search = PullRequestSearch(github_client)
+
+    (window,) = search.split_windows("repo:octo/app", START, START + datetime.timedelta(days=10))
+
+    assert list(search.search_window(window)) == sorted(created, reverse=True)
+    assert github_client.pages == [0, 1]
+
+
+def test_empty_windows_are_skipped():
+    github_client = FakeGithub([])
+
+    assert list(PullRequestSearch(github_client).split_windows("repo:octo/app", START, START + datetime.timedelta(days=1))) == []
+    assert len(github_client.queries) == 1
@@ -0,0 +1,75 @@
+import json
+
+from report_sink import ReportSink, build_dora_entity, entity_title, group_reports, read_reports
+
+DEPLOYMENT_FREQUENCY = {
+    "deployment_frequency": 0.5,
+    "rating": "High",
+    "number_of_unique_deployment_days": 3,
+    "number_of_unique_deployment_weeks": 2,
+    "number_of_unique_deployment_months": 1,
+    "total_deployments": 4,
+}
+LEAD_TIME = {
+    "lead_time_for_changes_in_hours": 12.5,
+    "rating": "Elite",
+    "workflow_average_time_duration": 0.5,
+    "pr_average_time_duration": 12.0,
+}
+
+
+def test_sink_appends_ndjson(tmp_path):
+    path = str(tmp_path / "reports.ndjson")
+    sink = ReportSink(path)
+    sink.add("deployment_frequency", "octo", "app", json.dumps(DEPLOYMENT_FREQUENCY), time_frame=28, branch="main")
+    sink.flush()
+    sink.add("lead_time_for_changes", "octo", "app", LEAD_TIME, time_frame=28)
+    sink.flush()
+
+    records = list(read_reports(path))
+
+    assert [record["kind"] for record in records] == ["deployment_frequency", "lead_time_for_changes"]
+    assert records[0]["report"] == DEPLOYMENT_FREQUENCY
+    assert records[0]["branch"] == "main"
+    assert sink.records == []
+
+
+def test_group_reports_by_repository_and_time_frame():
+    records = [
+        {"kind": "deployment_frequency", "repository": "app", "time_frame": 28, "report": DEPLOYMENT_FREQUENCY},
+        {"kind": "lead_time_for_changes", "repository": "app", "time_frame": 28, "report": LEAD_TIME},
+        {"kind": "lead_time_for_changes", "repository": "app", "time_frame": 7, "report": LEAD_TIME},
+        {"kind": "lead_time_for_changes", "repository": "api", "time_frame": 28, "report": LEAD_TIME},
+    ]
+
+    grouped = group_reports(iter(records))
+
+    assert sorted(grouped) == [("api", 28), ("app", 7), ("app", 28)]
+    assert sorted(grouped[("app", 28)]) == ["deployment_frequency", "lead_time_for_changes"]
+
+
+def test_build_dora_entity_maps_report_fields():
+    entity = build_dora_entity(
+        "my-app_v2", 28, {"deployment_frequency": DEPLOYMENT_FREQUENCY, "lead_time_for_changes": LEAD_TIME, "unknown": {}}
+    )
+
+    assert entity["identifier"] == "my-app_v2-28"
+    assert entity["title"] == "My App V2"
+    assert entity["relations"] == {"service": "my-app_v2"}
+    assert entity["properties"] == {
+        "timeFrameInWeeks": 28,
+        "totalDeployments": 4,
+        "deploymentRating": "High",
+        "numberOfUniqueDeploymentDays": 3,
+        "numberOfUniqueDeploymentWeeks": 2,
+        "numberOfUniqueDeploymentMonths": 1,
+        "deploymentFrequency": 0.5,
+        "leadTimeForChangesInHours": 12.5,
+        "leadTimeRating": "Elite",
+        "workflowAverageTimeDuration": 0.5,
+        "prAverageTimeDuration": 12.0,
+    }
+
+
+def test_entity_title():
+    assert entity_title("dora.metrics-service") == "Dora Metrics Service"
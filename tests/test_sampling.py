@@ -0,0 +1,83 @@
+import datetime
+import math
+
+import pytest
+
+from sampling import Z_95, allocate, draw, scale, stratified_mean, stratify
+
+
+def test_stratify():
+    assert stratify([1, 2, 3, 4, 5], lambda value: value % 2) == {1: [1, 3, 5], 0: [2, 4]}
+
+
+def test_allocate_everything_within_budget():
+    strata = {"small": [1, 2], "large": [1, 2, 3]}
+
+    assert allocate(strata, budget=10, cost=lambda key: 2) == {"small": 2, "large": 3}
+
+
+def test_allocate_proportionally_within_budget():
+    strata = {"small": list(range(10)), "large": list(range(90))}
+
+    allocation = allocate(strata, budget=40, cost=lambda key: 2)
+
+    assert sum(count * 2 for count in allocation.values()) <= 40
+    assert allocation["large"] > allocation["small"] >= 1
+
+
+def test_allocate_keeps_largest_strata_when_one_each_does_not_fit():
+    strata = {"a": [1], "b": [1, 2], "c": [1, 2, 3]}
+
+    allocation = allocate(strata, budget=2, cost=lambda key: 1)
+
+    assert allocation == {"a": 0, "b": 1, "c": 1}
+
+
+def test_draw_is_reproducible_with_a_seed():
+    strata = {"a": list(range(20)), "b": list(range(5))}
+    allocation = {"a": 4, "b": 0}
+
+    sample = draw(strata, allocation, seed=3)
+
+    assert sample == draw(strata, allocation, seed=3)
+    assert list(sample) == ["a"]
+    assert len(set(sample["a"])) == 4 and set(sample["a"]) <= set(strata["a"])
+
+
+def test_stratified_mean_weights_strata_by_size():
+    mean, half_width = stratified_mean({"a": (30, [1.0]), "b": (10, [5.0])})
+
+    assert mean == pytest.approx(2.0)
+    # Single-value strata add no variance
+    assert half_width == 0.0
+
+
+def test_stratified_mean_of_a_census_has_no_error():
+    mean, half_width = stratified_mean({"a": (3, [1.0, 2.0, 3.0])})
+
+    assert mean == pytest.approx(2.0)
+    assert half_width == pytest.approx(0.0)
+
+
+def test_stratified_mean_half_width():
+    mean, half_width = stratified_mean({"a": (10, [1.0, 3.0])})
+
+    # Sample variance 2, finite population correction 1 - 2/10
+    assert mean == pytest.approx(2.0)
+    assert half_width == pytest.approx(Z_95 * math.sqrt(0.8 * 2 / 2))
+
+
+def test_stratified_mean_without_values():
+    assert stratified_mean({"a": (10, [])}) == (0.0, 0.0)
+
+
+def test_scale_counts_and_durations_only():
+    record = {"count": 2, "hours": 1.5, "wait": datetime.timedelta(hours=1), "merged": True, "id": "x"}
+
+    assert scale(record, 3) == {
+        "count": 6,
+        "hours": 4.5,
+        "wait": datetime.timedelta(hours=3),
+        "merged": True,
+        "id": "x",
+    }
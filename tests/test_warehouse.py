@@ -0,0 +1,175 @@
+import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from warehouse import Warehouse, WarehouseLoader, format_timestamp, parse_timestamp
+
+SINCE = datetime.datetime(2026, 1, 10, tzinfo=datetime.timezone.utc)
+
+
+def pull_request(number, created_at, merged_at=None, updated_at=None, base="main", commits=2):
+    return {
+        "number": number,
+        "base": {"ref": base, "sha": "base"},
+        "head": {"sha": f"head-{number}"},
+        "created_at": created_at,
+        "updated_at": updated_at or merged_at or created_at,
+        "merged_at": merged_at,
+        "commits": commits,
+        "additions": 10,
+        "deletions": 5,
+    }
+
+
+@pytest.fixture
+def warehouse(tmp_path):
+    return Warehouse(str(tmp_path / "warehouse.db"))
+
+
+def test_lead_times_read_first_or_last_commit(warehouse):
+    warehouse.upsert_pull_request("octo/app", pull_request(1, "2026-01-11T00:00:00Z", "2026-01-12T00:00:00Z"))
+    warehouse.record_pull_request_commits(
+        "octo/app",
+        1,
+        [("a", parse_timestamp("2026-01-10T12:00:00Z")), ("b", parse_timestamp("2026-01-11T12:00:00Z"))],
+    )
+    # Merged before the window
+    warehouse.upsert_pull_request("octo/app", pull_request(2, "2026-01-01T00:00:00Z", "2026-01-02T00:00:00Z"))
+    warehouse.record_pull_request_commits("octo/app", 2, [("c", parse_timestamp("2026-01-01T00:00:00Z"))])
+
+    assert warehouse.pull_request_lead_times("octo/app", "main", SINCE, "first") == (1, 36.0)
+    assert warehouse.pull_request_lead_times("octo/app", "main", SINCE, "last") == (1, 12.0)
+    assert warehouse.pull_request_lead_times("octo/app", "dev", SINCE) == (0, 0)
+
+
+def test_stale_and_trimmed_payloads_do_not_overwrite(warehouse):
+    warehouse.upsert_pull_request(
+        "octo/app", pull_request(1, "2026-01-11T00:00:00Z", "2026-01-12T00:00:00Z", commits=4)
+    )
+    trimmed = pull_request(1, "2026-01-11T00:00:00Z", "2026-01-12T00:00:00Z", updated_at="2026-01-13T00:00:00Z")
+    trimmed["commits"] = None
+    warehouse.upsert_pull_request("octo/app", trimmed)
+    warehouse.upsert_pull_request("octo/app", pull_request(1, "2026-01-11T00:00:00Z", None, updated_at="2026-01-11T06:00:00Z"))
+
+    row = warehouse.select("SELECT commits, updated_at, merged_at FROM pull_requests")[0]
+    assert (row["commits"], row["updated_at"], row["merged_at"]) == (4, "2026-01-13T00:00:00Z", "2026-01-12T00:00:00Z")
+
+
+def test_team_response_counts_first_member_review(warehouse):
+    warehouse.record_team({"slug": "core", "id": 1}, ["alice", "bob"], ["octo/app"])
+    for number in (1, 2):
+        warehouse.upsert_pull_request("octo/app", pull_request(number, "2026-01-11T00:00:00Z"))
+        warehouse.add_review_request("octo/app", number, {"slug": "core", "id": 1})
+    warehouse.upsert_review("octo/app", 1, {"id": 10, "user": {"login": "carol"}, "state": "commented", "submitted_at": "2026-01-11T01:00:00Z"})
+    warehouse.upsert_review("octo/app", 1, {"id": 11, "user": {"login": "bob"}, "state": "approved", "submitted_at": "2026-01-11T03:00:00Z"})
+    warehouse.upsert_review("octo/app", 1, {"id": 12, "user": {"login": "alice"}, "state": "approved", "submitted_at": "2026-01-11T05:00:00Z"})
+
+    assert warehouse.team_response("core", SINCE) == (2, 1, datetime.timedelta(hours=3))
+    assert [team["slug"] for team in warehouse.teams_for_repository("octo/app")] == ["core"]
+
+
+def test_nested_transactions_roll_back_together(warehouse):
+    with pytest.raises(RuntimeError):
+        with warehouse.transaction():
+            warehouse.record_repository("octo/app", 1)
+            with warehouse.transaction():
+                warehouse.record_repository("octo/api", 2)
+            raise RuntimeError()
+
+    assert warehouse.select("SELECT * FROM repositories") == []
+
+
+def test_format_timestamp_normalizes_to_utc():
+    value = datetime.datetime(2026, 1, 10, 3, tzinfo=datetime.timezone(datetime.timedelta(hours=2)))
+
+    assert format_timestamp(value) == "2026-01-10T01:00:00Z"
+    assert parse_timestamp(format_timestamp(value)) == value
+
+
+class FakeRequester:
+    def __init__(self, commit_dates):
+        self.commit_dates = commit_dates
+        self.urls = []
+
+    def requestJsonAndCheck(self, verb, url, parameters=None):
+        self.urls.append(url)
+        if "/compare/" in url:
+            sha = url.rsplit("...", 1)[1].replace("head", "first")
+        else:
+            sha = parameters["sha"]
+        commit = {"sha": sha, "commit": {"committer": {"date": self.commit_dates[sha]}}}
+        return {}, {"commits": [commit]} if "/compare/" in url else [commit]
+
+
+def listed(payload):
+    return SimpleNamespace(
+        number=payload["number"],
+        created_at=parse_timestamp(payload["created_at"]),
+        updated_at=parse_timestamp(payload["updated_at"]),
+        merged_at=parse_timestamp(payload["merged_at"]),
+        _rawData=payload,
+        get_reviews=lambda: [],
+    )
+
+
+def detailed(payload):
+    return SimpleNamespace(
+        number=payload["number"],
+        head=SimpleNamespace(sha=payload["head"]["sha"]),
+        base=SimpleNamespace(sha=payload["base"]["sha"]),
+        url=f"/repos/octo/app/pulls/{payload['number']}",
+        commits=payload["commits"],
+        _rawData=payload,
+    )
+
+
+class FakeRepo:
+    full_name = "octo/app"
+    id = 7
+    url = "/repos/octo/app"
+
+    def __init__(self, payloads, commit_dates):
+        self.payloads = payloads
+        self._requester = FakeRequester(commit_dates)
+        self.listed_with = None
+
+    def get_pulls(self, state, sort, direction):
+        self.listed_with = sort
+        for payload in sorted(self.payloads, key=lambda payload: payload["updated_at"], reverse=True):
+            yield listed(payload)
+
+    def get_pull(self, number):
+        return detailed(next(payload for payload in self.payloads if payload["number"] == number))
+
+    def get_workflow_runs(self, branch, created):
+        return []
+
+
+def test_loader_keeps_prs_created_before_and_merged_inside_the_window(warehouse):
+    repo = FakeRepo(
+        [
+            pull_request(1, "2025-12-01T00:00:00Z", "2026-01-12T00:00:00Z", commits=3),
+            pull_request(2, "2025-12-01T00:00:00Z", "2025-12-20T00:00:00Z", updated_at="2026-01-11T00:00:00Z"),
+            pull_request(3, "2025-11-01T00:00:00Z", "2025-11-02T00:00:00Z"),
+        ],
+        {
+            "first-1": "2025-12-01T00:00:00Z",
+            "head-1": "2026-01-11T00:00:00Z",
+            "first-2": "2025-12-01T00:00:00Z",
+            "head-2": "2025-12-19T00:00:00Z",
+        },
+    )
+    github_client = SimpleNamespace(get_repo=lambda full_name: repo)
+
+    WarehouseLoader(github_client, warehouse).load_repository("octo/app", ["main"], 30, since=SINCE)
+
+    assert repo.listed_with == "updated"
+    # Merged before the window: skipped without a details or commit request
+    assert [row["number"] for row in warehouse.select("SELECT number FROM pull_requests")] == [1]
+    assert len(repo._requester.urls) == 2
+    assert [tuple(row) for row in warehouse.select("SELECT position, sha FROM pull_request_commits ORDER BY position")] == [
+        (0, "first-1"),
+        (2, "head-1"),
+    ]
+    assert warehouse.pull_request_lead_times("octo/app", "main", SINCE, "last") == (1, 24.0)
@@ -0,0 +1,87 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from event_store import EventStore
+from webhook_server import WebhookHandler
+
+
+class RecordingRefresher:
+    def __init__(self):
+        self.events = []
+
+    def refresh(self, event, payload):
+        self.events.append(event)
+
+
+class FailingStore:
+    def record(self, delivery_id, event, payload):
+        raise RuntimeError("disk full")
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def serve(store, refresher):
+        handler = type("Handler", (WebhookHandler,), {"store": store, "refresher": refresher})
+        handler.log_message = lambda self, *args: None
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}/"
+
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def post(url, event, payload, delivery_id="delivery-1"):
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode(),
+        headers={"X-GitHub-Event": event, "X-GitHub-Delivery": delivery_id},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.read().decode()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode()
+
+
+def test_deployment_status_is_stored_and_refreshed(serve, tmp_path):
+    store = EventStore(str(tmp_path / "events.db"))
+    refresher = RecordingRefresher()
+    url = serve(store, refresher)
+    payload = {
+        "repository": {"full_name": "octo/app", "id": 7},
+        "deployment": {"id": 30, "ref": "main"},
+        "deployment_status": {"id": 41, "state": "success", "created_at": "2026-01-02T00:00:00Z"},
+    }
+
+    assert post(url, "deployment_status", payload) == (200, "ok")
+
+    assert refresher.events == ["deployment_status"]
+    assert [row["id"] for row in store.select("SELECT id FROM deployments")] == [41]
+
+
+def test_unhandled_events_are_ignored(serve, tmp_path):
+    refresher = RecordingRefresher()
+    url = serve(EventStore(str(tmp_path / "events.db")), refresher)
+
+    assert post(url, "star", {}) == (202, "ignored star event")
+    assert refresher.events == []
+
+
+def test_failed_store_answers_500(serve):
+    refresher = RecordingRefresher()
+    url = serve(FailingStore(), refresher)
+
+    assert post(url, "workflow_run", {"repository": {"full_name": "octo/app"}}) == (500, "failed to store event")
+    assert refresher.events == []